@@ -0,0 +1,537 @@
+"""
+Offline benchmark for the hiring pipeline.
+
+Runs main.py's graph and HTTP endpoints with no network access: every LLM call
+goes to a deterministic fake chat model with configurable latency and jitter,
+emails go to a local SMTP sink, and resumes are synthetic PDFs. Reports p50/p95
+latency, throughput and peak RSS for each batch size and concurrency level.
+
+Usage:
+    python benchmark.py --batch-sizes 10,50 --concurrency 1,4,8 --latency-ms 300 --jitter-ms 100
+"""
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import re
+import resource
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+FIRST_NAMES = ["Asha", "Ben", "Chen", "Divya", "Elena", "Farid", "Grace", "Hiro", "Isabel", "Jamal", "Kavya", "Liam"]
+LAST_NAMES = ["Murugesan", "Okafor", "Schmidt", "Tanaka", "Rossi", "Haddad", "Novak", "Singh", "Lopez", "Kim"]
+SKILLS = [
+    "Python", "SQL", "AWS", "Docker", "Kubernetes", "PyTorch", "TensorFlow", "React", "Node.js", "Go",
+    "Terraform", "Spark", "Airflow", "FastAPI", "Flask", "PostgreSQL", "Redis", "CI/CD", "Java", "Scala",
+]
+JOB_DESCRIPTION = """JOB TITLE
+Senior Machine Learning Engineer
+
+JOB SUMMARY
+Acme Analytics is hiring a Senior Machine Learning Engineer to build and ship production ML systems.
+
+KEY RESPONSIBILITIES
+- Design, train and deploy machine learning models in Python with PyTorch.
+- Build data pipelines with Spark and Airflow on AWS.
+- Operate services with Docker, Kubernetes and CI/CD.
+
+REQUIRED QUALIFICATIONS
+- 5+ years of Python and SQL.
+- Experience with AWS, Docker and Kubernetes.
+"""
+
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+
+# ---------------------------------------------------------------------------
+# Fake chat model
+# ---------------------------------------------------------------------------
+
+def _stable_int(*parts) -> int:
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _section(prompt: str, start: str, end: str) -> str:
+    begin = prompt.find(start)
+    if begin == -1:
+        return ""
+    begin += len(start)
+    finish = prompt.find(end, begin)
+    return prompt[begin:finish if finish != -1 else None].strip().strip("-").strip()
+
+
+def _screen(resume: str) -> dict:
+    lines = [line.strip() for line in resume.splitlines() if line.strip()]
+    email = EMAIL_PATTERN.search(resume)
+    score = 30 + _stable_int(resume) % 66
+    return {
+        "candidateName": lines[0] if lines else "Unknown Candidate",
+        "candidateEmail": email.group(0) if email else "N/A",
+        "matchScore": score,
+        "summary": f"Synthetic screening result with a match score of {score}.",
+        "confidence": round(0.5 + (_stable_int("confidence", resume) % 50) / 100, 2),
+    }
+
+
+def _profile() -> dict:
+    return {
+        "top_skills_matched": ["Python", "AWS", "Docker"],
+        "experience_gaps": ["None significant"],
+        "key_accomplishments": ["Shipped a synthetic benchmark to production."],
+        "overall_fit_comment": "Deterministic fake profile.",
+    }
+
+
+def fake_response(prompt: str) -> str:
+    """
+    Returns a deterministic answer shaped like the real model's output for the
+    prompt's task, recognised from the prompt text.
+    """
+    if "SEVERAL resumes" in prompt:
+        resumes = re.split(r"=== RESUME (\d+) ===", _section(prompt, "**Resumes:**", "**JSON Output"))
+        results = []
+        for number, text in zip(resumes[1::2], resumes[2::2]):
+            results.append(dict(_screen(text), index=int(number), profile=_profile()))
+        return json.dumps({"results": results})
+    if "reusable rejection email templates" in prompt:
+        count = int((re.search(r"Write exactly (\d+)", prompt) or [None, 1])[1])
+        return json.dumps({"templates": [
+            {"subject": "Update on Your Application for Senior Machine Learning Engineer at Acme Analytics",
+             "body": f"Dear [CANDIDATE_NAME],\n\nThank you for applying (variant {i + 1}). We have decided to move "
+                     f"forward with other candidates.\n\nThe Acme Analytics Hiring Team"}
+            for i in range(count)
+        ]})
+    if "interview invitation email" in prompt:
+        name = _section(prompt, "**Candidate Name:**", "\n") or "Candidate"
+        return json.dumps({
+            "subject": "Invitation to Interview for Senior Machine Learning Engineer at Acme Analytics",
+            "body": f"Dear {name},\n\nWe would like to invite you to a 30-45 minute interview. "
+                    f"Please share your availability.\n\nThe Acme Analytics Hiring Team",
+        })
+    if "rejection email" in prompt:
+        return json.dumps({
+            "subject": "Update on Your Application for Senior Machine Learning Engineer at Acme Analytics",
+            "body": "Thank you for your interest. We have decided to move forward with other candidates.",
+        })
+    if "reviewer feedback to a draft email" in prompt:
+        draft = _section(prompt, "DRAFT EMAIL:\n---", "---")
+        last_line = [line for line in draft.splitlines() if line.strip()][-1:] or [draft]
+        return json.dumps({"edits": [{"find": last_line[0], "replace": last_line[0] + "\n\nP.S. Revised based on your feedback."}]})
+    if "refine and rewrite a draft email" in prompt:
+        draft = _section(prompt, "DRAFT EMAIL:\n---", "---")
+        return draft + "\n\nP.S. Revised based on your feedback."
+    if "Rough Notes from Hiring Manager" in prompt:
+        return JOB_DESCRIPTION
+    if "Full Resume Text:" in prompt:
+        resume = _section(prompt, "**Full Resume Text:**", "**JSON Output")
+        result = _screen(resume)
+        if '"profile"' in prompt:
+            result["profile"] = _profile()
+        return json.dumps(result)
+    if "top_skills_matched" in prompt:
+        return json.dumps(_profile())
+    return "OK"
+
+
+def build_fake_chat_model(latency_seconds: float, jitter_seconds: float, seed: int):
+    """
+    Builds a factory for llm_registry.set_llm_factory that returns fake chat
+    models. Each call sleeps for the configured latency plus a jitter that is
+    deterministic per prompt, and reports token usage like a real provider.
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    from src.core.prompt_session import count_tokens
+
+    class FakeChatModel(BaseChatModel):
+        model_name: str = "fake"
+        latency: float = 0.2
+        jitter: float = 0.0
+        seed: int = 0
+
+        @property
+        def _llm_type(self) -> str:
+            return "fake-benchmark-chat"
+
+        def _prompt(self, messages) -> str:
+            return "\n".join(str(message.content) for message in messages)
+
+        def _delay(self, prompt: str) -> float:
+            rng = random.Random(_stable_int(self.seed, self.model_name, prompt))
+            return max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = self._prompt(messages)
+            time.sleep(self._delay(prompt))
+            text = fake_response(prompt)
+            usage = {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(text)}
+            return ChatResult(
+                generations=[ChatGeneration(message=AIMessage(content=text))],
+                llm_output={"token_usage": usage, "model_name": self.model_name},
+            )
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = self._prompt(messages)
+            delay = self._delay(prompt)
+            pieces = re.findall(r"\S+\s*", fake_response(prompt)) or [""]
+            # About a third of the latency goes to the first token, the rest is spread over the others.
+            time.sleep(delay * 0.3)
+            for piece in pieces:
+                time.sleep(delay * 0.7 / len(pieces))
+                if run_manager:
+                    run_manager.on_llm_new_token(piece)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    def factory(model_name, temperature):
+        return FakeChatModel(model_name=model_name, latency=latency_seconds, jitter=jitter_seconds, seed=seed)
+
+    return factory
+
+
+# ---------------------------------------------------------------------------
+# SMTP sink
+# ---------------------------------------------------------------------------
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        self._reply("220 benchmark-sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip().upper()
+            if command.startswith("EHLO"):
+                self.wfile.write(b"250-benchmark-sink\r\n250 8BITMIME\r\n")
+            elif command.startswith("DATA"):
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                self.server.count_message()
+                self._reply("250 OK")
+            elif command.startswith("QUIT"):
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Minimal local SMTP server that accepts and counts every message.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPSinkHandler)
+        self.messages = 0
+        self._count_lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def count_message(self):
+        with self._count_lock:
+            self.messages += 1
+
+
+# ---------------------------------------------------------------------------
+# Synthetic resumes
+# ---------------------------------------------------------------------------
+
+def synthetic_resume_text(index: int, seed: int) -> str:
+    rng = random.Random(_stable_int(seed, index))
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    skills = rng.sample(SKILLS, 6)
+    lines = [
+        f"{first} {last}",
+        f"{first.lower()}.{last.lower()}{index}@example.com | +1 555 {1000 + index}",
+        "",
+        "SUMMARY",
+        f"Engineer with {rng.randint(1, 12)} years of experience in {', '.join(skills[:3])}.",
+        "",
+        "SKILLS",
+        ", ".join(skills),
+        "",
+        "EXPERIENCE",
+    ]
+    for job in range(rng.randint(2, 4)):
+        lines.append(f"Company {job + 1} - {rng.choice(['Engineer', 'Senior Engineer', 'Data Scientist'])}")
+        for _ in range(3):
+            lines.append(f"- Delivered a project using {rng.choice(skills)} that improved throughput by {rng.randint(5, 60)}%.")
+    return "\n".join(lines)
+
+
+def synthetic_resume_pdf(index: int, seed: int) -> bytes:
+    import fitz
+
+    document = fitz.open()
+    page = document.new_page()
+    y = 72
+    for line in synthetic_resume_text(index, seed).splitlines():
+        if y > page.rect.height - 72:
+            page, y = document.new_page(), 72
+        page.insert_text((72, y), line, fontsize=10)
+        y += 14
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+class RSSSampler:
+    """
+    Samples the resident set size of this process every few milliseconds and
+    keeps the peak seen while active.
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current_kb() -> int:
+        try:
+            with open("/proc/self/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self.current_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_kb = self.current_kb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self.current_kb())
+        return False
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(scenario: str, batch_size: int, concurrency: int, latencies: list, wall: float, rss: RSSSampler, errors: int) -> dict:
+    return {
+        "scenario": scenario,
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(rss.peak_kb / 1024, 1),
+        "errors": errors,
+    }
+
+
+def timed_map(func, items: list, concurrency: int):
+    latencies, outputs, errors = [], [], 0
+
+    def _run(item):
+        start = time.perf_counter()
+        try:
+            output = func(item)
+        except Exception as e:
+            return time.perf_counter() - start, None, e
+        return time.perf_counter() - start, output, None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, output, error in pool.map(_run, items):
+            latencies.append(elapsed)
+            outputs.append(output)
+            errors += error is not None
+    return latencies, outputs, errors
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def bench_graph(app_module, pdfs: list, concurrency: int, seed: int) -> tuple:
+    """
+    Parses each PDF and invokes recruitment_graph directly up to the HITL pause.
+    Each output is the thread_id when the run paused for approval, else None.
+    """
+    def _one(item):
+        index, data = item
+        text = app_module.parse_pdf_from_bytes(data, f"resume_{index}.pdf")
+        thread_id = f"bench-graph-{seed}-{index}-{time.time_ns()}"
+        config = {"configurable": {"thread_id": thread_id}}
+        app_module.run_graph(app_module.graph_input(JOB_DESCRIPTION, text), config)
+        return thread_id if app_module.get_graph().get_state(config).next else None
+
+    return timed_map(_one, list(enumerate(pdfs)), concurrency)
+
+
+def bench_process(app_module, pdfs: list, concurrency: int) -> tuple:
+    """
+    Posts the whole batch to /process?wait=true; per-resume latency is the
+    batch wall time split evenly, so p50/p95 here describe batch completion.
+    """
+    from src.core.jobs import JobManager
+
+    app_module.job_manager = JobManager(max_workers=concurrency, retention_seconds=600)
+    client = app_module.app.test_client()
+    data = {
+        "job_description_text": JOB_DESCRIPTION,
+        "resumes": [(io.BytesIO(pdf), f"resume_{i}.pdf") for i, pdf in enumerate(pdfs)],
+    }
+    start = time.perf_counter()
+    response = client.post("/process?wait=true", data=data, content_type="multipart/form-data")
+    wall = time.perf_counter() - start
+    results = response.get_json() if response.status_code == 200 else []
+    errors = sum(1 for result in results if "error" in result) + (response.status_code != 200)
+    return [wall] * len(pdfs), results, errors
+
+
+def bench_resume(app_module, paused: list, concurrency: int) -> tuple:
+    """
+    Approves paused threads through POST /resume, which sends through the SMTP sink.
+    """
+    local = threading.local()
+
+    def _one(thread_id):
+        if not hasattr(local, "client"):
+            local.client = app_module.app.test_client()
+        response = local.client.post("/resume", json={"thread_id": thread_id, "decision": "approve"})
+        if response.status_code != 200:
+            raise RuntimeError(response.get_json())
+        return response.get_json()
+
+    return timed_map(_one, paused, concurrency)
+
+
+def configure_environment(args, sink: SMTPSink, data_dir: str):
+    os.environ.update({
+        "DATA_DIR": data_dir,
+        # Measures the shipped default (sqlite) unless asked otherwise, whatever the shell exports.
+        "CHECKPOINTER_BACKEND": args.checkpointer,
+        "EMAIL_HOST": "127.0.0.1",
+        "EMAIL_PORT": str(sink.port),
+        "EMAIL_USER": "",
+        "SMTP_USER": "",
+        "EMAIL_PASS": "",
+        "SMTP_PASSWORD": "",
+        "EMAIL_FROM": "bench@example.com",
+        "SMTP_USE_TLS": "false",
+        "SMTP_MAX_PER_MINUTE": "0",
+        "LLM_CACHE_ENABLED": "true" if args.cache else "false",
+        # The fake LLM goes through the shared limiter; unlimited by default so the pipeline is measured, not the limiter.
+        "LLM_REQUESTS_PER_MINUTE": str(args.llm_rpm),
+        # Runs repeat the same synthetic resumes, which the dedup history would skip.
+        "DEDUP_ENABLED": "true" if args.dedup else "false",
+        "RESUME_STORE_ENABLED": "false",
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY") or "offline-benchmark",
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for the hiring pipeline.")
+    parser.add_argument("--batch-sizes", default="10,50", help="Comma-separated numbers of resumes per run.")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated worker counts.")
+    parser.add_argument("--scenarios", default="graph,process,resume", help="Any of graph, process, resume.")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mean fake LLM latency.")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform +/- jitter added to each call.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM result cache on (off by default).")
+    parser.add_argument("--llm-rpm", type=int, default=0, help="LLM requests per minute per model (0 = unlimited).")
+    parser.add_argument("--dedup", action="store_true", help="Keep resume deduplication on (off by default).")
+    parser.add_argument("--checkpointer", default="sqlite", choices=["sqlite", "memory"],
+                        help="Checkpointer backend for the graph (the app's default is sqlite).")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    batch_sizes = [int(v) for v in args.batch_sizes.split(",") if v]
+    concurrency_levels = [int(v) for v in args.concurrency.split(",") if v]
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+
+    sink = SMTPSink()
+    data_dir = tempfile.mkdtemp(prefix="hiring-bench-")
+    configure_environment(args, sink, data_dir)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from src.core.llm_registry import set_llm_factory
+
+    set_llm_factory(build_fake_chat_model(args.latency_ms / 1000.0, args.jitter_ms / 1000.0, args.seed))
+    import main as app_module
+
+    print(f"--- BENCHMARK: fake LLM {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, {args.checkpointer} checkpointer, "
+          f"SMTP sink on port {sink.port}, data in {data_dir} ---")
+    rows = []
+    for batch_size in batch_sizes:
+        pdfs = [synthetic_resume_pdf(i, args.seed) for i in range(batch_size)]
+        for concurrency in concurrency_levels:
+            paused = []
+            if "graph" in scenarios or "resume" in scenarios:
+                with RSSSampler() as rss:
+                    start = time.perf_counter()
+                    latencies, outputs, errors = bench_graph(app_module, pdfs, concurrency, args.seed)
+                    wall = time.perf_counter() - start
+                if "graph" in scenarios:
+                    rows.append(summarize("graph", batch_size, concurrency, latencies, wall, rss, errors))
+                paused = [thread_id for thread_id in outputs if thread_id]
+            if "process" in scenarios:
+                with RSSSampler() as rss:
+                    start = time.perf_counter()
+                    latencies, results, errors = bench_process(app_module, pdfs, concurrency)
+                    wall = time.perf_counter() - start
+                rows.append(summarize("process", batch_size, concurrency, latencies, wall, rss, errors))
+                paused += [result["thread_id"] for result in results if result.get("is_paused")]
+            if "resume" in scenarios and paused:
+                with RSSSampler() as rss:
+                    start = time.perf_counter()
+                    latencies, _, errors = bench_resume(app_module, paused, concurrency)
+                    wall = time.perf_counter() - start
+                rows.append(summarize("resume", len(paused), concurrency, latencies, wall, rss, errors))
+            print(f"---BENCHMARK: batch {batch_size}, concurrency {concurrency} done.---")
+
+    header = ["scenario", "batch_size", "concurrency", "p50_ms", "p95_ms", "throughput_per_s", "wall_s", "peak_rss_mb", "errors"]
+    print("\n" + " | ".join(header))
+    for row in rows:
+        print(" | ".join(str(row[column]) for column in header))
+    print(f"\nEmails accepted by the SMTP sink: {sink.messages}")
+    if args.json_path:
+        with open(args.json_path, "w") as handle:
+            json.dump({"settings": vars(args), "results": rows, "emails_sent": sink.messages}, handle, indent=2)
+    sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
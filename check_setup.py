@@ -1,4 +1,5 @@
 import os
+import subprocess
 import sys
 
 print("--- STARTING SETUP CHECK ---")
@@ -61,4 +62,45 @@ else:
     print("[ERROR] CRITICAL: The 'src' directory was NOT FOUND where expected.")
 
 
+# --- 7. Import-time profile ---
+# Each stage runs in a fresh interpreter with -X importtime, so nothing is cached between them.
+PROFILE_STAGES = [
+    ("App startup (create_app)", "import main; main.create_app()"),
+    ("First graph use (get_graph)", "import main; main.create_app(); main.get_graph()"),
+]
+PROFILE_TOP_MODULES = 10
+
+
+def profile_imports(label, code):
+    timed = f"import time; _start = time.perf_counter(); {code}; print(time.perf_counter() - _start)"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", timed],
+        cwd=project_root, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        error_lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        print(f"[ERROR] {label}: failed. {error_lines[-1] if error_lines else 'unknown error'}")
+        return
+    modules = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        # Only top-level imports (no nesting indentation) are listed.
+        if name.startswith(" ") and not name.startswith("  "):
+            modules.append((int(parts[1]), name.strip()))
+    seconds = float(result.stdout.strip().splitlines()[-1])
+    print(f"\n[INFO] {label}: {seconds:.3f}s, {len(modules)} top-level imports.")
+    for cumulative, name in sorted(modules, reverse=True)[:PROFILE_TOP_MODULES]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+
+
+if "--no-profile" not in sys.argv:
+    print("\n[INFO] Import-time profile (pass --no-profile to skip):")
+    for label, code in PROFILE_STAGES:
+        profile_imports(label, code)
+
+
 print("\n--- CHECK COMPLETE ---")
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Production server settings: `gunicorn -c gunicorn.conf.py main:app`.
+
+The app is loaded and the graph compiled once in the master, then the
+workers are forked from it and share that memory copy-on-write. Each worker
+runs a pool of threads, since requests spend most of their time waiting on
+the LLM API rather than on the CPU.
+
+Job progress, prompt-session statistics, traces, checkpoints and the other
+local stores are SQLite files in DATA_DIR shared by every worker, so GET
+/jobs/<id> (and its stream), /prompt_sessions, /traces and /resume work on
+whichever worker a request reaches. The default is one worker per CPU core.
+
+Rate limiting (LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, ...), the job
+pool (MAX_CONCURRENT_RESUMES) and the in-memory caches are per worker
+process: divide provider quotas by WEB_CONCURRENCY.
+"""
+import gc
+import os
+import signal
+import sys
+import time
+
+from src.core.settings import env_flag
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', 5001)}")
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "gthread"
+# Most of a request is spent waiting on the LLM, so threads are cheap relative to processes.
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+preload_app = env_flag("GUNICORN_PRELOAD", True)
+
+# A single screening call can take tens of seconds when the provider throttles.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 120))
+keepalive = 5
+# Recycling a worker interrupts the batches it runs, so it is off by default; jitter keeps workers from restarting together.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = 100
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before the workers fork.
+    if not preload_app:
+        return
+    import main
+    main.warm_up()
+    # Moves everything loaded so far out of the collector's view, so collections
+    # in the workers do not write to (and un-share) those pages.
+    gc.freeze()
+    server.log.info("Graph compiled in the master; workers share it copy-on-write.")
+
+
+def post_worker_init(worker):
+    # Notes when the worker is told to stop (SIGTERM), since graceful_timeout counts from there.
+    handle_exit = worker.handle_exit
+
+    def record_exit(sig, frame):
+        worker.exit_requested_at = getattr(worker, "exit_requested_at", None) or time.monotonic()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, record_exit)
+
+
+def worker_exit(server, worker):
+    # Runs in the worker once it stops taking requests: lets background
+    # /process batches finish before gunicorn kills it at graceful_timeout.
+    # They get SHUTDOWN_DRAIN_SECONDS, or less if finishing in-flight requests
+    # already used up most of graceful_timeout.
+    main = sys.modules.get("main")
+    if main is None:
+        return
+    elapsed = time.monotonic() - (getattr(worker, "exit_requested_at", None) or time.monotonic())
+    # A few seconds are kept back to commit checkpoints and close the SMTP session.
+    time_left = graceful_timeout - elapsed - 5
+    main.drain(max(0.0, min(main.SHUTDOWN_DRAIN_SECONDS, time_left)))
@@ -1,13 +1,14 @@
+import json
 import os
+import re
 import sys
+import threading
 import uuid
-import smtplib
-from flask import Flask, render_template, request, jsonify
+from concurrent.futures import Future
+from flask import Blueprint, Flask, render_template, request, jsonify, Response
 from dotenv import load_dotenv
 from email.mime.text import MIMEText
 
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from typing import TypedDict, Annotated, List, Dict
 import operator
 
@@ -15,18 +16,39 @@ project_root = os.path.dirname(os.path.abspath(__file__))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from src.utils.pdf_parser import parse_pdf_from_path
-from src.agents.job_posting_agent import generate_jd_from_notes
-from src.agents.resume_screening_agent import screen_resume_node
-from src.agents.candidate_communication_agent import draft_email_node, refine_email_with_feedback
-from src.agents.rejection_email_agent import draft_rejection_node
-from src.agents.summarization_agent import summarize_candidate_profile_node
-
+# Loaded before the src imports so module-level settings see values from .env.
 load_dotenv()
-app = Flask(__name__)
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
+# Only light modules are imported here. The agents (langchain_core, langchain_groq),
+# langgraph, the checkpointer and the numpy-backed ranking/talent pool are imported
+# on first use, so starting the app or a pre-forked worker stays fast.
+from src.utils.pdf_parser import parse_pdf_from_bytes, PDF_MAX_BYTES
+from src.core.jobs import JobManager, JobStore, ShuttingDownError, JOB_DB_PATH
+from src.core.concurrency import run_bounded
+from src.core.cache import llm_cache
+from src.core.blob_store import blob_store
+from src.core.decisions import decision_claims
+from src.core.dedup import dedup_history, find_duplicates, jd_key, DEDUP_ENABLED
+from src.core.drafts import draft_history, draft_update
+from src.core.llm_calls import limiter_stats
+from src.core.metrics import instrument_node, render_metrics, trace_context, trace_log
+from src.core.prompt_session import get_jd_session, jd_session_stats
+from src.core.settings import env_flag
+from src.utils.email_sender import close_smtp_sender, get_smtp_sender, SMTP_HOST, SMTP_USER, SMTP_PASS, SMTP_USE_TLS
+
+bp = Blueprint("hiring", __name__)
+# Upper bound on how many resumes of a single /process batch run through the graph at once.
+MAX_CONCURRENT_RESUMES = int(os.getenv("MAX_CONCURRENT_RESUMES", 4))
+# "combined" screens and summarizes in one LLM call; "separate" keeps the two-node path.
+SCREENING_MODE = os.getenv("SCREENING_MODE", "combined").strip().lower()
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", 3600))
+# Upper bound on how many reviewer decisions of one /resume/bulk call run at once.
+MAX_CONCURRENT_DECISIONS = int(os.getenv("MAX_CONCURRENT_DECISIONS", 8))
+# On shutdown, in-flight /process batches get this long to finish (gunicorn.conf.py keeps it under graceful_timeout).
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", 100))
+# Progress is saved to SQLite, so /jobs/<id> and its stream work on every worker process.
+job_manager = JobManager(max_workers=MAX_CONCURRENT_RESUMES, retention_seconds=JOB_RETENTION_SECONDS,
+                         store=JobStore(JOB_DB_PATH))
 
 def send_email_node(state):
     drafted_email = state.get("drafted_email", {})
@@ -34,164 +56,755 @@ def send_email_node(state):
 
     if not drafted_email or not recipient_email or "subject" not in drafted_email:
         return {"final_status": "Failed: Missing email subject, content, or recipient."}
+    if drafted_email.get("error"):
+        # Never send the placeholder body left behind by a failed draft.
+        return {"final_status": f"Failed: The email draft could not be generated ({drafted_email['error']})."}
     
-    smtp_server = os.getenv("SMTP_SERVER")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-
-    if not all([smtp_server, smtp_port, smtp_user, smtp_password]):
+    # SMTP_SERVER/SMTP_USER/SMTP_PASSWORD (falling back to the EMAIL_* names) are read by src.utils.email_sender.
+    if not SMTP_HOST or (SMTP_USE_TLS and not all([SMTP_USER, SMTP_PASS])):
         print("ERROR: Missing SMTP configuration in .env file.")
         return {"final_status": "Failed: SMTP configuration is missing."}
 
     try:
         msg = MIMEText(drafted_email["body"], 'html')
         msg['Subject'] = drafted_email["subject"]
-        msg['From'] = smtp_user
+        msg['From'] = SMTP_USER or os.getenv("EMAIL_FROM", "noreply@localhost")
         msg['To'] = recipient_email
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.send_message(msg)
-            print(f"Email successfully sent to {recipient_email}")
-            return {"final_status": "Email Sent Successfully"}
+        # The pooled sender keeps one authenticated session open across approvals.
+        get_smtp_sender().send_message(msg)
+        print(f"Email successfully sent to {recipient_email}")
+        return {"final_status": "Email Sent Successfully"}
     except Exception as e:
         print(f"ERROR: Failed to send email. {e}")
         return {"final_status": f"Failed to send email: {e}"}
 class AgentState(TypedDict):
+    # New threads only carry content-hash references; nodes fetch the texts from
+    # the blob store with state_text(). The inline fields remain for older threads.
+    job_description_ref: str
+    resume_content_ref: str
     job_description: str
     resume_content: str
     screening_results: dict
     candidate_summary: dict  # 👈 NEW FIELD for the structured JSON summary
     drafted_email: Dict[str, str]
+    # Every refinement or edit appends an entry; update_state only sends the new ones.
+    draft_versions: Annotated[List[dict], operator.add]
     final_status: str
     messages: Annotated[List[str], operator.add]
 
-workflow = StateGraph(AgentState)
-workflow.add_node("resume_screener", screen_resume_node)
-# 💡 NEW NODE: Add the summarization node
-workflow.add_node("profile_summarizer", summarize_candidate_profile_node)
-workflow.add_node("invitation_drafter", draft_email_node)
-workflow.add_node("rejection_drafter", draft_rejection_node)
-workflow.add_node("email_sender", send_email_node)
-
-workflow.set_entry_point("resume_screener")
-
-# 💡 UPDATED ROUTING FUNCTION: The routing now happens after summarization.
-# We first link the 'resume_screener' to the 'profile_summarizer'.
-workflow.add_edge("resume_screener", "profile_summarizer")
-
-
 # The conditional routing function remains the same, but its source node changes.
 def route_after_screening_and_summary(state):
+    from src.agents.resume_screening_agent import SCREENING_PASS_SCORE
+
+    # A resume that could not be screened ends here with a "Failed" status instead of being rejected.
+    if state.get("screening_results", {}).get("error"):
+        return "screening_failed"
     # This logic uses the score determined by the original 'resume_screener' node
     match_score = state.get("screening_results", {}).get("matchScore", 0)
-    return "invitation_drafter" if match_score >= 70 else "rejection_drafter"
-
-# 💡 UPDATED CONDITIONAL EDGE: Routing now starts from 'profile_summarizer'
-workflow.add_conditional_edges(
-    "profile_summarizer", 
-    route_after_screening_and_summary, 
-    {
-        "invitation_drafter": "invitation_drafter", 
-        "rejection_drafter": "rejection_drafter"
-    }
-)
-workflow.add_edge('invitation_drafter', 'email_sender')
-workflow.add_edge('rejection_drafter', 'email_sender')
-workflow.add_edge('email_sender', END)
-
-checkpointer = MemorySaver()
-recruitment_graph = workflow.compile(checkpointer=checkpointer, interrupt_before=["email_sender"])
-@app.route('/')
+    return "invitation_drafter" if match_score >= SCREENING_PASS_SCORE else "rejection_drafter"
+
+def build_graph():
+    """
+    Builds and compiles the recruitment graph together with its checkpointer.
+    This is where langgraph and the agent modules are first imported.
+    """
+    from langgraph.graph import StateGraph, END
+    from src.agents.resume_screening_agent import screen_resume_node, screen_and_summarize_node
+    from src.agents.candidate_communication_agent import draft_email_node
+    from src.agents.rejection_email_agent import draft_rejection_node
+    from src.agents.summarization_agent import summarize_candidate_profile_node
+    from src.core.checkpointer import build_checkpointer
+
+    workflow = StateGraph(AgentState)
+    if SCREENING_MODE == "separate":
+        workflow.add_node("resume_screener", instrument_node("resume_screener", screen_resume_node))
+        # 💡 NEW NODE: Add the summarization node
+        workflow.add_node("profile_summarizer", instrument_node("profile_summarizer", summarize_candidate_profile_node))
+    else:
+        # Screening and summary come back from a single structured LLM call.
+        workflow.add_node("resume_screener", instrument_node("resume_screener", screen_and_summarize_node))
+    workflow.add_node("invitation_drafter", instrument_node("invitation_drafter", draft_email_node))
+    workflow.add_node("rejection_drafter", instrument_node("rejection_drafter", draft_rejection_node))
+    workflow.add_node("email_sender", instrument_node("email_sender", send_email_node))
+
+    workflow.set_entry_point("resume_screener")
+
+    # 💡 UPDATED ROUTING FUNCTION: The routing now happens after summarization.
+    # In separate mode we first link the 'resume_screener' to the 'profile_summarizer'.
+    if SCREENING_MODE == "separate":
+        workflow.add_edge("resume_screener", "profile_summarizer")
+        routing_source = "profile_summarizer"
+    else:
+        routing_source = "resume_screener"
+
+    # 💡 UPDATED CONDITIONAL EDGE: Routing starts once both screening and summary are in the state.
+    workflow.add_conditional_edges(
+        routing_source, 
+        route_after_screening_and_summary, 
+        {
+            "invitation_drafter": "invitation_drafter", 
+            "rejection_drafter": "rejection_drafter",
+            "screening_failed": END,
+        }
+    )
+    workflow.add_edge('invitation_drafter', 'email_sender')
+    workflow.add_edge('rejection_drafter', 'email_sender')
+    workflow.add_edge('email_sender', END)
+
+    # Persistent by default (CHECKPOINTER_BACKEND=sqlite) so paused threads survive restarts and any worker can resume them.
+    checkpointer = build_checkpointer()
+    return workflow.compile(checkpointer=checkpointer, interrupt_before=["email_sender"]), checkpointer
+
+_graph_lock = threading.Lock()
+_graph = None
+_checkpointer = None
+
+def get_graph():
+    # Compiled on first use and shared by every request thread of this process.
+    global _graph, _checkpointer
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph, _checkpointer = build_graph()
+    return _graph
+
+def flush_graph_checkpoints():
+    from src.core.checkpointer import flush_checkpoints
+
+    flush_checkpoints(_checkpointer)
+
+def run_graph(input_state, config):
+    # Node, LLM and stage timings of this run are recorded under its thread_id (see /traces).
+    graph = get_graph()
+    try:
+        with trace_context(config["configurable"]["thread_id"]):
+            return graph.invoke(input_state, config)
+    finally:
+        flush_graph_checkpoints()
+
+def update_graph_state(config, values):
+    get_graph().update_state(config, values)
+    flush_graph_checkpoints()
+
+def warm_up():
+    # Imports the agents and compiles the graph now instead of on the first request.
+    # gunicorn.conf.py calls this in the master before forking, so workers share it copy-on-write.
+    get_graph()
+
+def drain(timeout=SHUTDOWN_DRAIN_SECONDS):
+    # Graceful shutdown of this process: refuse new batches, let in-flight ones finish,
+    # then commit buffered checkpoints and close the SMTP session.
+    print(f"---SHUTDOWN: Draining {job_manager.active_count()} in-flight job(s) (pid {os.getpid()}).---")
+    if not job_manager.drain(timeout):
+        print(f"ERROR: Jobs still running after {timeout:.0f}s; their paused threads resume from the last checkpoint.")
+    if _graph is not None:
+        flush_graph_checkpoints()
+    close_smtp_sender()
+
+def save_draft(config, current_state, source, feedback=None, **changes):
+    # Writes only the changed keys (the new draft and its history entries) instead of the whole state.
+    email = dict(current_state['drafted_email'], **changes)
+    email.pop('error', None)
+    update = draft_update(current_state, email, source, feedback)
+    update_graph_state(config, update)
+    current_state['drafted_email'] = email
+    current_state['draft_versions'] = (current_state.get('draft_versions') or []) + update['draft_versions']
+    return current_state
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/generate_jd', methods=['POST'])
+@bp.errorhandler(ShuttingDownError)
+def shutting_down(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+
+@bp.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: the worker answers requests. Nothing heavy is loaded or checked.
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+@bp.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: the graph is compiled (built here on first call), the model API key is set
+    # and the worker is not draining for shutdown.
+    checks = {"draining": job_manager.draining, "llm_api_key": bool(os.getenv("GROQ_API_KEY"))}
+    try:
+        get_graph()
+        checks["graph"] = "ok"
+    except Exception as e:
+        checks["graph"] = f"error: {e}"
+    ready = not checks["draining"] and checks["llm_api_key"] and checks["graph"] == "ok"
+    body = {"status": "ready" if ready else "not_ready", "pid": os.getpid(),
+            "jobs_in_flight": job_manager.active_count(), "checks": checks}
+    return jsonify(body), 200 if ready else 503
+
+@bp.route('/generate_jd', methods=['POST'])
 def generate_jd():
     data = request.get_json()
     notes = data.get('notes')
     if not notes:
         return jsonify({"error": "No notes were provided."}), 400
     try:
+        from src.agents.job_posting_agent import generate_jd_from_notes
+
         generated_jd = generate_jd_from_notes(notes)
         return jsonify({"job_description": generated_jd})
     except Exception as e:
         return jsonify({"error": "An internal server error occurred."}), 500
 
-@app.route('/process', methods=['POST'])
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def stream_tokens(chunks, on_complete=None):
+    # Forwards model output as "token" events while it is generated, then sends a
+    # "done" event carrying the full text (plus whatever on_complete returns).
+    def generate():
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield sse_event("token", {"text": chunk})
+            text = "".join(parts)
+            done = {"text": text}
+            if on_complete is not None:
+                done.update(on_complete(text))
+            yield sse_event("done", done)
+        except Exception as e:
+            print(f"ERROR: Streaming response failed. {e}")
+            yield sse_event("error", {"error": str(e)})
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(generate(), mimetype="text/event-stream", headers=headers)
+
+@bp.route('/generate_jd/stream', methods=['POST'])
+def generate_jd_stream():
+    data = request.get_json() or {}
+    notes = data.get('notes')
+    if not notes:
+        return jsonify({"error": "No notes were provided."}), 400
+    from src.agents.job_posting_agent import stream_jd_from_notes
+
+    return stream_tokens(stream_jd_from_notes(notes))
+
+@bp.route('/resume/refine/stream', methods=['POST'])
+def refine_stream():
+    # Streaming form of the "refine" decision: tokens reach the reviewer as they are
+    # generated and the paused thread is updated once the refined body is complete.
+    data = request.get_json() or {}
+    thread_id = data.get("thread_id")
+    feedback = data.get("feedback")
+    if not thread_id or not feedback:
+        return jsonify({"error": "thread_id and feedback are required"}), 400
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = get_graph().get_state(config)
+    current_state = snapshot.values if snapshot else {}
+    if not current_state.get('drafted_email'):
+        return jsonify({"error": "No drafted email to refine for this thread."}), 404
+
+    def save_refined_body(refined_body):
+        save_draft(config, current_state, "refine", feedback, body=refined_body)
+        return {"thread_id": thread_id, "is_paused": True, "state": current_state}
+
+    from src.agents.candidate_communication_agent import stream_refined_email
+
+    return stream_tokens(stream_refined_email(current_state['drafted_email']['body'], feedback), save_refined_body)
+
+def process_single_resume(job_description_text, item):
+    filename = item["filename"]
+    remember_resume(filename, item.get("resume_text"))
+    if item.get("duplicate"):
+        return duplicate_result(filename, item)
+    result = None
+    try:
+        result = screen_single_resume(job_description_text, item)
+        return result
+    finally:
+        # Hands the outcome to later copies of this resume in the batch and in future batches.
+        reusable = reusable_result(result) if result else {"error": "Screening did not finish."}
+        if item.get("shared_result") is not None:
+            item["shared_result"].set_result(reusable)
+        if item.get("fingerprint") is not None and result and result.get("thread_id") and not reusable.get("error"):
+            try:
+                dedup_history.record(jd_key(job_description_text), item["fingerprint"], filename, reusable)
+            except Exception as e:
+                print(f"ERROR: Could not record {filename} in the duplicate history. {e}")
+
+def screen_single_resume(job_description_text, item):
+    filename = item["filename"]
+    if item.get("prefilter", {}).get("selected") is False:
+        return prefiltered_result(filename, item)
+    if item.get("parse_error"):
+        return {"filename": filename, "error": item["parse_error"]}
+    try:
+        resume_text = item.get("resume_text")
+        if resume_text is None:
+            resume_text = parse_pdf_from_bytes(item["resume_bytes"], filename)
+            remember_resume(filename, resume_text)
+        if resume_text.startswith("Error:"):
+            # An unreadable upload is reported as is, not screened as if its error message were a resume.
+            return {"filename": filename, "error": resume_text[len("Error:"):].strip()}
+        thread_id = str(uuid.uuid4())
+        config = {"configurable": {"thread_id": thread_id}}
+        initial_state = graph_input(job_description_text, resume_text)
+        # Results from batch screening are handed in so the screening node can skip its LLM call.
+        initial_state.update(item.get("prescreened") or {})
+        final_state = run_graph(initial_state, config)
+        is_paused = "final_status" not in final_state
+        return {"filename": filename, "thread_id": thread_id, "is_paused": is_paused, "state": final_state}
+    except Exception as e:
+        return {"filename": filename, "error": str(e)}
+
+def graph_input(job_description_text, resume_text):
+    # Checkpoints hold references instead of the texts, so the JD shared by a whole batch is stored once.
+    return {"job_description_ref": blob_store.put(job_description_text), "resume_content_ref": blob_store.put(resume_text)}
+
+def remember_resume(filename, resume_text):
+    # Keeps parsed text in the local talent pool so later JDs can be matched without re-uploads.
+    if not resume_text or resume_text.startswith("Error:"):
+        return
+    try:
+        from src.core.resume_store import resume_store
+
+        resume_store.add_resume(filename, resume_text)
+    except Exception as e:
+        print(f"ERROR: Could not store resume {filename} in the talent pool. {e}")
+
+def prefiltered_result(filename, item):
+    # Resumes ranked below the pre-screening cut-off never reach the graph or the LLM.
+    from src.agents.resume_screening_agent import EMAIL_PATTERN
+
+    prefilter = item["prefilter"]
+    email_match = re.search(EMAIL_PATTERN, item.get("resume_text") or "")
+    screening_results = {
+        "candidateName": "N/A",
+        "candidateEmail": email_match.group(0) if email_match else "N/A",
+        "matchScore": 0,
+        "summary": f"Not sent to AI screening: ranked {prefilter['rank']} with relevance {prefilter['score']:.2f} against the job description.",
+    }
+    state = {"screening_results": screening_results, "final_status": "Skipped: below pre-screening cut-off"}
+    return {"filename": filename, "is_paused": False, "skipped": True, "prefilter": prefilter, "state": state}
+
+def reusable_result(result):
+    # The part of a screening outcome that a duplicate upload reuses.
+    state = result.get("state") or {}
+    screening_results = state.get("screening_results") or {}
+    if result.get("error") or screening_results.get("error"):
+        return {"error": result.get("error") or screening_results["error"]}
+    return {"thread_id": result.get("thread_id"), "screening_results": screening_results,
+            "final_status": state.get("final_status"), "is_paused": result.get("is_paused", False)}
+
+def duplicate_result(filename, item):
+    # Duplicates reuse the first copy's screening: no graph run, no LLM call, no second email.
+    # A copy of a resume earlier in the batch returns a Future that resolves once that one
+    # finishes, so it does not hold a job worker while it waits.
+    duplicate = item["duplicate"]
+    if duplicate.get("history"):
+        return reused_result(filename, duplicate, duplicate["result"])
+    resolved = Future()
+    item["original_result"].add_done_callback(
+        lambda original: resolved.set_result(reused_result(filename, duplicate, original.result()))
+    )
+    return resolved
+
+def reused_result(filename, duplicate, original):
+    info = {key: duplicate.get(key) for key in ("filename", "match", "distance", "screened_at") if duplicate.get(key) is not None}
+    info["thread_id"] = original.get("thread_id")
+    if original.get("error"):
+        return {"filename": filename, "duplicate": info,
+                "error": f"Duplicate of {duplicate['filename']}, which could not be screened: {original['error']}"}
+    state = {"screening_results": original["screening_results"],
+             "final_status": f"Skipped: duplicate of {duplicate['filename']} ({duplicate['match']} match)"}
+    return {"filename": filename, "is_paused": False, "skipped": True, "duplicate": info, "state": state}
+
+def prepare_resumes(job_description_text, items):
+    # Whole-batch stage of a /process job: parse every upload, collapse duplicates
+    # within the batch and against recent history (DEDUP_ENABLED), rank the rest
+    # locally (PREFILTER_ENABLED) and screen the short survivors together in token-budgeted
+    # batches (SCREENING_BATCH_SIZE > 1). Anything left without a batch result
+    # falls back to single screening inside the graph.
+    from src.agents.resume_screening_agent import screen_resumes_in_batches, SCREENING_BATCH_SIZE
+    from src.core.ranking import rank_resumes, select_for_screening, PREFILTER_ENABLED
+
+    texts = run_bounded(
+        lambda item: parse_pdf_from_bytes(item["resume_bytes"], item["filename"]),
+        items,
+        MAX_CONCURRENT_RESUMES,
+        # Kept (e.g. a PDFLimitError) so the per-resume stage reports it without parsing again.
+        on_error=lambda item, e: e,
+    )
+    screenable = [text if isinstance(text, str) and not text.startswith("Error:") else None for text in texts]
+
+    fingerprints, duplicates = [None] * len(items), [None] * len(items)
+    shared_results = {}
+    if DEDUP_ENABLED:
+        fingerprints, duplicates = find_duplicates(
+            job_description_text, screenable, [item.get("resume_bytes") for item in items]
+        )
+        for index, duplicate in enumerate(duplicates):
+            if duplicate is None:
+                continue
+            screenable[index] = None
+            if not duplicate.get("history"):
+                duplicate["filename"] = items[duplicate["index"]]["filename"]
+                shared_results.setdefault(duplicate["index"], Future())
+        if any(duplicates):
+            print(f"---DEDUP: {sum(1 for d in duplicates if d)} of {len(items)} resume(s) are duplicates and reuse an earlier screening.---")
+
+    selected = [text is not None for text in screenable]
+    prefilter = [None] * len(items)
+    if PREFILTER_ENABLED:
+        scores = rank_resumes(job_description_text, screenable)
+        for index, rank, keep in select_for_screening(scores):
+            if screenable[index] is not None:
+                prefilter[index] = {"score": scores[index], "rank": rank, "selected": keep}
+                selected[index] = keep
+        print(f"---PRE-FILTER: {sum(selected)} of {len(items)} resume(s) go on to LLM screening.---")
+
+    prescreened = [None] * len(items)
+    if SCREENING_BATCH_SIZE > 1:
+        prescreened = screen_resumes_in_batches(
+            job_description_text, [text if keep else None for text, keep in zip(screenable, selected)]
+        )
+
+    prepared = []
+    for index, (item, text) in enumerate(zip(items, texts)):
+        if isinstance(text, Exception):
+            prepared.append({"filename": item["filename"], "parse_error": str(text)})
+        elif duplicates[index] is not None:
+            original = shared_results.get(duplicates[index].get("index"))
+            prepared.append({"filename": item["filename"], "resume_text": text,
+                             "duplicate": duplicates[index], "original_result": original})
+        else:
+            prepared.append({"filename": item["filename"], "resume_text": text,
+                             "prescreened": prescreened[index], "prefilter": prefilter[index] or {},
+                             "fingerprint": fingerprints[index], "shared_result": shared_results.get(index)})
+    return prepared
+
+@bp.route('/process', methods=['POST'])
 def process():
     job_description_text = request.form.get('job_description_text')
     resume_files = request.files.getlist('resumes')
     if not job_description_text or not resume_files:
         return jsonify({"error": "Missing job description or resumes."}), 400
-    all_results = []
+    # Uploads are read into memory on the request thread; parsing and the graph run
+    # on the job workers (long PDFs are briefly spooled to a temp file for parallel parsing).
+    uploaded_resumes = []
     for resume_file in resume_files:
         if not resume_file.filename: continue
-        resume_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}_{resume_file.filename}")
-        resume_file.save(resume_path)
+        # Read one byte past the limit so oversized files are rejected without buffering them whole.
+        resume_bytes = resume_file.stream.read(PDF_MAX_BYTES + 1)
+        uploaded_resumes.append({"filename": resume_file.filename, "resume_bytes": resume_bytes})
+    from src.agents.resume_screening_agent import SCREENING_BATCH_SIZE
+    from src.core.ranking import PREFILTER_ENABLED
+
+    # Dedup also checks single uploads against history, so it always runs the whole-batch stage.
+    whole_batch_stage = DEDUP_ENABLED or ((SCREENING_BATCH_SIZE > 1 or PREFILTER_ENABLED) and len(uploaded_resumes) > 1)
+    # Render the JD prefix once up front; every node prompt for this batch starts with it.
+    jd_session = get_jd_session(job_description_text)
+    job = job_manager.submit(
+        lambda item: process_single_resume(job_description_text, item),
+        uploaded_resumes,
+        [item["filename"] for item in uploaded_resumes],
+        on_error=lambda item, e: {"filename": item["filename"], "error": str(e)},
+        prepare=(lambda items: prepare_resumes(job_description_text, items)) if whole_batch_stage else None,
+    )
+    return job_accepted_response(job, jd_session)
+
+UNKNOWN_JOB_ERROR = "Unknown job id. It may have expired."
+
+def job_accepted_response(job, jd_session=None):
+    # ?wait=true keeps the old blocking behaviour for scripted clients.
+    if request.args.get('wait', '').lower() in ('1', 'true', 'yes'):
+        job.wait()
+        return jsonify(job.to_dict()["results"])
+    accepted = {
+        "job_id": job.job_id,
+        "total": job.total,
+        "status_url": f"/jobs/{job.job_id}",
+        "stream_url": f"/jobs/{job.job_id}/stream",
+    }
+    if jd_session is not None:
+        accepted["prompt_stats_url"] = f"/prompt_sessions/{jd_session.jd_hash}"
+    return jsonify(accepted), 202
+
+def parse_top_k(data, default=20):
+    # Returns a positive int, or None if the client sent something else.
+    try:
+        top_k = int(data.get('top_k', default))
+    except (TypeError, ValueError):
+        return None
+    return top_k if top_k > 0 else None
+
+@bp.route('/talent_pool/search', methods=['POST'])
+def talent_pool_search():
+    data = request.get_json() or {}
+    job_description_text = data.get('job_description')
+    if not job_description_text:
+        return jsonify({"error": "job_description is required"}), 400
+    top_k = parse_top_k(data)
+    if top_k is None:
+        return jsonify({"error": "top_k must be a positive integer"}), 400
+    from src.core.resume_store import resume_store
+
+    return jsonify({"matches": resume_store.search(job_description_text, top_k=top_k)})
+
+@bp.route('/talent_pool/screen', methods=['POST'])
+def talent_pool_screen():
+    # Runs stored resumes (picked by hash, or the best top_k matches) through the
+    # graph for a new JD, without re-uploading or re-parsing any PDF.
+    data = request.get_json() or {}
+    job_description_text = data.get('job_description')
+    if not job_description_text:
+        return jsonify({"error": "job_description is required"}), 400
+    from src.core.resume_store import resume_store
+
+    content_hashes = data.get('content_hashes')
+    if not content_hashes:
+        top_k = parse_top_k(data)
+        if top_k is None:
+            return jsonify({"error": "top_k must be a positive integer"}), 400
+        content_hashes = [match["content_hash"] for match in resume_store.search(job_description_text, top_k=top_k)]
+    stored = resume_store.get_resumes(content_hashes)
+    if not stored:
+        return jsonify({"error": "No stored resumes matched."}), 404
+    items = [{"filename": r["filename"], "resume_text": r["text"]} for r in stored]
+    jd_session = get_jd_session(job_description_text)
+    job = job_manager.submit(
+        lambda item: process_single_resume(job_description_text, item),
+        items,
+        [item["filename"] for item in items],
+        on_error=lambda item, e: {"filename": item["filename"], "error": str(e)},
+    )
+    return job_accepted_response(job, jd_session)
+
+@bp.route('/talent_pool/resumes', methods=['DELETE'])
+def talent_pool_delete():
+    # Erasure of stored resumes, by content hash and/or by the candidate's email.
+    data = request.get_json(silent=True) or request.args
+    content_hash, email = data.get('content_hash'), data.get('email')
+    if not content_hash and not email:
+        return jsonify({"error": "content_hash or email is required"}), 400
+    from src.core.resume_store import resume_store
+
+    deleted = resume_store.delete(content_hash=content_hash, email=email)
+    return jsonify({"deleted": deleted}), 200 if deleted else 404
+
+@bp.route('/talent_pool/stats', methods=['GET'])
+def talent_pool_stats():
+    from src.core.resume_store import resume_store
+
+    return jsonify(resume_store.stats())
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": UNKNOWN_JOB_ERROR}), 404
+    include_results = request.args.get('results', 'true').lower() not in ('0', 'false', 'no')
+    return jsonify(job.to_dict(include_results=include_results))
+
+@bp.route('/jobs/<job_id>/stream', methods=['GET'])
+def job_stream(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": UNKNOWN_JOB_ERROR}), 404
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(job.iter_events(), mimetype="text/event-stream", headers=headers)
+
+@bp.route('/prompt_sessions/<jd_hash>', methods=['GET'])
+def prompt_session_stats(jd_hash):
+    stats = jd_session_stats(jd_hash)
+    if stats is None:
+        return jsonify({"error": "Unknown or expired prompt session."}), 404
+    return jsonify(stats)
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@bp.route('/traces/<thread_id>', methods=['GET'])
+def trace(thread_id):
+    spans = trace_log.get(thread_id)
+    if spans is None:
+        return jsonify({"error": "No trace recorded for this thread."}), 404
+    return jsonify({"thread_id": thread_id, "spans": spans})
+
+@bp.route('/screening/cascade', methods=['GET'])
+def screening_cascade_stats():
+    from src.agents.resume_screening_agent import cascade_stats
+
+    return jsonify(cascade_stats())
+
+@bp.route('/llm/limits', methods=['GET'])
+def llm_limits():
+    return jsonify(limiter_stats())
+
+@bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(llm_cache.stats())
+
+@bp.route('/drafts/<thread_id>', methods=['GET'])
+def drafts(thread_id):
+    snapshot = get_graph().get_state({"configurable": {"thread_id": thread_id}})
+    values = snapshot.values if snapshot else {}
+    if not values.get('drafted_email'):
+        return jsonify({"error": "No drafted email for this thread."}), 404
+    return jsonify({"thread_id": thread_id, "current": values['drafted_email'], "versions": draft_history(values)})
+
+@bp.route('/dedup/stats', methods=['GET'])
+def dedup_stats():
+    return jsonify(dedup_history.stats())
+
+@bp.route('/blobs/stats', methods=['GET'])
+def blob_stats():
+    return jsonify(blob_store.stats())
+
+def apply_decision(thread_id, decision, data):
+    # Applies one reviewer decision to a paused thread and returns (response body, HTTP status).
+    # Decisions on one thread run one at a time across all worker processes.
+    try:
+        token = decision_claims.claim(thread_id)
+    except Exception as e:
+        return {"error": f"Could not lock the workflow: {e}"}, 500
+    if token is None:
+        return {"error": "Another decision for this thread is in progress."}, 409
+    try:
+        return _apply_decision(thread_id, decision, data)
+    finally:
         try:
-            resume_text = parse_pdf_from_path(resume_path)
-            thread_id = str(uuid.uuid4())
-            config = {"configurable": {"thread_id": thread_id}}
-            initial_state = {"job_description": job_description_text, "resume_content": resume_text}
-            final_state = recruitment_graph.invoke(initial_state, config)
-            is_paused = "final_status" not in final_state
-            all_results.append({"filename": resume_file.filename, "thread_id": thread_id, "is_paused": is_paused, "state": final_state})
+            decision_claims.release(thread_id, token)
         except Exception as e:
-            all_results.append({"filename": resume_file.filename, "error": str(e)})
-        finally:
-            os.remove(resume_path)
-    return jsonify(all_results)
+            print(f"ERROR: Could not release the decision claim of thread {thread_id}. {e}")
 
-@app.route("/resume", methods=["POST"])
-def resume_workflow():
-    data = request.get_json()
-    thread_id = data.get('thread_id')
-    decision = data.get('decision')
-    if not thread_id or not decision:
-        return jsonify({"error": "thread_id and decision are required"}), 400
+def awaiting_email(config):
+    return "email_sender" in (get_graph().get_state(config).next or ())
+
+def not_awaiting_email_response(thread_id, config):
+    # The email was already sent (or the run ended another way): never run the sender twice.
+    state_values = get_graph().get_state(config).values
+    return {"error": "This workflow is not waiting for approval.", "thread_id": thread_id,
+            "is_paused": False, "state": state_values}, 409
+
+def _apply_decision(thread_id, decision, data):
     config = {"configurable": {"thread_id": thread_id}}
 
     if decision == "approve":
+        if not awaiting_email(config):
+            return not_awaiting_email_response(thread_id, config)
         try:
-            final_state = recruitment_graph.invoke(None, config)
-            return jsonify({"filename": "N/A", "thread_id": thread_id, "is_paused": False, "state": final_state})
+            final_state = run_graph(None, config)
+            return {"filename": "N/A", "thread_id": thread_id, "is_paused": False, "state": final_state}, 200
         except Exception as e:
-            return jsonify({"error": f"Failed to resume workflow: {e}"}), 500
+            return {"error": f"Failed to resume workflow: {e}"}, 500
 
     elif decision == "refine":
         feedback = data.get("feedback")
-        if not feedback: return jsonify({"error": "Feedback is required"}), 400
+        if not feedback: return {"error": "Feedback is required"}, 400
         try:
-            current_state = recruitment_graph.get_state(config).values
-            refined_body = refine_email_with_feedback(current_state['drafted_email']['body'], feedback)
-            current_state['drafted_email']['body'] = refined_body
-            recruitment_graph.update_state(config, current_state)
-            return jsonify({"filename": "N/A", "thread_id": thread_id, "is_paused": True, "state": current_state})
+            from src.agents.candidate_communication_agent import refine_email_with_feedback
+
+            current_state = get_graph().get_state(config).values
+            with trace_context(thread_id):
+                refined_body = refine_email_with_feedback(current_state['drafted_email']['body'], feedback)
+            save_draft(config, current_state, "refine", feedback, body=refined_body)
+            return {"filename": "N/A", "thread_id": thread_id, "is_paused": True, "state": current_state}, 200
         except Exception as e:
-            return jsonify({"error": f"Failed to refine email: {e}"}), 500
+            return {"error": f"Failed to refine email: {e}"}, 500
 
     elif decision == "reject":
-        state_values = recruitment_graph.get_state(config).values if recruitment_graph.get_state(config) else {}
+        state_values = get_graph().get_state(config).values if get_graph().get_state(config) else {}
         state_values['final_status'] = "Process Rejected by User"
-        return jsonify({"filename": "N/A", "thread_id": thread_id, "is_paused": False, "state": state_values})
+        return {"filename": "N/A", "thread_id": thread_id, "is_paused": False, "state": state_values}, 200
 
     elif decision == "manual_edit_and_send":
         edited_email_body = data.get("edited_email")
-        if not edited_email_body: return jsonify({"error": "Edited email is required"}), 400
-        
+        if not edited_email_body: return {"error": "Edited email is required"}, 400
+        if not awaiting_email(config):
+            return not_awaiting_email_response(thread_id, config)
       
-        current_state = recruitment_graph.get_state(config).values
-        
-        current_state['drafted_email']['body'] = edited_email_body
+        current_state = get_graph().get_state(config).values
         
-        recruitment_graph.update_state(config, current_state)
+        save_draft(config, current_state, "manual_edit", body=edited_email_body)
         
-        final_state = recruitment_graph.invoke(None, config)
-        return jsonify({"filename": "N/A", "thread_id": thread_id, "is_paused": False, "state": final_state})
+        final_state = run_graph(None, config)
+        return {"filename": "N/A", "thread_id": thread_id, "is_paused": False, "state": final_state}, 200
+    elif decision == "revert":
+        # Makes an earlier draft version current again (recorded as a new version).
+        try:
+            number = int(data.get("version"))
+        except (TypeError, ValueError):
+            return {"error": "version must be a draft version number"}, 400
+        current_state = get_graph().get_state(config).values
+        match = next((v for v in draft_history(current_state) if v["version"] == number), None)
+        if match is None or match["body"] is None:
+            return {"error": f"Draft version {number} not found"}, 404
+        save_draft(config, current_state, "revert", f"Reverted to version {number}",
+                   subject=match["subject"], body=match["body"])
+        return {"filename": "N/A", "thread_id": thread_id, "is_paused": True, "state": current_state}, 200
     else:
-        return jsonify({"error": "Invalid decision"}), 400
+        return {"error": "Invalid decision"}, 400
+
+def apply_decisions_concurrently(entries):
+    # Runs many decisions on a bounded pool; each entry gets its own outcome, in input order.
+    def _apply(entry):
+        thread_id = entry.get('thread_id')
+        decision = entry.get('decision')
+        if not thread_id or not decision:
+            body, status = {"error": "thread_id and decision are required"}, 400
+        else:
+            body, status = apply_decision(thread_id, decision, entry.get('payload') or entry)
+        return dict(body, thread_id=thread_id, decision=decision, status=status, ok=status == 200)
+
+    def _on_error(entry, e):
+        return {"thread_id": entry.get('thread_id'), "decision": entry.get('decision'),
+                "error": str(e), "status": 500, "ok": False}
+
+    return run_bounded(_apply, entries, MAX_CONCURRENT_DECISIONS, on_error=_on_error)
+
+@bp.route("/resume/bulk", methods=["POST"])
+def resume_bulk():
+    # Accepts {"decisions": [{"thread_id", "decision", "payload": {...}}, ...]}; the payload carries
+    # the same fields /resume expects (feedback, edited_email) and may also be given inline.
+    data = request.get_json() or {}
+    entries = data.get('decisions')
+    if not isinstance(entries, list) or not entries or not all(isinstance(e, dict) for e in entries):
+        return jsonify({"error": "decisions must be a non-empty list of objects"}), 400
+    results = apply_decisions_concurrently(entries)
+    summary = {"total": len(results), "succeeded": sum(1 for r in results if r.get("ok"))}
+    summary["failed"] = summary["total"] - summary["succeeded"]
+    return jsonify({"summary": summary, "results": results})
+
+@bp.route("/approve_bulk", methods=["POST"])
+def approve_bulk():
+    # Shortcut for approving a whole shortlist; emails go out over the pooled SMTP session.
+    data = request.get_json() or {}
+    thread_ids = data.get('thread_ids') or []
+    if not isinstance(thread_ids, list) or not thread_ids:
+        return jsonify({"error": "thread_ids must be a non-empty list"}), 400
+    return jsonify(apply_decisions_concurrently([{"thread_id": t, "decision": "approve"} for t in thread_ids]))
+
+@bp.route("/resume", methods=["POST"])
+def resume_workflow():
+    data = request.get_json()
+    thread_id = data.get('thread_id')
+    decision = data.get('decision')
+    if not thread_id or not decision:
+        return jsonify({"error": "thread_id and decision are required"}), 400
+    body, status = apply_decision(thread_id, decision, data)
+    return jsonify(body), status
+
+def create_app():
+    """
+    Application factory. Creating the app only imports Flask and the light
+    core modules; the graph, agents and model clients load on first use.
+    """
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    return app
+
+# Module-level app for `python main.py` and `gunicorn main:app`; `main:create_app()` works too.
+# Production: `gunicorn -c gunicorn.conf.py main:app` (pre-forked workers with threads).
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(port=5001, debug=True)
+    # Flask's development server; use gunicorn for real traffic.
+    app.run(port=int(os.getenv("PORT", 5001)), debug=env_flag("FLASK_DEBUG", True), threaded=True)
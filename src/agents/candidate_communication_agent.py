@@ -1,25 +1,41 @@
 import os
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_groq import ChatGroq
-from src.utils.helpers import clean_and_parse_json
-
-try:
-    llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0.1)
-except ImportError:
-    print("langchain_groq is not installed. Please install it with 'pip install langchain-groq'")
-    llm = None
-except Exception as e:
-    print(f"Could not initialize ChatGroq. Please check your GROQ_API_KEY. Error: {e}")
-    llm = None
+from src.core.blob_store import state_text
+from src.core.cache import llm_cache, make_cache_key
+from src.core.llm_calls import invoke_llm, stream_llm
+from src.core.llm_registry import get_llm, model_for
+from src.core.prompt_session import get_jd_session, task_prompt
+from src.core.structured_output import EMAIL_EDIT_SCHEMA, EMAIL_SCHEMA, StructuredOutputError, invoke_structured, validate
+
+DRAFTING_MODEL = model_for("invitation", "llama-3.3-70b-versatile")
+# Bump whenever draft_prompt_template changes so stale cached drafts are not reused.
+INVITATION_PROMPT_VERSION = "invitation-v2"
+# "diff" asks the model for targeted edits to the current draft and applies them locally;
+# "full" regenerates the whole body. Diff mode falls back to full when an edit does not apply.
+REFINEMENT_MODE = os.getenv("REFINEMENT_MODE", "diff").strip().lower()
+REFINEMENT_PROMPT_VERSION = "refinement-v1"
+
+
+def get_drafting_llm():
+    """
+    Returns the shared drafting model from the LLM registry, or None if it
+    cannot be created (missing package or API key).
+    """
+    try:
+        return get_llm(DRAFTING_MODEL, temperature=0.1)
+    except ImportError:
+        print("langchain_groq is not installed. Please install it with 'pip install langchain-groq'")
+    except Exception as e:
+        print(f"Could not initialize ChatGroq. Please check your GROQ_API_KEY. Error: {e}")
+    return None
 
 
-draft_prompt_template = ChatPromptTemplate.from_template(
+draft_prompt_template = task_prompt(
     """
-    You are a senior recruitment coordinator. Your task is to generate the content for a professional interview invitation email.
+    Acting as a senior recruitment coordinator, your task is to generate the content for a professional interview invitation email.
 
     **CRITICAL INSTRUCTIONS:**
-    1.  First, analyze the provided Job Description to identify the official **Job Title** and **Company Name**.
+    1.  First, analyze the Job Description above to identify the official **Job Title** and **Company Name**.
     2.  You MUST return a single, valid JSON object. Do not add any text before or after the JSON.
     3.  The JSON object must have exactly two keys: "subject" and "body".
     4.  **"subject" key:** The value must be a professional subject line in the format: "Invitation to Interview for [Extracted Job Title] at [Extracted Company Name]".
@@ -29,11 +45,6 @@ draft_prompt_template = ChatPromptTemplate.from_template(
     **Candidate's AI Summary:**
     "{summary}"
 
-    **Full Job Description:**
-    ---
-    {job_description}
-    ---
-
     **JSON Output:**
     """
 )
@@ -44,33 +55,34 @@ def draft_email_node(state):
     it as a structured JSON object with separate 'subject' and 'body' fields.
     """
     print("---NODE: DRAFTING STRUCTURED CANDIDATE EMAIL---")
+    llm = get_drafting_llm()
     if not llm:
         print("ERROR: LLM not initialized. Using fallback.")
-        return {"drafted_email": {"subject": "Update on your application", "body": "There was an error generating the email content due to LLM initialization failure."}}
+        return {"drafted_email": {"subject": "Update on your application", "body": "There was an error generating the email content due to LLM initialization failure.", "error": "LLM not initialized"}}
 
     screening_results = state.get("screening_results", {})
-    job_description = state.get("job_description", "")
+    job_description = state_text(state, "job_description", "")
     candidate_name = screening_results.get("candidateName", "Candidate")
     summary = screening_results.get("summary", "No summary available.")
-    
-    chain = draft_prompt_template | llm
+
+    cache_key = make_cache_key(job_description, candidate_name, summary, DRAFTING_MODEL, INVITATION_PROMPT_VERSION)
+    cached_email = llm_cache.get("invitation", cache_key)
+    if cached_email is not None:
+        print("---CACHE HIT: Reusing previously drafted invitation.---")
+        return {"drafted_email": cached_email}
     
     try:
-        response = chain.invoke({
-            "candidate_name": candidate_name,
-            "summary": summary,
-            "job_description": job_description
-        })
-        email_data = clean_and_parse_json(response.content)
-
-        if not email_data or "subject" not in email_data or "body" not in email_data:
-            raise ValueError("AI failed to generate valid email JSON.")
-
+        messages = get_jd_session(job_description).build_messages(
+            draft_prompt_template, candidate_name=candidate_name, summary=summary
+        )
+        email_data = invoke_structured(llm, messages, EMAIL_SCHEMA)
+        llm_cache.set("invitation", cache_key, email_data)
         return {"drafted_email": email_data}
 
     except Exception as e:
+        # The "error" key stops email_sender from sending this placeholder unless the reviewer edits or refines it.
         print(f"ERROR: Could not draft email. {e}. Using fallback.")
-        return {"drafted_email": {"subject": "Update on your application", "body": "There was an error generating the email content."}}
+        return {"drafted_email": {"subject": "Update on your application", "body": "There was an error generating the email content.", "error": str(e)}}
 
 
 
@@ -93,23 +105,134 @@ refinement_prompt_template = ChatPromptTemplate.from_messages(
 )
 
 
+refinement_edits_prompt_template = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are an expert hiring manager and a professional communication assistant. "
+            "Your task is to apply reviewer feedback to a draft email to a job candidate as targeted edits, "
+            "changing only what the feedback asks for. Maintain a professional, encouraging, and clear tone."
+        ),
+        (
+            "human",
+            "Apply the FEEDBACK to the DRAFT EMAIL below.\n\n"
+            "Return ONLY a JSON object of the form {{\"edits\": [{{\"find\": \"...\", \"replace\": \"...\"}}]}}. "
+            "Each \"find\" must be an exact excerpt of the draft (a phrase, sentence or paragraph) and \"replace\" its new text; "
+            "use an empty \"replace\" to delete it. To add text, include the neighbouring sentence in \"find\" and "
+            "repeat it in \"replace\" together with the addition. Keep the edits as small as the feedback allows.\n\n"
+            "FEEDBACK:\n---\n{feedback}\n---\n\n"
+            "DRAFT EMAIL:\n---\n{original_email}\n---\n\n"
+            "JSON Output:"
+        ),
+    ]
+)
+
+
+def apply_email_edits(body: str, edits: list):
+    """
+    Applies find/replace edits to an email body, in order. "replace" is used
+    exactly as given, so the paragraph breaks it carries are kept; "find" is
+    matched as given, or without its surrounding whitespace if that fails.
+
+    Returns:
+        The edited body, or None if an edit's "find" text is not in the body.
+    """
+    for edit in edits:
+        find = edit["find"]
+        if find not in body:
+            find = find.strip()
+        if not find.strip() or find not in body:
+            return None
+        body = body.replace(find, edit["replace"], 1)
+    return body
+
+
+def _refine_with_edits(llm, original_email: str, feedback: str):
+    messages = refinement_edits_prompt_template.format_messages(original_email=original_email, feedback=feedback)
+    try:
+        parsed = invoke_structured(llm, messages)
+        edits = [validate(edit, EMAIL_EDIT_SCHEMA, "edits[]") for edit in parsed.get("edits") or []]
+    except StructuredOutputError as e:
+        print(f"---REFINE: Could not read the edits ({e}). Regenerating the email.---")
+        return None
+    refined = apply_email_edits(original_email, edits) if edits else None
+    if refined is None:
+        print("---REFINE: The edits did not match the draft. Regenerating the email.---")
+    else:
+        print(f"---REFINE: Applied {len(edits)} edit(s) to the draft.---")
+    return refined
+
+
+def _refinement_cache_key(original_email: str, feedback: str) -> str:
+    return make_cache_key(original_email, feedback, DRAFTING_MODEL, REFINEMENT_PROMPT_VERSION)
+
+
 def refine_email_with_feedback(original_email: str, feedback: str) -> str:
     """
     Refines an email draft using the Groq LLM based on user feedback.
+
+    In REFINEMENT_MODE "diff" the model only returns targeted edits, which are
+    applied to the draft locally; the whole body is regenerated when they do
+    not apply. Results are cached per (draft, feedback).
+
+    Raises:
+        RuntimeError: If the drafting model could not be initialized.
+        Exception: The provider error once retries are exhausted, so the
+            caller keeps the current draft instead of an error message.
     """
+    cache_key = _refinement_cache_key(original_email, feedback)
+    cached = llm_cache.get("refinement", cache_key)
+    if cached is not None:
+        print("---CACHE HIT: Reusing previous refinement of this draft.---")
+        return cached
+
+    llm = get_drafting_llm()
     if not llm:
-        return "ERROR: LLM not initialized. Cannot refine email. Please check your API key and dependencies."
+        raise RuntimeError("LLM not initialized. Cannot refine email. Please check your API key and dependencies.")
 
     try:
-        refinement_chain = refinement_prompt_template | llm | StrOutputParser()
-
-        response = refinement_chain.invoke({
-            "original_email": original_email,
-            "feedback": feedback
-        })
+        response = _refine_with_edits(llm, original_email, feedback) if REFINEMENT_MODE == "diff" else None
+        if response is None:
+            messages = refinement_prompt_template.format_messages(original_email=original_email, feedback=feedback)
+            response = invoke_llm(llm, messages).content
+        llm_cache.set("refinement", cache_key, response)
         print(f"Successfully refined email based on feedback: '{feedback}'")
         return response
     except Exception as e:
         print(f"An error occurred during email refinement: {e}")
-        return f"An error occurred while trying to refine the email. Details: {e}"
+        raise
 
+
+def stream_refined_email(original_email: str, feedback: str):
+    """
+    Streaming variant of refine_email_with_feedback: yields the refined email
+    body piece by piece as the model produces it. In REFINEMENT_MODE "diff" the
+    targeted edits are tried first and their result is yielded in one piece;
+    only when they do not apply is the whole body regenerated and streamed.
+    Shares the (draft, feedback) cache.
+
+    Raises:
+        RuntimeError: If the drafting model could not be initialized.
+    """
+    cache_key = _refinement_cache_key(original_email, feedback)
+    cached = llm_cache.get("refinement", cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    llm = get_drafting_llm()
+    if not llm:
+        raise RuntimeError("LLM not initialized. Cannot refine email. Please check your API key and dependencies.")
+
+    refined = _refine_with_edits(llm, original_email, feedback) if REFINEMENT_MODE == "diff" else None
+    if refined is not None:
+        llm_cache.set("refinement", cache_key, refined)
+        yield refined
+        return
+
+    messages = refinement_prompt_template.format_messages(original_email=original_email, feedback=feedback)
+    parts = []
+    for chunk in stream_llm(llm, messages):
+        parts.append(chunk)
+        yield chunk
+    llm_cache.set("refinement", cache_key, "".join(parts))
@@ -1,22 +1,11 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
+from src.core.llm_calls import invoke_llm, stream_llm
+from src.core.llm_registry import get_llm, model_for
 
-def generate_jd_from_notes(notes: str) -> str:
-    """
-    Uses an LLM to expand brief notes into a full, professional job description
-    with clean formatting, suitable for direct use without markdown.
+JD_MODEL = model_for("job_posting", "llama-3.3-70b-versatile")
 
-    Args:
-        notes: Raw text notes from the user about the job requirements.
-
-    Returns:
-        A well-formatted and clean job description string.
+jd_prompt_template = ChatPromptTemplate.from_template(
     """
-    print("---AGENT: GENERATING CLEANLY FORMATTED JOB DESCRIPTION---")
-
-    llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0.5)
-
-    prompt_template = """
     You are an expert HR copywriter for a top technology company.
     Your mission is to take the following rough notes and transform them into a complete, professional, and engaging job description.
 
@@ -47,8 +36,37 @@ def generate_jd_from_notes(notes: str) -> str:
 
     **Generated Job Description (MUST follow the format above):**
     """
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | llm
-    response = chain.invoke({"notes": notes})
+)
+
+def generate_jd_from_notes(notes: str) -> str:
+    """
+    Uses an LLM to expand brief notes into a full, professional job description
+    with clean formatting, suitable for direct use without markdown.
+
+    Args:
+        notes: Raw text notes from the user about the job requirements.
+
+    Returns:
+        A well-formatted and clean job description string.
+    """
+    print("---AGENT: GENERATING CLEANLY FORMATTED JOB DESCRIPTION---")
+
+    llm = get_llm(JD_MODEL, temperature=0.5)
+
+    response = invoke_llm(llm, jd_prompt_template.format_messages(notes=notes))
     return response.content
 
+
+def stream_jd_from_notes(notes: str):
+    """
+    Streaming variant of generate_jd_from_notes: yields the job description
+    piece by piece as the model produces it.
+
+    Args:
+        notes: Raw text notes from the user about the job requirements.
+
+    Yields:
+        Text chunks of the generated job description, in order.
+    """
+    print("---AGENT: STREAMING JOB DESCRIPTION---")
+    yield from stream_llm(get_llm(JD_MODEL, temperature=0.5), jd_prompt_template.format_messages(notes=notes))
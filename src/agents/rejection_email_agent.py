@@ -1,33 +1,43 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from src.utils.helpers import clean_and_parse_json
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
 
-def draft_rejection_node(state):
-    """
-    This agent node drafts a polite and professional rejection email for
-    candidates who did not meet the minimum score.
+from src.core.blob_store import state_text
+from src.core.cache import llm_cache, make_cache_key
+from src.core.llm_registry import get_llm, model_for
+from src.core.prompt_session import get_jd_session, task_prompt
+from src.core.settings import env_flag
+from src.core.structured_output import EMAIL_SCHEMA, StructuredOutputError, invoke_structured, validate
 
-    Args:
-        state (AgentState): The current state of the graph.
+REJECTION_MODEL = model_for("rejection", "llama-3.3-70b-versatile")
+# Bump whenever the rejection prompt changes so stale cached drafts are not reused.
+REJECTION_PROMPT_VERSION = "rejection-v2"
+REJECTION_TEMPLATE_PROMPT_VERSION = "rejection-template-v1"
 
-    Returns:
-        dict: A dictionary containing the structured rejection email
-              (subject and body) to be added to the state.
-    """
-    print("---NODE: DRAFTING REJECTION EMAIL---")
+# By default one set of rejection templates is generated per JD and only the
+# candidate's name is filled in locally. Personalised mode drafts every email with its own LLM call.
+REJECTION_PERSONALIZED = env_flag("REJECTION_PERSONALIZED", False)
+REJECTION_TEMPLATE_VARIANTS = max(1, int(os.getenv("REJECTION_TEMPLATE_VARIANTS", 1)))
+MAX_REJECTION_TEMPLATE_JDS = 64
+# After a failed template generation, the JD's rejections go straight to personalised drafting for this long.
+REJECTION_TEMPLATE_RETRY_SECONDS = int(os.getenv("REJECTION_TEMPLATE_RETRY_SECONDS", 600))
 
-    screening_results = state.get("screening_results", {})
-    job_description = state.get("job_description", "")
-    
-    candidate_name = screening_results.get("candidateName", "Candidate")
+NAME_PLACEHOLDER = "[CANDIDATE_NAME]"
+FALLBACK_REJECTION = {"subject": "Update on your application", "body": "Thank you for your interest. We have decided to move forward with other candidates at this time."}
 
-    llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0.6)
+_templates_lock = threading.Lock()
+_templates = OrderedDict()
+_generation_locks = {}
+_template_failures = OrderedDict()
 
-    prompt_template = """
-    You are a senior recruitment coordinator. Your task is to draft a polite, respectful, and professional rejection email.
+rejection_prompt_template = task_prompt(
+    """
+    Acting as a senior recruitment coordinator, your task is to draft a polite, respectful, and professional rejection email.
 
     **CRITICAL INSTRUCTIONS:**
-    1.  Analyze the Job Description to identify the **Job Title** and **Company Name**.
+    1.  Analyze the Job Description above to identify the **Job Title** and **Company Name**.
     2.  You MUST return a single, valid JSON object with two keys: "subject" and "body".
     3.  **"subject" key:** Format is "Update on Your Application for [Extracted Job Title] at [Extracted Company Name]".
     4.  **"body" key:** The email body must be empathetic and professional. It should:
@@ -37,24 +47,168 @@ def draft_rejection_node(state):
         - Wish them the best in their job search.
         - Sign off as "The [Extracted Company Name] Hiring Team".
 
-    **Full Job Description:**
-    ---
-    {job_description}
-    ---
+    **JSON Output:**
+    """
+)
+
+rejection_templates_prompt = task_prompt(
+    """
+    Acting as a senior recruitment coordinator, your task is to write reusable rejection email templates for every candidate who applied to this role.
+
+    **CRITICAL INSTRUCTIONS:**
+    1.  Analyze the Job Description above to identify the **Job Title** and **Company Name**.
+    2.  Write exactly {variant_count} differently worded template(s). Each has a "subject" and a "body".
+    3.  **"subject":** Format is "Update on Your Application for [Extracted Job Title] at [Extracted Company Name]".
+    4.  **"body":** Empathetic and professional. Address the candidate with the literal placeholder {name_placeholder} (keep it exactly as written, it is replaced later). It should:
+        - Thank the candidate for their interest.
+        - State that while their profile is impressive, the team has decided to move forward with other candidates whose experience more closely matches the current requirements.
+        - Encourage them to apply for future roles.
+        - Wish them the best in their job search.
+        - Sign off as "The [Extracted Company Name] Hiring Team".
+    5.  You MUST return a single, valid JSON object of the form {{"templates": [{{"subject": "...", "body": "..."}}]}}, using double quotes for all keys and string values.
 
     **JSON Output:**
     """
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | llm
+)
 
-    response = chain.invoke({
-        "candidate_name": candidate_name,
-        "job_description": job_description
-    })
 
-    email_data = clean_and_parse_json(response.content)
+def _generate_rejection_templates(job_description: str) -> list:
+    cache_key = make_cache_key(
+        job_description, REJECTION_MODEL, REJECTION_TEMPLATE_PROMPT_VERSION, REJECTION_TEMPLATE_VARIANTS
+    )
+    cached = llm_cache.get("rejection_template", cache_key)
+    if cached is not None:
+        return cached
+
+    print(f"---GENERATING {REJECTION_TEMPLATE_VARIANTS} REJECTION TEMPLATE(S) FOR THIS JD---")
+    messages = get_jd_session(job_description).build_messages(
+        rejection_templates_prompt, variant_count=REJECTION_TEMPLATE_VARIANTS, name_placeholder=NAME_PLACEHOLDER
+    )
+    try:
+        parsed = invoke_structured(get_llm(REJECTION_MODEL, temperature=0.6), messages)
+    except Exception as e:
+        # Provider errors included: a rejection must never abort the graph run.
+        print(f"ERROR: Rejection template generation failed. {e}")
+        return []
+    entries = parsed.get("templates")
+    templates = []
+    for entry in entries if isinstance(entries, list) else []:
+        try:
+            entry = validate(entry, EMAIL_SCHEMA, "templates[]")
+        except StructuredOutputError:
+            continue
+        templates.append({"subject": entry["subject"], "body": entry["body"]})
+    if templates:
+        llm_cache.set("rejection_template", cache_key, templates)
+    return templates
+
+
+def get_rejection_templates(job_description: str) -> list:
+    """
+    Returns the rejection templates for a job description, generating them at
+    most once per JD even when many workers ask concurrently.
+
+    Args:
+        job_description: The job description text.
+
+    Returns:
+        A list of {"subject", "body"} templates containing NAME_PLACEHOLDER, or
+        an empty list if the model did not return usable templates. A failure
+        is remembered for REJECTION_TEMPLATE_RETRY_SECONDS, during which the
+        list is empty without another attempt.
+    """
+    jd_key = make_cache_key(job_description)
+    with _templates_lock:
+        if jd_key in _templates:
+            _templates.move_to_end(jd_key)
+            return _templates[jd_key]
+        if time.time() - _template_failures.get(jd_key, 0.0) < REJECTION_TEMPLATE_RETRY_SECONDS:
+            return []
+        generation_lock = _generation_locks.setdefault(jd_key, threading.Lock())
+
+    with generation_lock:
+        with _templates_lock:
+            if jd_key in _templates:
+                return _templates[jd_key]
+            if time.time() - _template_failures.get(jd_key, 0.0) < REJECTION_TEMPLATE_RETRY_SECONDS:
+                return []
+        templates = _generate_rejection_templates(job_description)
+        with _templates_lock:
+            _generation_locks.pop(jd_key, None)
+            if templates:
+                _templates[jd_key] = templates
+                _template_failures.pop(jd_key, None)
+                while len(_templates) > MAX_REJECTION_TEMPLATE_JDS:
+                    _templates.popitem(last=False)
+            else:
+                _template_failures[jd_key] = time.time()
+                _template_failures.move_to_end(jd_key)
+                while len(_template_failures) > MAX_REJECTION_TEMPLATE_JDS:
+                    _template_failures.popitem(last=False)
+        return templates
+
+
+def fill_rejection_template(templates: list, candidate_name: str) -> dict:
+    """
+    Picks a template variant (stable per candidate) and fills in the name.
+    """
+    digest = hashlib.sha256(candidate_name.encode("utf-8")).digest()
+    template = templates[digest[0] % len(templates)]
+    return {
+        "subject": template["subject"].replace(NAME_PLACEHOLDER, candidate_name),
+        "body": template["body"].replace(NAME_PLACEHOLDER, candidate_name),
+    }
+
+
+def draft_personalized_rejection(job_description: str, candidate_name: str) -> dict:
+    """
+    Drafts one rejection email with its own LLM call (REJECTION_PERSONALIZED mode).
+    """
+    cache_key = make_cache_key(job_description, candidate_name, REJECTION_MODEL, REJECTION_PROMPT_VERSION)
+    cached_email = llm_cache.get("rejection", cache_key)
+    if cached_email is not None:
+        print("---CACHE HIT: Reusing previously drafted rejection.---")
+        return cached_email
+
+    llm = get_llm(REJECTION_MODEL, temperature=0.6)
+
+    messages = get_jd_session(job_description).build_messages(rejection_prompt_template, candidate_name=candidate_name)
+    try:
+        email_data = invoke_structured(llm, messages, EMAIL_SCHEMA)
+    except Exception as e:
+        print(f"ERROR: {e}. Using fallback rejection.")
+        return dict(FALLBACK_REJECTION)
+
+    llm_cache.set("rejection", cache_key, email_data)
+    return email_data
+
+
+def draft_rejection_node(state):
+    """
+    This agent node drafts a polite and professional rejection email for
+    candidates who did not meet the minimum score. The email comes from the
+    JD's shared templates with the candidate's name filled in, unless
+    REJECTION_PERSONALIZED is set.
+
+    Args:
+        state (AgentState): The current state of the graph.
+
+    Returns:
+        dict: A dictionary containing the structured rejection email
+              (subject and body) to be added to the state.
+    """
+    print("---NODE: DRAFTING REJECTION EMAIL---")
+
+    screening_results = state.get("screening_results", {})
+    job_description = state_text(state, "job_description", "")
+    
+    candidate_name = screening_results.get("candidateName", "Candidate")
 
-    if not email_data or "subject" not in email_data or "body" not in email_data:
-        return {"drafted_email": {"subject": "Update on your application", "body": "Thank you for your interest. We have decided to move forward with other candidates at this time."}}
+    if REJECTION_PERSONALIZED:
+        return {"drafted_email": draft_personalized_rejection(job_description, candidate_name)}
 
-    return {"drafted_email": email_data}
+    templates = get_rejection_templates(job_description)
+    if not templates:
+        print("ERROR: No rejection template available. Drafting a personalised email instead.")
+        return {"drafted_email": draft_personalized_rejection(job_description, candidate_name)}
+    return {"drafted_email": fill_rejection_template(templates, candidate_name)}
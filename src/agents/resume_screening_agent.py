@@ -1,22 +1,175 @@
 import json
+import os
 import re
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from src.utils.helpers import clean_and_parse_json
+import threading
+from src.core.blob_store import state_text
+from src.core.cache import llm_cache, make_cache_key
+from src.core.llm_registry import get_llm, model_for
+from src.core.concurrency import run_bounded
+from src.core.metrics import registry
+from src.core.prompt_session import count_tokens, get_jd_session, task_prompt
+from src.core.settings import env_flag
+from src.core.structured_output import (
+    BATCH_ENTRY_SCHEMA, SCREENING_SCHEMA, SCREENING_WITH_PROFILE_SCHEMA, StructuredOutputError, invoke_structured, validate,
+)
+
+SCREENING_MODEL = model_for("screening", "qwen/qwen3-32b")
+# Bump whenever the screening prompt changes so stale cached results are not reused.
+SCREENING_PROMPT_VERSION = "screening-v3"
+SCREENING_SUMMARY_PROMPT_VERSION = "screening-summary-v3"
+SCREENING_BATCH_PROMPT_VERSION = "screening-batch-v3"
+
+# Candidates scoring at least this much get an invitation, everyone else a rejection.
+SCREENING_PASS_SCORE = int(os.getenv("SCREENING_PASS_SCORE", 70))
+# Cascade: a small, fast model screens first; only scores within SCREENING_CASCADE_MARGIN
+# of the pass score, low-confidence answers and failures are re-screened by SCREENING_MODEL.
+SCREENING_CASCADE_ENABLED = env_flag("SCREENING_CASCADE_ENABLED", False)
+SCREENING_SMALL_MODEL = model_for("screening_small", "llama-3.1-8b-instant")
+SCREENING_CASCADE_MARGIN = int(os.getenv("SCREENING_CASCADE_MARGIN", 10))
+SCREENING_CASCADE_MIN_CONFIDENCE = float(os.getenv("SCREENING_CASCADE_MIN_CONFIDENCE", 0.6))
+
+CASCADE_OUTCOMES = registry.counter(
+    "hiring_screening_cascade_total", "Screening cascade outcomes by escalation reason.", ("outcome", "reason")
+)
+_cascade_lock = threading.Lock()
+_cascade_stats = {"screened": 0, "escalated": 0, "reasons": {}}
+
+# Batch screening packs several short resumes against one JD into a single request.
+# A batch size of 1 disables it.
+SCREENING_BATCH_SIZE = int(os.getenv("SCREENING_BATCH_SIZE", 1))
+SCREENING_BATCH_TOKEN_BUDGET = int(os.getenv("SCREENING_BATCH_TOKEN_BUDGET", 12000))
+SCREENING_BATCH_MAX_RESUME_TOKENS = int(os.getenv("SCREENING_BATCH_MAX_RESUME_TOKENS", 2000))
+SCREENING_BATCH_CONCURRENCY = int(os.getenv("SCREENING_BATCH_CONCURRENCY", 2))
+
+EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+SCREENING_ERROR_RESULTS = { "candidateName": "Error", "candidateEmail": "N/A", "matchScore": 0, "summary": "Critical error: The AI model failed to generate valid structured data." }
+
+def screening_failure(reason: str) -> dict:
+    """
+    Node output for a resume that could not be screened. The "error" key routes
+    the thread to the end of the graph instead of to a rejection, and the
+    final status tells the reviewer why.
+    """
+    print(f"ERROR: Screening failed. {reason}")
+    return {
+        "screening_results": dict(SCREENING_ERROR_RESULTS, error=reason),
+        "final_status": f"Failed: the resume could not be screened ({reason}).",
+    }
+
+def apply_email_fallback(results: dict, resume_text: str) -> dict:
+    """
+    Fills in candidateEmail from the raw resume text with a regex when the
+    model could not extract it.
+    """
+    if results and (not results.get("candidateEmail") or results.get("candidateEmail") == "N/A"):
+        print("---AI failed to find email. Trying Regex fallback.---")
+        match = re.search(EMAIL_PATTERN, resume_text)
+        if match:
+            found_email = match.group(0)
+            print(f"---Regex found an email: {found_email}---")
+            results["candidateEmail"] = found_email
+    return results
+
+def escalation_reason(results: dict):
+    """
+    Decides whether a small-model screening result must be re-screened by the
+    large model.
+
+    Returns:
+        "borderline" when the score is within SCREENING_CASCADE_MARGIN of
+        SCREENING_PASS_SCORE, "low_confidence" when the model's own confidence
+        is below SCREENING_CASCADE_MIN_CONFIDENCE, otherwise None.
+    """
+    if abs(results["matchScore"] - SCREENING_PASS_SCORE) <= SCREENING_CASCADE_MARGIN:
+        return "borderline"
+    try:
+        confidence = float(results.get("confidence"))
+    except (TypeError, ValueError):
+        return None
+    return "low_confidence" if confidence < SCREENING_CASCADE_MIN_CONFIDENCE else None
+
+
+def record_cascade(outcome: str, reason: str = ""):
+    CASCADE_OUTCOMES.inc(outcome=outcome, reason=reason)
+    with _cascade_lock:
+        _cascade_stats["screened"] += 1
+        if outcome == "escalated":
+            _cascade_stats["escalated"] += 1
+            _cascade_stats["reasons"][reason] = _cascade_stats["reasons"].get(reason, 0) + 1
+
+
+def cascade_stats() -> dict:
+    with _cascade_lock:
+        stats = {"screened": _cascade_stats["screened"], "escalated": _cascade_stats["escalated"],
+                 "reasons": dict(_cascade_stats["reasons"])}
+    stats.update({
+        "enabled": SCREENING_CASCADE_ENABLED,
+        "small_model": SCREENING_SMALL_MODEL,
+        "large_model": SCREENING_MODEL,
+        "escalation_rate": round(stats["escalated"] / stats["screened"], 4) if stats["screened"] else 0.0,
+    })
+    return stats
 
-def screen_resume_node(state) -> dict:
-    print("---NODE: SCREENING RESUME (STRICT JSON MODE)---")
 
-    llm = ChatGroq(model_name="qwen/qwen3-32b", temperature=0.3)
-    
-    resume_text = state["resume_content"]
-    job_description_text = state["job_description"]
+def _screen_with_model(prompt, schema: dict, namespace: str, prompt_version: str, job_description: str, resume_text: str, model_name: str) -> dict:
+    cache_key = make_cache_key(job_description, resume_text, model_name, prompt_version)
+    cached = llm_cache.get(namespace, cache_key)
+    if cached is not None:
+        print(f"---CACHE HIT: Reusing previous {model_name} screening result.---")
+        return cached
 
-    prompt_template = """
-    You are an expert AI recruitment assistant. Your task is to analyze the provided Resume against the Job Description and return a structured JSON object.
+    messages = get_jd_session(job_description).build_messages(prompt, resume=resume_text)
+    results = invoke_structured(get_llm(model_name, temperature=0.3), messages, schema)
+    results["screeningModel"] = model_name
+    llm_cache.set(namespace, cache_key, results)
+    return results
+
+
+def cascade_screen(prompt, schema: dict, namespace: str, prompt_version: str, job_description: str, resume_text: str) -> dict:
+    """
+    Screens one resume, with the small model first when the cascade is enabled.
+
+    Args:
+        prompt: The compiled task prompt to send after the JD prefix.
+        schema: The structured-output schema the answer is validated against.
+        namespace: LLM cache namespace for the parsed results.
+        prompt_version: Prompt version included in the cache key.
+        job_description: The job description text.
+        resume_text: The resume text.
+
+    Returns:
+        The parsed screening results, with "screeningModel" naming the model
+        whose answer was kept.
+
+    Raises:
+        Exception: If the final (large) model call fails or returns no usable score.
+    """
+    if not SCREENING_CASCADE_ENABLED:
+        return _screen_with_model(prompt, schema, namespace, prompt_version, job_description, resume_text, SCREENING_MODEL)
+
+    try:
+        results = _screen_with_model(prompt, schema, namespace, prompt_version, job_description, resume_text, SCREENING_SMALL_MODEL)
+        reason = escalation_reason(results)
+    except Exception as e:
+        print(f"---CASCADE: Small model failed ({e}).---")
+        reason = "small_model_failed"
+    if reason is None:
+        record_cascade("accepted")
+        return results
+
+    print(f"---CASCADE: Escalating to {SCREENING_MODEL} ({reason}).---")
+    record_cascade("escalated", reason)
+    return _screen_with_model(prompt, schema, namespace, prompt_version, job_description, resume_text, SCREENING_MODEL)
+
+
+# The JD is sent first by the shared JD session prefix; these task prompts only hold
+# the instructions and the per-candidate content that follows it.
+screening_task_prompt = task_prompt(
+    """
+    Your task is to analyze the provided Resume against the Job Description above and return a structured JSON object.
 
     **CRITICAL INSTRUCTIONS:**
-    1.  **Analyze Content:** Extract the candidate's full name, their email address, calculate a "matchScore" (0-100), and write a necessary content "summary".
+    1.  **Analyze Content:** Extract the candidate's full name, their email address, calculate a "matchScore" (0-100), write a necessary content "summary", and give a "confidence" (0.0-1.0) in your score.
     2.  **JSON FORMATTING IS MANDATORY:** You MUST return ONLY a single, valid JSON object.
     3.  **USE DOUBLE QUOTES:** All keys and all string values in the JSON object MUST be enclosed in double quotes (").
 
@@ -25,39 +178,260 @@ def screen_resume_node(state) -> dict:
         "candidateName": "Pradeepa Murugesan",
         "candidateEmail": "pradeepa.m@example.com",
         "matchScore": 85,
-        "summary": "Pradeepa is a strong candidate with 5 years of Python experience, aligning well with the job requirements. Her skills in AWS and Machine Learning are particularly relevant."
+        "summary": "Pradeepa is a strong candidate with 5 years of Python experience, aligning well with the job requirements. Her skills in AWS and Machine Learning are particularly relevant.",
+        "confidence": 0.9
     }}
 
-    **Job Description:**
-    {job_description}
+    **Full Resume Text:**
+    {resume}
+
+    **JSON Output (Must use double quotes):**
+    """
+)
+
+
+def screen_resume_node(state) -> dict:
+    print("---NODE: SCREENING RESUME (STRICT JSON MODE)---")
+
+    if state.get("screening_results"):
+        print("---Screening result already provided by batch screening.---")
+        return {"screening_results": state["screening_results"]}
+
+    try:
+        resume_text = state_text(state, "resume_content")
+        job_description_text = state_text(state, "job_description")
+        results = cascade_screen(
+            screening_task_prompt, SCREENING_SCHEMA, "screening", SCREENING_PROMPT_VERSION, job_description_text, resume_text
+        )
+    except Exception as e:
+        return screening_failure(str(e))
+
+    return {"screening_results": apply_email_fallback(dict(results), resume_text)}
+
+
+screen_and_summarize_prompt = task_prompt(
+    """
+    Your task is to analyze the provided Resume against the Job Description above, score the candidate and summarize their profile in ONE structured JSON object.
+
+    **CRITICAL INSTRUCTIONS:**
+    1.  **Screening:** Extract the candidate's full name ("candidateName"), their email address ("candidateEmail"), calculate a "matchScore" (0-100), write a short "summary" of their fit, and give a "confidence" (0.0-1.0) in your score.
+    2.  **Profile:** Under the "profile" key, return:
+        - "top_skills_matched": A list of 3-5 specific, high-value skills the candidate possesses that directly match the JD.
+        - "experience_gaps": A list of 1-3 critical areas where the candidate falls short of the JD's requirements. If none, list "None significant".
+        - "key_accomplishments": A list of 2-3 strongest, quantifiable achievements from the resume.
+        - "overall_fit_comment": A 1-2 sentence quick note on the candidate's general fit.
+    3.  **JSON FORMATTING IS MANDATORY:** You MUST return ONLY a single, valid JSON object, using double quotes (") for all keys and string values.
+
+    **EXAMPLE OF A PERFECT OUTPUT:**
+    {{
+        "candidateName": "Pradeepa Murugesan",
+        "candidateEmail": "pradeepa.m@example.com",
+        "matchScore": 85,
+        "summary": "Pradeepa is a strong candidate with 5 years of Python experience, aligning well with the job requirements.",
+        "confidence": 0.9,
+        "profile": {{
+            "top_skills_matched": ["Python Development", "Cloud Architecture (AWS)", "CI/CD Automation"],
+            "experience_gaps": ["Requires 7 years, candidate has 5."],
+            "key_accomplishments": ["Reduced cloud costs by 20% by refactoring legacy services."],
+            "overall_fit_comment": "Excellent core skills, slightly less tenure than required."
+        }}
+    }}
 
     **Full Resume Text:**
     {resume}
 
     **JSON Output (Must use double quotes):**
     """
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | llm
+)
 
-    response = chain.invoke({
-        "job_description": job_description_text,
-        "resume": resume_text
-    })
 
-    results = clean_and_parse_json(response.content)
+def screen_and_summarize_node(state) -> dict:
+    """
+    Screens the resume and builds the structured candidate summary in a single
+    LLM round-trip, so the JD and resume are only sent to the model once.
 
-    if results and (not results.get("candidateEmail") or results.get("candidateEmail") == "N/A"):
-        print("---AI failed to find email. Trying Regex fallback.---")
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        match = re.search(email_pattern, resume_text)
-        if match:
-            found_email = match.group(0)
-            print(f"---Regex found an email: {found_email}---")
-            results["candidateEmail"] = found_email
+    Args:
+        state (AgentState): The current state of the graph.
+
+    Returns:
+        dict: "screening_results" (name, email, matchScore, summary) and
+              "candidate_summary" (skills, gaps, accomplishments, fit comment).
+    """
+    print("---NODE: SCREENING + SUMMARIZING RESUME (SINGLE CALL)---")
+
+    if state.get("screening_results") and state.get("candidate_summary"):
+        print("---Screening result already provided by batch screening.---")
+        return {"screening_results": state["screening_results"], "candidate_summary": state["candidate_summary"]}
+
+    try:
+        resume_text = state_text(state, "resume_content")
+        job_description_text = state_text(state, "job_description")
+        results = dict(cascade_screen(
+            screen_and_summarize_prompt, SCREENING_WITH_PROFILE_SCHEMA, "screening_summary", SCREENING_SUMMARY_PROMPT_VERSION, job_description_text, resume_text
+        ))
+    except Exception as e:
+        return dict(screening_failure(str(e)), candidate_summary={"error": "Screening failed."})
+
+    profile = results.pop("profile")
+    results = apply_email_fallback(results, resume_text)
+
+    return {"screening_results": results, "candidate_summary": profile}
+
+
+BATCH_SCREENING_TEMPLATE = """
+    Your task is to analyze SEVERAL resumes against the Job Description above and return one structured result per resume.
+
+    **CRITICAL INSTRUCTIONS:**
+    1.  Each resume below starts with a header "=== RESUME <number> ===". Screen every resume independently.
+    2.  For each resume extract "candidateName", "candidateEmail", calculate a "matchScore" (0-100), write a short "summary" of their fit and give a "confidence" (0.0-1.0) in your score.
+    3.  Under "profile" return "top_skills_matched" (3-5 items), "experience_gaps" (1-3 items, or "None significant"), "key_accomplishments" (2-3 items) and "overall_fit_comment" (1-2 sentences).
+    4.  Copy the resume number into an "index" key so results can be matched back to their resume.
+    5.  **JSON FORMATTING IS MANDATORY:** Return ONLY a single JSON object of the form {{"results": [...]}} with exactly one entry per resume, using double quotes for all keys and string values.
+
+    **EXAMPLE OF A PERFECT OUTPUT:**
+    {{
+        "results": [
+            {{
+                "index": 1,
+                "candidateName": "Pradeepa Murugesan",
+                "candidateEmail": "pradeepa.m@example.com",
+                "matchScore": 85,
+                "summary": "Strong Python background that aligns well with the job requirements.",
+                "confidence": 0.9,
+                "profile": {{
+                    "top_skills_matched": ["Python Development", "Cloud Architecture (AWS)", "CI/CD Automation"],
+                    "experience_gaps": ["None significant"],
+                    "key_accomplishments": ["Reduced cloud costs by 20% by refactoring legacy services."],
+                    "overall_fit_comment": "Excellent core skills for the role."
+                }}
+            }}
+        ]
+    }}
+
+    **Resumes:**
+    {resumes}
+
+    **JSON Output (Must use double quotes):**
+    """
+batch_screening_prompt = task_prompt(BATCH_SCREENING_TEMPLATE)
+
+
+def plan_screening_batches(job_description: str, resume_texts: dict) -> list:
+    """
+    Greedily packs resumes into batches that fit SCREENING_BATCH_TOKEN_BUDGET
+    together with one copy of the JD. Resumes that are too long to share a
+    request are left out and go through single screening.
+
+    Args:
+        job_description: The job description shared by every resume.
+        resume_texts: Mapping of resume index to resume text.
+
+    Returns:
+        A list of batches, each a list of resume indexes with at least two entries.
+    """
+    session = get_jd_session(job_description)
+    budget = SCREENING_BATCH_TOKEN_BUDGET - session.prefix_tokens - count_tokens(BATCH_SCREENING_TEMPLATE)
+    batches, current, used = [], [], 0
+    for index, text in resume_texts.items():
+        cost = count_tokens(text)
+        if cost > SCREENING_BATCH_MAX_RESUME_TOKENS or cost > budget:
+            continue
+        if current and (len(current) >= SCREENING_BATCH_SIZE or used + cost > budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return [batch for batch in batches if len(batch) > 1]
+
+
+def batch_screening_model() -> str:
+    # With the cascade on, batches go to the small model and borderline entries are re-screened singly.
+    return SCREENING_SMALL_MODEL if SCREENING_CASCADE_ENABLED else SCREENING_MODEL
+
+
+def _screen_batch(job_description: str, batch: list, resume_texts: dict) -> dict:
+    resumes_block = "\n\n".join(
+        f"=== RESUME {position} ===\n{resume_texts[index]}" for position, index in enumerate(batch, start=1)
+    )
+    messages = get_jd_session(job_description).build_messages(batch_screening_prompt, resumes=resumes_block)
+    model_name = batch_screening_model()
+    parsed = invoke_structured(get_llm(model_name, temperature=0.3), messages)
+    entries = parsed.get("results")
+
+    screened = {}
+    for entry in entries if isinstance(entries, list) else []:
+        # Entries are validated one by one so a single malformed one only sends its resume to single screening.
+        try:
+            entry = validate(entry, BATCH_ENTRY_SCHEMA, "results[]")
+        except StructuredOutputError:
+            continue
+        position = entry.pop("index")
+        if not 1 <= position <= len(batch) or batch[position - 1] in screened:
+            continue
+        index = batch[position - 1]
+        profile = entry.pop("profile")
+        entry["screeningModel"] = model_name
+        entry = apply_email_fallback(entry, resume_texts[index])
+        screened[index] = {"screening_results": entry, "candidate_summary": profile}
+    return screened
+
+
+def screen_resumes_in_batches(job_description: str, resume_texts: list) -> list:
+    """
+    Screens many resumes against one JD with as few LLM requests as possible.
+
+    Cached results are reused, the remaining short resumes are packed into
+    token-budgeted batches, and each batch is screened in a single structured
+    request. Any resume that cannot be batched, or whose entry is missing or
+    malformed in the batch response, is returned as None so the caller falls
+    back to single screening for it.
+
+    Args:
+        job_description: The job description shared by every resume.
+        resume_texts: Resume texts; None entries are skipped.
+
+    Returns:
+        A list aligned with `resume_texts` holding either a dictionary with
+        "screening_results" and "candidate_summary", or None.
+    """
+    results = [None] * len(resume_texts)
+    if SCREENING_BATCH_SIZE <= 1:
+        return results
+
+    cache_keys, pending = {}, {}
+    for index, text in enumerate(resume_texts):
+        if not text:
+            continue
+        cache_keys[index] = make_cache_key(job_description, text, batch_screening_model(), SCREENING_BATCH_PROMPT_VERSION)
+        cached = llm_cache.get("screening_summary", cache_keys[index])
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending[index] = text
+
+    batches = plan_screening_batches(job_description, pending)
+    print(f"---BATCH SCREENING: {sum(len(b) for b in batches)} resume(s) in {len(batches)} request(s).---")
+
+    def _run(batch):
+        return _screen_batch(job_description, batch, pending)
 
-    if not results:
-        print("ERROR: AI failed to produce valid JSON.")
-        results = { "candidateName": "Error", "candidateEmail": "N/A", "matchScore": 0, "summary": "Critical error: The AI model failed to generate valid structured data." }
-        
-    return {"screening_results": results}
+    def _on_error(batch, e):
+        print(f"ERROR: Batch screening failed for {len(batch)} resume(s); falling back to single screening. {e}")
+        return {}
 
+    for screened in run_bounded(_run, batches, SCREENING_BATCH_CONCURRENCY, on_error=_on_error):
+        for index, output in screened.items():
+            if SCREENING_CASCADE_ENABLED and escalation_reason(output["screening_results"]):
+                # Left for single screening, which finds this small-model answer in its
+                # cache and goes straight to the large model.
+                raw = dict(output["screening_results"], profile=output["candidate_summary"])
+                small_key = make_cache_key(job_description, pending[index], SCREENING_SMALL_MODEL, SCREENING_SUMMARY_PROMPT_VERSION)
+                llm_cache.set("screening_summary", small_key, raw)
+                continue
+            if SCREENING_CASCADE_ENABLED:
+                record_cascade("accepted")
+            results[index] = output
+            llm_cache.set("screening_summary", cache_keys[index], output)
+    return results
@@ -1,29 +1,20 @@
 # src/agents/summarization_agent.py
 
-# Assuming you have an LLM setup accessible, e.g., via a utility function
-# from src.utils.llm_chain import get_llm_chain, get_json_parser 
+from src.core.blob_store import state_text
+from src.core.cache import llm_cache, make_cache_key
+from src.core.llm_registry import get_llm, model_for
+from src.core.prompt_session import get_jd_session, task_prompt
+from src.core.structured_output import PROFILE_SCHEMA, invoke_structured
 
-def summarize_candidate_profile_node(state: dict) -> dict:
-    """
-    Agent to generate a structured JSON summary of the candidate's profile
-    based on the JD and resume content.
-    """
-    job_description = state.get("job_description")
-    resume_content = state.get("resume_content")
-    screening_results = state.get("screening_results", {}) # Use results for context
-
-    if not job_description or not resume_content:
-        return {"candidate_summary": {"error": "Missing JD or resume content for summarization."}}
+SUMMARY_MODEL = model_for("summary", "qwen/qwen3-32b")
+# Bump whenever the summary prompt changes so stale cached summaries are not reused.
+SUMMARY_PROMPT_VERSION = "summary-v2"
 
-    prompt_template = """
-    You are an expert HR summarization agent. Your task is to analyze a job description and a candidate's resume, 
+summary_prompt_template = task_prompt(
+    """
+    Acting as an expert HR summarization agent, your task is to analyze the candidate's resume against the Job Description above,
     and produce a structured JSON summary that highlights the candidate's fit.
 
-    Job Description:
-    ---
-    {job_description}
-    ---
-
     Candidate Resume Text:
     ---
     {resume_content}
@@ -36,39 +27,50 @@ def summarize_candidate_profile_node(state: dict) -> dict:
     2. "experience_gaps": A list of 1-3 critical areas (skills, experience, or years) where the candidate seems to fall short of the JD's requirements. If none, list "None significant".
     3. "key_accomplishments": A list of 2-3 strongest, quantifiable achievements from the resume.
     4. "overall_fit_comment": A 1-2 sentence quick note on the candidate's general fit.
+
+    Return ONLY the JSON object, using double quotes for all keys and string values.
     """
-    
-    # Placeholder for your LLM call logic
-    # Replace this block with your actual LLM integration
+)
+
+def summarize_candidate_profile_node(state: dict) -> dict:
+    """
+    Agent to generate a structured JSON summary of the candidate's profile
+    based on the JD and resume content.
+
+    This is the second LLM call of the two-node (SCREENING_MODE=separate)
+    path; the default combined path gets the same summary from
+    screen_and_summarize_node instead.
+    """
+    print("---NODE: SUMMARIZING CANDIDATE PROFILE---")
+    existing_summary = state.get("candidate_summary")
+    if existing_summary and not existing_summary.get("error"):
+        # Batch screening already produced the summary; nothing left to ask the model.
+        print("---SUMMARY: Reusing the summary from batch screening.---")
+        return {"candidate_summary": existing_summary}
+    job_description = state_text(state, "job_description", None)
+    resume_content = state_text(state, "resume_content", None)
+    screening_results = state.get("screening_results", {}) # Use results for context
+
+    if not job_description or not resume_content:
+        return {"candidate_summary": {"error": "Missing JD or resume content for summarization."}}
+    if screening_results.get("error"):
+        return {"candidate_summary": {"error": "Skipped because screening failed."}}
+
+    match_score = screening_results.get("matchScore", "N/A")
+    cache_key = make_cache_key(job_description, resume_content, match_score, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION)
+    cached_summary = llm_cache.get("summary", cache_key)
+    if cached_summary is not None:
+        print("---CACHE HIT: Reusing previous candidate summary.---")
+        return {"candidate_summary": cached_summary}
+
     try:
-        # Example using f-string formatting and assumed LLM utilities
-        # chain = get_llm_chain(prompt_template, output_parser=get_json_parser())
-        
-        input_data = {
-            "job_description": job_description,
-            "resume_content": resume_content,
-            "match_score": screening_results.get("matchScore", "N/A")
-        }
-        
-        # Simulate LLM response for demonstration
-        # result = chain.invoke(input_data)
-        
-        # Simulated Summary
-        summary = {
-            "top_skills_matched": ["Python Development", "Cloud Architecture (AWS)", "CI/CD Automation"],
-            "experience_gaps": ["Requires 7 years, candidate has 5.", "Missing experience with specific framework X."],
-            "key_accomplishments": ["Reduced cloud costs by 20% by refactoring legacy services.", "Led a team of 4 junior developers on project Y."],
-            "overall_fit_comment": f"Excellent core skills, slightly less tenure than required for this senior role, as indicated by the match score of {screening_results.get('matchScore', 0)}."
-        }
+        messages = get_jd_session(job_description).build_messages(
+            summary_prompt_template, resume_content=resume_content, match_score=match_score
+        )
+        summary = invoke_structured(get_llm(SUMMARY_MODEL, temperature=0.3), messages, PROFILE_SCHEMA)
+        llm_cache.set("summary", cache_key, summary)
+        return {"candidate_summary": summary}
 
-        # End of simulated response
-        
-        # return {"candidate_summary": result}
-        return {"candidate_summary": summary} # Returning simulated data
-    
     except Exception as e:
         print(f"Error generating candidate summary: {e}")
         return {"candidate_summary": {"error": f"Failed to generate summary: {e}"}}
-
-# Note: You must ensure 'screen_resume_node' and other agents are configured
-# to successfully use your LLM framework (e.g., LangChain)
\ No newline at end of file
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from src.core.storage import connect_sqlite
+from src.core.settings import data_path
+
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH") or data_path("blobs.sqlite3")
+# Recently used texts stay decompressed in memory, so the JD shared by a whole batch is read from disk once.
+BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Blobs unused for this long are deleted. Keep it above CHECKPOINT_ABANDONED_TTL_SECONDS
+# so every thread that can still be resumed finds its texts.
+BLOB_TTL_SECONDS = int(os.getenv("BLOB_TTL_SECONDS", 30 * 24 * 3600))
+BLOB_TOUCH_INTERVAL_SECONDS = 3600
+BLOB_PRUNE_INTERVAL_SECONDS = 3600
+
+REF_PREFIX = "sha256:"
+
+
+def blob_ref(text: str) -> str:
+    """
+    Returns the content-hash reference of a text, e.g. "sha256:3b0c...".
+    """
+    return REF_PREFIX + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    """
+    Content-addressed store for the large texts of a graph thread (job
+    description, resume). Graph state only carries their references, so a
+    checkpoint stays a few hundred bytes however long the texts are, and a JD
+    shared by hundreds of threads is stored once.
+
+    Texts are zlib-compressed in a SQLite database (WAL mode) that every worker
+    process can read, with a byte-bounded LRU of decompressed texts in front.
+    """
+
+    def __init__(self, path: str, cache_max_bytes: int, ttl_seconds: int):
+        self.path = path
+        self.cache_max_bytes = cache_max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._last_prune = 0.0
+        self._stats = {"puts": 0, "writes": 0, "hits": 0, "misses": 0}
+
+    def _connection(self):
+        # Opened lazily and per process so the store is safe in a pre-fork server.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " ref TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_last_used ON blobs (last_used_at)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+            self._cache.clear()
+            self._cache_bytes = 0
+        return self._conn
+
+    def _remember(self, ref: str, text: str, touched_at: float):
+        previous = self._cache.pop(ref, None)
+        if previous is not None:
+            self._cache_bytes -= len(previous[0])
+        self._cache[ref] = (text, touched_at)
+        self._cache_bytes += len(text)
+        while self._cache_bytes > self.cache_max_bytes and len(self._cache) > 1:
+            _, (evicted, _) = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    def _cached(self, conn, ref: str, now: float):
+        entry = self._cache.get(ref)
+        if entry is None:
+            return None
+        self._cache.move_to_end(ref)
+        text, touched_at = entry
+        if now - touched_at > BLOB_TOUCH_INTERVAL_SECONDS:
+            # Keeps blobs that live in this process's cache from expiring on disk.
+            conn.execute("UPDATE blobs SET last_used_at = ? WHERE ref = ?", (now, ref))
+            conn.commit()
+            self._cache[ref] = (text, now)
+        return text
+
+    def put(self, text: str) -> str:
+        """
+        Stores a text (once per distinct content) and returns its reference.
+        """
+        ref = blob_ref(text)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._stats["puts"] += 1
+            if self._cached(conn, ref, now) is not None:
+                return ref
+            data = zlib.compress(text.encode("utf-8"))
+            conn.execute(
+                "INSERT INTO blobs (ref, data, size, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(ref) DO UPDATE SET last_used_at = excluded.last_used_at",
+                (ref, data, len(text), now, now),
+            )
+            self._prune(conn, now)
+            conn.commit()
+            self._stats["writes"] += 1
+            self._remember(ref, text, now)
+        return ref
+
+    def get(self, ref: str):
+        """
+        Returns the text stored under a reference, or None if it is unknown.
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                text = self._cached(conn, ref, now)
+                if text is not None:
+                    self._stats["hits"] += 1
+                    return text
+                self._stats["misses"] += 1
+                row = conn.execute("SELECT data FROM blobs WHERE ref = ?", (ref,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE blobs SET last_used_at = ? WHERE ref = ?", (now, ref))
+                conn.commit()
+                text = zlib.decompress(row[0]).decode("utf-8")
+                self._remember(ref, text, now)
+                return text
+        except (sqlite3.Error, zlib.error) as e:
+            print(f"ERROR: Blob store lookup failed for {ref}. {e}")
+            return None
+
+    def _prune(self, conn, now: float):
+        if now - self._last_prune < BLOB_PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = now
+        conn.execute("DELETE FROM blobs WHERE last_used_at < ?", (now - self.ttl_seconds,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connection()
+            blobs, stored_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+            return dict(self._stats, blobs=blobs, stored_bytes=stored_bytes,
+                        cached_blobs=len(self._cache), cached_bytes=self._cache_bytes)
+
+
+blob_store = BlobStore(BLOB_STORE_PATH, cache_max_bytes=BLOB_CACHE_MAX_BYTES, ttl_seconds=BLOB_TTL_SECONDS)
+
+
+_MISSING = object()
+
+
+def state_text(state: dict, field: str, default=_MISSING):
+    """
+    Returns a large text field of graph state, e.g. "job_description". New
+    threads carry only "<field>_ref" and the text is fetched from the blob
+    store on demand; threads checkpointed before that still hold it inline.
+
+    Raises:
+        KeyError: If the field is absent and no default is given, or the state
+            has a reference the blob store no longer holds.
+    """
+    text = state.get(field)
+    if text is not None:
+        return text
+    ref = state.get(f"{field}_ref")
+    if not ref:
+        if default is _MISSING:
+            raise KeyError(field)
+        return default
+    text = blob_store.get(ref)
+    if text is None:
+        raise KeyError(f"{field} ({ref}) is missing from the blob store")
+    return text
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from src.core.metrics import CACHE_REQUESTS
+from src.core.storage import connect_sqlite
+from src.core.settings import data_path, env_flag
+
+LLM_CACHE_ENABLED = env_flag("LLM_CACHE_ENABLED", True)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or data_path("llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+# Expiry and LRU eviction run at most this often (or after every 1% of max_entries writes), not on every write.
+LLM_CACHE_PRUNE_INTERVAL_SECONDS = int(os.getenv("LLM_CACHE_PRUNE_INTERVAL_SECONDS", 300))
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text before hashing so that cosmetic differences (unicode forms,
+    line endings, repeated whitespace) do not cause cache misses.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(*parts) -> str:
+    """
+    Builds a content-addressed key from the given parts. Strings are normalized
+    first; every other part (model name, prompt version, numbers) is used as is.
+
+    Returns:
+        A hex SHA-256 digest identifying the combination of parts.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        value = normalize_text(part) if isinstance(part, str) else json.dumps(part, sort_keys=True)
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent, SQLite-backed cache for LLM results with a TTL and size-bounded
+    LRU eviction. Entries are grouped by namespace (e.g. "screening",
+    "invitation", "rejection") and hit/miss counters are kept per namespace.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int, enabled: bool = True):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._stats = {}
+        self._last_prune = 0.0
+        self._writes_since_prune = 0
+
+    def _connection(self):
+        # Connections are opened lazily and per process, so the cache is safe
+        # to create at import time in a server that forks workers.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _count(self, namespace: str, outcome: str):
+        counters = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "writes": 0})
+        counters[outcome] += 1
+        CACHE_REQUESTS.inc(namespace=namespace, outcome=outcome)
+
+    def get(self, namespace: str, key: str):
+        """
+        Returns the cached value for (namespace, key), or None on a miss.
+        Expired entries are removed and reported as misses.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+                if row is None or now - row[1] > self.ttl_seconds:
+                    if row is not None:
+                        conn.execute("DELETE FROM llm_cache WHERE namespace = ? AND key = ?", (namespace, key))
+                        conn.commit()
+                    self._count(namespace, "misses")
+                    return None
+                conn.execute(
+                    "UPDATE llm_cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key),
+                )
+                conn.commit()
+                self._count(namespace, "hits")
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            print(f"ERROR: LLM cache lookup failed. {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value):
+        """
+        Stores a JSON-serializable value. Expired entries and, beyond
+        `max_entries`, the least recently used ones are pruned periodically
+        rather than on every write.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (namespace, key, value, created_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), now, now),
+                )
+                self._writes_since_prune += 1
+                if (now - self._last_prune >= LLM_CACHE_PRUNE_INTERVAL_SECONDS
+                        or self._writes_since_prune >= max(1, self.max_entries // 100)):
+                    self._prune(conn, now)
+                conn.commit()
+                self._count(namespace, "writes")
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"ERROR: LLM cache write failed. {e}")
+
+    def _prune(self, conn, now: float):
+        self._last_prune = now
+        self._writes_since_prune = 0
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE rowid IN"
+                " (SELECT rowid FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss/write counters per namespace plus the overall hit rate
+        and the number of stored entries.
+        """
+        with self._lock:
+            namespaces = {name: dict(counters) for name, counters in self._stats.items()}
+            entries = None
+            if self.enabled:
+                try:
+                    entries = self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                except sqlite3.Error:
+                    entries = None
+        hits = sum(c["hits"] for c in namespaces.values())
+        misses = sum(c["misses"] for c in namespaces.values())
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "namespaces": namespaces,
+        }
+
+
+llm_cache = ResultCache(
+    path=LLM_CACHE_PATH,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    enabled=LLM_CACHE_ENABLED,
+)
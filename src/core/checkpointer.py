@@ -0,0 +1,318 @@
+import asyncio
+import os
+import threading
+import time
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP, BaseCheckpointSaver, CheckpointTuple, get_checkpoint_id, get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.core.storage import connect_sqlite
+from src.core.settings import data_path
+
+# "sqlite" persists threads on local disk so any worker process can resume them; "memory" keeps the old MemorySaver.
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "sqlite").strip().lower()
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH") or data_path("checkpoints.sqlite3")
+# Checkpoints are buffered and written in one transaction once this many are pending.
+CHECKPOINT_WRITE_BATCH = int(os.getenv("CHECKPOINT_WRITE_BATCH", 16))
+CHECKPOINT_FLUSH_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_FLUSH_INTERVAL_SECONDS", 1.0))
+# Only the newest checkpoints of a thread are needed to resume it.
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", 10))
+CHECKPOINT_FINISHED_TTL_SECONDS = int(os.getenv("CHECKPOINT_FINISHED_TTL_SECONDS", 24 * 3600))
+CHECKPOINT_ABANDONED_TTL_SECONDS = int(os.getenv("CHECKPOINT_ABANDONED_TTL_SECONDS", 14 * 24 * 3600))
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = int(os.getenv("CHECKPOINT_PRUNE_INTERVAL_SECONDS", 600))
+
+
+def _thread_key(config) -> tuple:
+    configurable = config["configurable"]
+    return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+
+def _thread_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer backed by a local SQLite database in WAL mode.
+
+    Writes are buffered in memory (at most CHECKPOINT_WRITE_BATCH rows) and
+    committed together; any read, or an explicit flush(), commits them first.
+    Only the newest CHECKPOINT_KEEP_PER_THREAD checkpoints of each thread are
+    kept, and finished or abandoned threads are deleted after their TTL, so
+    neither the process nor the database grows without bound.
+    """
+
+    def __init__(self, path: str, *, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+        self._pending = []
+        self._pending_writes = []
+        self._oldest_pending = None
+        self._last_prune = 0.0
+
+    def _connection(self):
+        # Opened lazily and per process so the saver survives a pre-fork server.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    parent_id TEXT,
+                    type TEXT NOT NULL,
+                    checkpoint BLOB NOT NULL,
+                    metadata_type TEXT NOT NULL,
+                    metadata BLOB NOT NULL,
+                    finished INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_checkpoints_updated ON checkpoints (updated_at);
+                CREATE TABLE IF NOT EXISTS checkpoint_writes (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    task_path TEXT NOT NULL DEFAULT '',
+                    idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    type TEXT,
+                    value BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                );
+                """
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+            self._pending, self._pending_writes, self._oldest_pending = [], [], None
+        return self._conn
+
+    def flush(self):
+        """
+        Commits every buffered checkpoint in a single transaction and runs the
+        periodic TTL cleanup when it is due.
+        """
+        with self._lock:
+            conn = self._connection()
+            if self._pending or self._pending_writes:
+                touched = {row[:2] for row in self._pending}
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_id,"
+                        " type, checkpoint, metadata_type, metadata, finished, updated_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._pending,
+                    )
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id,"
+                        " task_id, task_path, idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._pending_writes,
+                    )
+                    for thread_id, checkpoint_ns in touched:
+                        conn.execute(
+                            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN"
+                            " (SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                            "  ORDER BY checkpoint_id DESC LIMIT ?)",
+                            (thread_id, checkpoint_ns, thread_id, checkpoint_ns, CHECKPOINT_KEEP_PER_THREAD),
+                        )
+                        # Pending writes belong to a checkpoint; drop those of the trimmed ones too.
+                        conn.execute(
+                            "DELETE FROM checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN"
+                            " (SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+                            (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+                        )
+                self._pending, self._pending_writes, self._oldest_pending = [], [], None
+            if time.time() - self._last_prune >= CHECKPOINT_PRUNE_INTERVAL_SECONDS:
+                self.prune_expired()
+
+    def prune_expired(self) -> int:
+        """
+        Deletes threads that finished more than CHECKPOINT_FINISHED_TTL_SECONDS
+        ago or have not been touched for CHECKPOINT_ABANDONED_TTL_SECONDS.
+
+        Returns:
+            The number of threads removed.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._last_prune = now
+            expired = [
+                row[0] for row in conn.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id"
+                    " HAVING (MAX(finished) = 1 AND MAX(updated_at) < ?) OR MAX(updated_at) < ?",
+                    (now - CHECKPOINT_FINISHED_TTL_SECONDS, now - CHECKPOINT_ABANDONED_TTL_SECONDS),
+                )
+            ]
+            if expired:
+                with conn:
+                    self._delete_threads(conn, expired)
+                print(f"---CHECKPOINTS: Pruned {len(expired)} finished or abandoned thread(s).---")
+            return len(expired)
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            self.flush()
+            conn = self._connection()
+            with conn:
+                self._delete_threads(conn, [str(thread_id)])
+
+    @staticmethod
+    def _delete_threads(conn, thread_ids):
+        conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", [(t,) for t in thread_ids])
+        conn.executemany("DELETE FROM checkpoint_writes WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def _maybe_flush(self):
+        if (
+            len(self._pending) + len(self._pending_writes) >= CHECKPOINT_WRITE_BATCH
+            or time.time() - (self._oldest_pending or time.time()) >= CHECKPOINT_FLUSH_INTERVAL_SECONDS
+        ):
+            self.flush()
+
+    def _to_tuple(self, thread_id, checkpoint_ns, row, writes):
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            _thread_config(thread_id, checkpoint_ns, checkpoint_id),
+            self.serde.loads_typed((type_, checkpoint)),
+            self.serde.loads_typed((metadata_type, metadata)),
+            _thread_config(thread_id, checkpoint_ns, parent_id) if parent_id else None,
+            [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in writes],
+        )
+
+    def get_tuple(self, config):
+        thread_id, checkpoint_ns = _thread_key(config)
+        checkpoint_id = get_checkpoint_id(config)
+        columns = "SELECT checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        with self._lock:
+            self.flush()
+            conn = self._connection()
+            if checkpoint_id:
+                row = conn.execute(
+                    columns + " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    columns + " WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            # In the order the run applied them (langgraph's writes_sort_key).
+            writes = conn.execute(
+                "SELECT task_id, channel, type, value FROM checkpoint_writes"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+                (thread_id, checkpoint_ns, row[0]),
+            ).fetchall()
+        return self._to_tuple(thread_id, checkpoint_ns, row, writes)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+            " FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(str(config["configurable"]["thread_id"]))
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+        if before is not None:
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            self.flush()
+            rows = self._connection().execute(query, params).fetchall()
+        yielded = 0
+        for thread_id, checkpoint_ns, *row in rows:
+            item = self._to_tuple(thread_id, checkpoint_ns, row, [])
+            if filter and not all(item.metadata.get(key) == value for key, value in filter.items()):
+                continue
+            yield item
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id, checkpoint_ns = _thread_key(config)
+        checkpoint_id = checkpoint["id"]
+        finished = 1 if "final_status" in checkpoint.get("channel_values", {}) else 0
+        row = (
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            get_checkpoint_id(config),
+            *self.serde.dumps_typed(checkpoint),
+            *self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            finished,
+            time.time(),
+        )
+        with self._lock:
+            self._connection()
+            self._pending.append(row)
+            self._oldest_pending = self._oldest_pending or time.time()
+            self._maybe_flush()
+        return _thread_config(thread_id, checkpoint_ns, checkpoint_id)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id, checkpoint_ns = _thread_key(config)
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            self._connection()
+            for idx, (channel, value) in enumerate(writes):
+                # Errors, interrupts and resumes use fixed negative slots so they never collide with regular writes.
+                self._pending_writes.append((
+                    thread_id, checkpoint_ns, checkpoint_id, task_id, task_path,
+                    WRITES_IDX_MAP.get(channel, idx), channel, *self.serde.dumps_typed(value),
+                ))
+            self._oldest_pending = self._oldest_pending or time.time()
+            self._maybe_flush()
+
+    async def aget_tuple(self, config):
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.get_running_loop().run_in_executor(None, self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.put_writes, config, writes, task_id, task_path
+        )
+
+
+def build_checkpointer():
+    """
+    Creates the checkpointer selected by CHECKPOINTER_BACKEND.
+    """
+    if CHECKPOINTER_BACKEND == "memory":
+        return MemorySaver()
+    return SqliteCheckpointSaver(CHECKPOINT_DB_PATH)
+
+
+def flush_checkpoints(checkpointer):
+    """
+    Commits buffered checkpoints, if the backend buffers them, so another
+    worker process can pick the thread up straight away.
+    """
+    flush = getattr(checkpointer, "flush", None)
+    if flush is not None:
+        flush()
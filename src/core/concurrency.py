@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_bounded(func, items, max_workers: int, on_error=None) -> list:
+    """
+    Runs `func` over every item on a bounded thread pool and returns the
+    results in the same order as the input.
+
+    The graph nodes spend almost all of their time waiting on the LLM API, so
+    threads (rather than processes) are enough to overlap that latency. A
+    failure for one item never affects the others: if `func` raises, the
+    exception is handed to `on_error` and its return value is used in place
+    of the result.
+
+    Args:
+        func: Callable applied to each item.
+        items: Iterable of work items.
+        max_workers: Upper bound on the number of items processed at once.
+        on_error: Optional callable `(item, exception) -> result`. When omitted,
+                  a dictionary with an "error" key is returned for that item.
+
+    Returns:
+        A list of results, one per item, in input order.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def _safe_call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            if on_error is not None:
+                return on_error(item, e)
+            return {"error": str(e)}
+
+    workers = max(1, min(int(max_workers), len(items)))
+    if workers == 1:
+        return [_safe_call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_safe_call, items))
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+import uuid
+
+from src.core.settings import data_path
+from src.core.storage import connect_sqlite
+
+DECISION_DB_PATH = os.getenv("DECISION_DB_PATH") or data_path("decisions.sqlite3")
+# A claim older than this was left by a worker that died mid-decision and may be taken over.
+DECISION_CLAIM_SECONDS = int(os.getenv("DECISION_CLAIM_SECONDS", 600))
+
+
+class DecisionClaims:
+    """
+    Per-thread_id claims in SQLite (WAL), so only one reviewer decision runs on
+    a paused thread at a time across every worker process: two approvals sent
+    concurrently (e.g. a double-clicked /resume/bulk) cannot both send the email.
+    """
+
+    def __init__(self, path: str, claim_seconds: int):
+        self.path = path
+        self.claim_seconds = claim_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # Opened lazily and per process so the store is safe in a pre-fork server.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS decision_claims ("
+                " thread_id TEXT PRIMARY KEY, token TEXT NOT NULL, claimed_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def claim(self, thread_id: str):
+        """
+        Claims a thread for one decision.
+
+        Returns:
+            A token to pass to release(), or None if another decision holds it.
+        """
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "DELETE FROM decision_claims WHERE thread_id = ? AND claimed_at < ?",
+                    (thread_id, now - self.claim_seconds),
+                )
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO decision_claims (thread_id, token, claimed_at) VALUES (?, ?, ?)",
+                    (thread_id, token, now),
+                ).rowcount
+        return token if inserted else None
+
+    def release(self, thread_id: str, token: str):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM decision_claims WHERE thread_id = ? AND token = ?", (thread_id, token))
+
+
+decision_claims = DecisionClaims(DECISION_DB_PATH, DECISION_CLAIM_SECONDS)
@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from src.core.cache import make_cache_key, normalize_text
+from src.core.settings import data_path, env_flag
+from src.core.storage import connect_sqlite
+
+DEDUP_ENABLED = env_flag("DEDUP_ENABLED", True)
+DEDUP_PATH = os.getenv("DEDUP_PATH") or data_path("dedup.sqlite3")
+# A resume screened for the same JD within this window is not screened (or emailed) again.
+DEDUP_HISTORY_SECONDS = int(os.getenv("DEDUP_HISTORY_SECONDS", 14 * 24 * 3600))
+# Resumes whose 64-bit SimHashes differ in at most this many bits count as the same document.
+DEDUP_SIMHASH_MAX_DISTANCE = int(os.getenv("DEDUP_SIMHASH_MAX_DISTANCE", 3))
+# Treats two resumes with the same contact email as the same candidate, even if their text differs.
+DEDUP_MATCH_EMAIL = env_flag("DEDUP_MATCH_EMAIL", True)
+# Texts shorter than this (normalized characters), e.g. scanned PDFs with no text layer, are only
+# matched on their exact bytes: near-empty texts would otherwise all look like one resume.
+DEDUP_MIN_TEXT_CHARS = int(os.getenv("DEDUP_MIN_TEXT_CHARS", 200))
+DEDUP_PRUNE_INTERVAL_SECONDS = 3600
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+WORD_PATTERN = re.compile(r"\w+")
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+
+def simhash(text: str) -> int:
+    """
+    Returns the 64-bit SimHash of a text over its word 3-shingles. Texts that
+    differ only by a few words (a re-exported PDF, a fixed typo, another
+    header) get hashes a few bits apart.
+    """
+    words = WORD_PATTERN.findall(normalize_text(text).lower())
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    half = len(hashes) / 2
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        if sum((value >> bit) & 1 for value in hashes) > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class Fingerprint:
+    """
+    Identity of one uploaded resume at three levels: the exact upload bytes,
+    the normalized text (same resume under another filename or PDF export) and
+    a SimHash for near-duplicates, plus the contact email found in it. Texts
+    below DEDUP_MIN_TEXT_CHARS get no text hash or SimHash.
+    """
+
+    def __init__(self, byte_hash, text_hash: str, simhash_value: int, email):
+        self.byte_hash = byte_hash
+        self.text_hash = text_hash
+        self.simhash = simhash_value
+        self.email = email
+
+    @classmethod
+    def of(cls, text: str, data: bytes = None):
+        normalized = normalize_text(text).lower()
+        email = EMAIL_PATTERN.search(normalized)
+        enough_text = len(normalized) >= DEDUP_MIN_TEXT_CHARS
+        return cls(
+            hashlib.sha256(data).hexdigest() if data else None,
+            hashlib.sha256(normalized.encode("utf-8")).hexdigest() if enough_text else None,
+            simhash(normalized) if enough_text else None,
+            email.group(0) if email else None,
+        )
+
+    def match(self, other):
+        """
+        Returns how this resume duplicates `other` ("bytes", "text", "near" or
+        "email") and the SimHash distance, or None if they are different.
+        """
+        distance = None
+        if self.simhash is not None and other.simhash is not None:
+            distance = hamming_distance(self.simhash, other.simhash)
+        if self.byte_hash and self.byte_hash == other.byte_hash:
+            return "bytes", distance
+        if self.text_hash and self.text_hash == other.text_hash:
+            return "text", distance
+        if distance is not None and distance <= DEDUP_SIMHASH_MAX_DISTANCE:
+            return "near", distance
+        if DEDUP_MATCH_EMAIL and self.email and self.email == other.email:
+            return "email", distance
+        return None
+
+
+class DedupHistory:
+    """
+    Recently screened resumes per job description, with the screening result
+    each one got, so a repeat application reuses it instead of calling the LLM
+    and emailing the candidate again.
+
+    Kept in SQLite (WAL) so every worker process sees the others' entries. A
+    batch loads the JD's recent fingerprints once (hashes only, no results)
+    and compares in memory; a stored result is read only for a match.
+    """
+
+    def __init__(self, path: str, history_seconds: int, enabled: bool = True):
+        self.path = path
+        self.history_seconds = history_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._last_prune = 0.0
+        self._stats = {"checked": 0, "batch_duplicates": 0, "history_duplicates": 0, "recorded": 0}
+
+    def _connection(self):
+        # Opened lazily and per process so the history is safe in a pre-fork server.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS screened ("
+                " jd_hash TEXT NOT NULL, byte_hash TEXT, text_hash TEXT, simhash TEXT,"
+                " email TEXT, filename TEXT NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_screened_jd ON screened (jd_hash, created_at)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def recent(self, jd_hash: str) -> list:
+        """
+        Returns (row id, Fingerprint) for every resume screened for this JD
+        within the history window, newest first.
+        """
+        cutoff = time.time() - self.history_seconds
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT rowid, byte_hash, text_hash, simhash, email FROM screened"
+                " WHERE jd_hash = ? AND created_at >= ? ORDER BY created_at DESC",
+                (jd_hash, cutoff),
+            ).fetchall()
+        return [
+            (rowid, Fingerprint(byte_hash, text_hash, int(stored_simhash, 16) if stored_simhash else None, email))
+            for rowid, byte_hash, text_hash, stored_simhash, email in rows
+        ]
+
+    def entry(self, rowid: int):
+        """
+        Returns {"filename", "screened_at", "result"} of a history row, or None if it is gone.
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT filename, created_at, result FROM screened WHERE rowid = ?", (rowid,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"filename": row[0], "screened_at": row[1], "result": json.loads(row[2])}
+
+    def record(self, jd_hash: str, fingerprint: Fingerprint, filename: str, result: dict):
+        """
+        Remembers the screening result of a resume for later repeats.
+
+        Args:
+            jd_hash: Key of the job description (see jd_key()).
+            fingerprint: The resume's fingerprint.
+            filename: Upload name, reported on later duplicates.
+            result: What a duplicate should reuse: thread_id, screening_results
+                and final_status of the original run.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO screened (jd_hash, byte_hash, text_hash, simhash, email, filename, result, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (jd_hash, fingerprint.byte_hash, fingerprint.text_hash,
+                 format(fingerprint.simhash, "016x") if fingerprint.simhash is not None else None,
+                 fingerprint.email, filename, json.dumps(result, default=str), now),
+            )
+            if now - self._last_prune >= DEDUP_PRUNE_INTERVAL_SECONDS:
+                self._last_prune = now
+                conn.execute("DELETE FROM screened WHERE created_at < ?", (now - self.history_seconds,))
+            conn.commit()
+            self._stats["recorded"] += 1
+
+    def count(self, outcome: str, amount: int = 1):
+        with self._lock:
+            self._stats[outcome] += amount
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM screened").fetchone()[0]
+            return dict(self._stats, enabled=True, history_entries=entries)
+
+
+dedup_history = DedupHistory(DEDUP_PATH, history_seconds=DEDUP_HISTORY_SECONDS, enabled=DEDUP_ENABLED)
+
+
+def jd_key(job_description: str) -> str:
+    """
+    Returns the key that scopes duplicate history to one job description; a
+    resume screened for another JD is screened again.
+    """
+    return make_cache_key("dedup", job_description)
+
+
+def _match_batch(fingerprint: Fingerprint, fingerprints: list, unique: list):
+    for kept in unique:
+        found = fingerprint.match(fingerprints[kept])
+        if found:
+            return {"index": kept, "match": found[0], "distance": found[1]}
+    return None
+
+
+def _match_history(fingerprint: Fingerprint, history: list):
+    for rowid, stored in history:
+        found = fingerprint.match(stored)
+        if found:
+            entry = dedup_history.entry(rowid)
+            if entry is not None:
+                return dict(entry, match=found[0], distance=found[1], history=True)
+    return None
+
+
+def find_duplicates(job_description: str, texts: list, blobs: list = None):
+    """
+    Dedup stage of a /process batch, run before any LLM call.
+
+    Each resume is compared with the earlier resumes of the batch, then with
+    the recent history for the same JD. The first upload of a candidate is
+    kept; every later one points at it.
+
+    Args:
+        job_description: The batch's job description.
+        texts: Parsed resume text per upload (None for uploads that failed to parse).
+        blobs: Raw upload bytes per upload, for exact-byte matching.
+
+    Returns:
+        (fingerprints, duplicates): one Fingerprint (or None) per upload, and
+        one entry per upload that is None for unique resumes,
+        {"index", "match", "distance"} for a duplicate of an earlier upload,
+        or a history entry (see DedupHistory.entry) with "match", "distance"
+        and "history": True.
+    """
+    blobs = blobs or [None] * len(texts)
+    fingerprints = [Fingerprint.of(text, data) if text else None for text, data in zip(texts, blobs)]
+    duplicates = [None] * len(texts)
+    if not dedup_history.enabled:
+        return fingerprints, duplicates
+    history = dedup_history.recent(jd_key(job_description))
+    unique = []
+    for index, fingerprint in enumerate(fingerprints):
+        if fingerprint is None:
+            continue
+        duplicates[index] = _match_batch(fingerprint, fingerprints, unique) or _match_history(fingerprint, history)
+        if duplicates[index] is None:
+            unique.append(index)
+    history_hits = sum(1 for entry in duplicates if entry and entry.get("history"))
+    dedup_history.count("checked", sum(1 for fingerprint in fingerprints if fingerprint))
+    dedup_history.count("batch_duplicates", sum(1 for entry in duplicates if entry) - history_hits)
+    dedup_history.count("history_duplicates", history_hits)
+    return fingerprints, duplicates
@@ -0,0 +1,51 @@
+import time
+
+from src.core.blob_store import blob_store
+
+
+def draft_version(email: dict, number: int, source: str, feedback: str = None) -> dict:
+    """
+    Builds one entry of a thread's draft history. The body is kept in the blob
+    store, so every entry adds only a reference to the checkpoint.
+
+    Args:
+        email: The draft ({"subject", "body"}).
+        number: Version number, starting at 1.
+        source: What produced it: "draft", "refine", "manual_edit" or "revert".
+        feedback: The reviewer feedback or note behind the change, if any.
+    """
+    return {
+        "version": number,
+        "source": source,
+        "subject": email.get("subject"),
+        "body_ref": blob_store.put(email.get("body") or ""),
+        "feedback": feedback,
+        "created_at": time.time(),
+    }
+
+
+def draft_update(state: dict, email: dict, source: str, feedback: str = None) -> dict:
+    """
+    Returns the state update that makes `email` the current draft: the new
+    "drafted_email" plus only the new history entries, which the graph appends
+    to "draft_versions". The first change also records the generated draft as
+    version 1.
+    """
+    history = state.get("draft_versions") or []
+    versions = []
+    if not history and state.get("drafted_email"):
+        versions.append(draft_version(state["drafted_email"], 1, "draft"))
+    versions.append(draft_version(email, len(history) + len(versions) + 1, source, feedback))
+    return {"drafted_email": email, "draft_versions": versions}
+
+
+def draft_history(state: dict) -> list:
+    """
+    Returns a thread's draft versions, oldest first, with their bodies.
+    """
+    history = []
+    for entry in state.get("draft_versions") or []:
+        version = {key: value for key, value in entry.items() if key != "body_ref"}
+        version["body"] = blob_store.get(entry["body_ref"])
+        history.append(version)
+    return history
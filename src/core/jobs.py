@@ -0,0 +1,454 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.core.settings import data_path
+from src.core.storage import connect_sqlite
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH") or data_path("jobs.sqlite3")
+# How often a worker that does not run a job re-reads its progress from the JobStore.
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 0.5))
+# Unfinished jobs older than this (e.g. their worker was killed) are dropped from the JobStore.
+JOB_ABANDONED_SECONDS = int(os.getenv("JOB_ABANDONED_SECONDS", 24 * 3600))
+JOB_PRUNE_INTERVAL_SECONDS = 600
+
+
+class ShuttingDownError(RuntimeError):
+    """
+    Raised by JobManager.submit once the manager is draining for shutdown.
+    """
+
+
+class Job:
+    """
+    Tracks one /process batch: its per-resume results and the order in which
+    they finished, so pollers and stream listeners can pick up partial output.
+    """
+
+    def __init__(self, labels, store=None):
+        self.job_id = str(uuid.uuid4())
+        self.labels = list(labels)
+        self.total = len(self.labels)
+        self.results = [None] * self.total
+        self.completed_order = []
+        self.status = "queued" if self.total else "completed"
+        self.created_at = time.time()
+        self.finished_at = None if self.total else self.created_at
+        self.condition = threading.Condition()
+        self.store = store
+        self._save("create")
+
+    @property
+    def completed(self) -> int:
+        return len(self.completed_order)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status == "completed"
+
+    def _save(self, method: str, *args):
+        # Progress is mirrored to the JobStore for the other worker processes;
+        # if that fails, this worker still has the job in memory.
+        if self.store is None:
+            return
+        try:
+            getattr(self.store, method)(self, *args)
+        except Exception as e:
+            print(f"ERROR: Could not save the progress of job {self.job_id}. {e}")
+
+    def mark_running(self):
+        with self.condition:
+            if self.status == "queued":
+                self.status = "running"
+                self._save("update")
+
+    def set_result(self, index: int, result: dict):
+        with self.condition:
+            self.results[index] = result
+            self.completed_order.append(index)
+            if self.completed == self.total:
+                self.status = "completed"
+                self.finished_at = time.time()
+            self._save("add_result", index, self.completed - 1)
+            self.condition.notify_all()
+
+    def _wait_for(self, predicate, timeout) -> bool:
+        # Called with self.condition held.
+        return self.condition.wait_for(predicate, timeout=timeout)
+
+    def wait(self, timeout=None) -> bool:
+        with self.condition:
+            return self._wait_for(lambda: self.is_finished, timeout)
+
+    def to_dict(self, include_results: bool = True) -> dict:
+        with self.condition:
+            data = {
+                "job_id": self.job_id,
+                "status": self.status,
+                "total": self.total,
+                "completed": self.completed,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "resumes": [
+                    {"index": i, "filename": label, "done": self.results[i] is not None}
+                    for i, label in enumerate(self.labels)
+                ],
+            }
+            if include_results:
+                data["results"] = [
+                    dict(self.results[i], index=i) for i in sorted(self.completed_order)
+                ]
+            return data
+
+    def iter_events(self, heartbeat_seconds: float = 15.0):
+        """
+        Yields Server-Sent Event frames: one "result" event per finished resume
+        (in completion order) followed by a final "done" event. A comment frame
+        is sent every `heartbeat_seconds` so proxies keep the connection open.
+        """
+        sent = 0
+        while True:
+            with self.condition:
+                self._wait_for(lambda: self.completed > sent or self.is_finished, heartbeat_seconds)
+                pending = self.completed_order[sent:]
+                finished = self.is_finished
+                payloads = [
+                    dict(self.results[i], index=i, completed=sent + n + 1, total=self.total)
+                    for n, i in enumerate(pending)
+                ]
+            if not payloads and not finished:
+                yield ": keep-alive\n\n"
+                continue
+            for payload in payloads:
+                yield f"event: result\ndata: {json.dumps(payload, default=str)}\n\n"
+            sent += len(payloads)
+            if finished and sent == self.total:
+                summary = {"job_id": self.job_id, "total": self.total, "status": self.status}
+                yield f"event: done\ndata: {json.dumps(summary)}\n\n"
+                return
+
+
+class StoredJob(Job):
+    """
+    Read-only view of a job run by another worker process, loaded from the
+    JobStore and re-read from it while a caller waits on or streams it.
+    """
+
+    def __init__(self, store, record):
+        super().__init__(record["labels"])
+        self.source = store
+        self.job_id = record["job_id"]
+        self.created_at = record["created_at"]
+        self._apply(record)
+
+    def _apply(self, record):
+        self.status, self.finished_at = record["status"], record["finished_at"]
+        for index, result in self.source.results(self.job_id, after=self.completed - 1):
+            self.results[index] = result
+            self.completed_order.append(index)
+
+    def refresh(self):
+        with self.condition:
+            record = self.source.load(self.job_id)
+            if record is not None:
+                self._apply(record)
+
+    @property
+    def is_finished(self) -> bool:
+        # A completed status is written with the last result, but both are read separately.
+        return self.status == "completed" and self.completed == self.total
+
+    def _wait_for(self, predicate, timeout) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.refresh()
+            if predicate():
+                return True
+            remaining = JOB_POLL_SECONDS if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.condition.wait(min(JOB_POLL_SECONDS, remaining))
+
+
+class JobStore:
+    """
+    Every job's labels, status and finished results in SQLite (WAL), so GET
+    /jobs/<id> and its stream work on whichever worker process the request
+    reaches. The worker running a job writes each result as it finishes;
+    other workers read them through StoredJob.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._last_prune = 0.0
+
+    def _connection(self):
+        # Opened lazily and per process so the store is safe in a pre-fork server.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    labels TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    finished_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    idx INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (job_id, position)
+                );
+                """
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def create(self, job: Job):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, labels, status, created_at, finished_at) VALUES (?, ?, ?, ?, ?)",
+                    (job.job_id, json.dumps(job.labels), job.status, job.created_at, job.finished_at),
+                )
+
+    def update(self, job: Job):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ?",
+                    (job.status, job.finished_at, job.job_id),
+                )
+
+    def add_result(self, job: Job, index: int, position: int):
+        """
+        Records the result of item `index` as the job's `position`-th finished
+        one, together with the job's status, in one transaction.
+        """
+        result = json.dumps(job.results[index], default=str)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_results (job_id, position, idx, result) VALUES (?, ?, ?, ?)",
+                    (job.job_id, position, index, result),
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ?",
+                    (job.status, job.finished_at, job.job_id),
+                )
+
+    def load(self, job_id: str):
+        """
+        Returns the job's record (labels, status, timestamps) or None.
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT labels, status, created_at, finished_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"job_id": job_id, "labels": json.loads(row[0]), "status": row[1],
+                "created_at": row[2], "finished_at": row[3]}
+
+    def results(self, job_id: str, after: int = -1) -> list:
+        """
+        Returns (index, result) for the job's results finished after position
+        `after`, in completion order.
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT idx, result FROM job_results WHERE job_id = ? AND position > ? ORDER BY position",
+                (job_id, after),
+            ).fetchall()
+        return [(index, json.loads(result)) for index, result in rows]
+
+    def prune(self, retention_seconds: int):
+        """
+        Deletes jobs that finished more than `retention_seconds` ago, and
+        unfinished ones older than JOB_ABANDONED_SECONDS. Runs at most every
+        JOB_PRUNE_INTERVAL_SECONDS.
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < JOB_PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = now
+            conn = self._connection()
+            with conn:
+                expired = [
+                    row[0] for row in conn.execute(
+                        "SELECT job_id FROM jobs WHERE finished_at < ? OR (finished_at IS NULL AND created_at < ?)",
+                        (now - retention_seconds, now - max(retention_seconds, JOB_ABANDONED_SECONDS)),
+                    )
+                ]
+                conn.executemany("DELETE FROM job_results WHERE job_id = ?", [(job_id,) for job_id in expired])
+                conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in expired])
+
+
+class JobManager:
+    """
+    In-process job queue backed by a shared worker pool. Every resume of every
+    job is a separate task on the pool, so the pool size caps how many graph
+    runs are in flight across all concurrent uploads.
+
+    With a JobStore, progress is also saved to SQLite and get() finds jobs
+    that other worker processes are running.
+    """
+
+    def __init__(self, max_workers: int, retention_seconds: int = 3600, store=None):
+        self.max_workers = max(1, int(max_workers))
+        self.retention_seconds = retention_seconds
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job-worker")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._draining = False
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    def submit(self, func, items, labels, on_error=None, prepare=None) -> Job:
+        """
+        Enqueues one task per item and returns the Job immediately.
+
+        Args:
+            func: Callable applied to each item; its return value is the result.
+                  It may return a Future instead, e.g. to reuse another item's
+                  result; the item's result is then recorded when the Future
+                  resolves, without holding a worker meanwhile.
+            items: Work items, one per resume.
+            labels: Display label (filename) for each item, same order as items.
+            on_error: Optional callable `(item, exception) -> result` used when
+                      `func` raises, so one failure never aborts the job.
+            prepare: Optional callable `(items) -> items` run once on a worker
+                     before the per-item tasks, for work that needs the whole
+                     batch (e.g. batched screening). It must return a list of
+                     the same length; if it raises, the original items are used.
+
+        Returns:
+            The newly created Job.
+
+        Raises:
+            ShuttingDownError: If the manager is draining.
+        """
+        items = list(items)
+        with self._lock:
+            if self._draining:
+                raise ShuttingDownError("The server is shutting down and no longer accepts new jobs.")
+        self._prune()
+        job = Job(labels, store=self.store)
+        with self._lock:
+            self._jobs[job.job_id] = job
+
+        def _failed(item, e):
+            return on_error(item, e) if on_error is not None else {"error": str(e)}
+
+        def _resolved(index, item, future):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = _failed(item, e)
+            job.set_result(index, result)
+
+        def _run(index, item):
+            job.mark_running()
+            try:
+                result = func(item)
+            except Exception as e:
+                result = _failed(item, e)
+            if isinstance(result, Future):
+                result.add_done_callback(lambda future: _resolved(index, item, future))
+                return
+            job.set_result(index, result)
+
+        def _enqueue(batch_items):
+            for index, item in enumerate(batch_items):
+                self._executor.submit(_run, index, item)
+
+        def _prepare_then_enqueue():
+            job.mark_running()
+            try:
+                prepared = list(prepare(items))
+                if len(prepared) != len(items):
+                    raise ValueError("prepare() must return one item per input item.")
+            except Exception as e:
+                print(f"ERROR: Job preparation failed; processing items individually. {e}")
+                prepared = items
+            _enqueue(prepared)
+
+        if prepare is not None and items:
+            self._executor.submit(_prepare_then_enqueue)
+        else:
+            _enqueue(items)
+        return job
+
+    def get(self, job_id: str):
+        """
+        Returns the job, whether this process runs it or (with a JobStore)
+        another one does, or None if it is unknown or expired.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.store is None:
+            return job
+        try:
+            record = self.store.load(job_id)
+        except Exception as e:
+            print(f"ERROR: Could not read job {job_id} from the job store. {e}")
+            return None
+        return StoredJob(self.store, record) if record is not None else None
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.is_finished)
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Stops accepting new jobs and waits for the unfinished ones, for graceful
+        shutdown.
+
+        Args:
+            timeout: Seconds to wait in total.
+
+        Returns:
+            True if every job finished in time.
+        """
+        with self._lock:
+            self._draining = True
+            pending = [job for job in self._jobs.values() if not job.is_finished]
+        deadline = time.monotonic() + timeout
+        for job in pending:
+            if not job.wait(timeout=max(0.0, deadline - time.monotonic())):
+                return False
+        return True
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if self.store is not None:
+            try:
+                self.store.prune(self.retention_seconds)
+            except Exception as e:
+                print(f"ERROR: Could not prune the job store. {e}")
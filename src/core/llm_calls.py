@@ -0,0 +1,406 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from src.core.metrics import LLM_RETRIES, registry
+from src.core.prompt_session import count_tokens
+
+# Defaults applied to every model; LLM_RATE_LIMITS overrides them per model, e.g.
+# {"qwen/qwen3-32b": {"rpm": 60, "tpm": 6000, "concurrency": 4}}. 0 disables a limit.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 60))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 0))
+LLM_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", 8))
+LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS") or "{}")
+# Completion tokens reserved against the TPM budget before the real usage is known.
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", 512))
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 1.0))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 60.0))
+
+# The breaker opens after this many consecutive failed calls and stays open for the cool-down.
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30.0))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_HINT_PATTERN = re.compile(r"try again in (?:(\d+)m)?([\d.]+)(ms|s)", re.IGNORECASE)
+
+LIMITER_WAIT = registry.histogram("hiring_llm_limiter_wait_seconds", "Time spent waiting for the rate limiter.", ("model",))
+RATE_LIMITED = registry.counter("hiring_llm_rate_limited_total", "Provider rate-limit (429) responses.", ("model",))
+BREAKER_REJECTIONS = registry.counter("hiring_llm_breaker_rejections_total", "Calls refused while the circuit breaker was open.", ("model",))
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised without calling the provider while a model's circuit breaker is open.
+    """
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute / 60` per second, holding
+    at most one minute's worth. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = float(per_minute)
+        self.tokens = self.per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.per_minute, self.tokens + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Blocks until `amount` tokens are available and takes them.
+
+        Returns:
+            The number of seconds spent waiting.
+        """
+        if self.per_minute <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(amount, self.per_minute)
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return waited
+                delay = (needed - self.tokens) * 60.0 / self.per_minute
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount: float):
+        """
+        Returns tokens to the bucket (positive) or takes extra ones (negative),
+        e.g. once the provider reports the real token usage.
+        """
+        if self.per_minute <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.per_minute, self.tokens + amount)
+
+    def set_rate(self, per_minute: float):
+        with self._lock:
+            self._refill()
+            self.per_minute = float(per_minute)
+            self.tokens = min(self.tokens, self.per_minute)
+
+    def drain(self):
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker: closed -> open after
+    `failure_threshold` failures; after `reset_seconds` a single trial call is
+    let through (half-open) and its outcome closes or re-opens the breaker.
+    Only outages count as failures (see is_outage); a request the provider
+    answers with a client error shows it is up and counts as a success.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed" or self.failure_threshold <= 0:
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """
+        Frees the half-open trial slot without counting an outcome, for a call
+        that was abandoned before it finished (e.g. a closed stream).
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failure_threshold > 0 and (self.failures >= self.failure_threshold or self.opened_at is not None):
+                self.opened_at = time.monotonic()
+
+
+class ModelLimiter:
+    """
+    Rate limiting state for one model: request and token buckets, a
+    concurrency cap and a circuit breaker.
+
+    The request rate adapts to the provider: each 429 cuts it to 70% (never
+    below a tenth of the configured rate) and empties the bucket, and every
+    success wins back 2% of the configured rate.
+    """
+
+    def __init__(self, model_name: str):
+        limits = LLM_RATE_LIMITS.get(model_name, {})
+        self.model_name = model_name
+        self.configured_rpm = float(limits.get("rpm", LLM_REQUESTS_PER_MINUTE))
+        self.requests = TokenBucket(self.configured_rpm)
+        self.tokens = TokenBucket(limits.get("tpm", LLM_TOKENS_PER_MINUTE))
+        self.concurrency = threading.BoundedSemaphore(max(1, int(limits.get("concurrency", LLM_MAX_CONCURRENCY_PER_MODEL))))
+        self.breaker = CircuitBreaker(LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_SECONDS)
+
+    def on_rate_limited(self):
+        RATE_LIMITED.inc(model=self.model_name)
+        if self.configured_rpm > 0:
+            self.requests.set_rate(max(self.configured_rpm * 0.1, self.requests.per_minute * 0.7))
+            self.requests.drain()
+
+    def on_success(self):
+        if self.configured_rpm > 0 and self.requests.per_minute < self.configured_rpm:
+            self.requests.set_rate(min(self.configured_rpm, self.requests.per_minute + self.configured_rpm * 0.02))
+
+    def stats(self) -> dict:
+        return {
+            "requests_per_minute": round(self.requests.per_minute, 2),
+            "configured_requests_per_minute": self.configured_rpm,
+            "tokens_per_minute": self.tokens.per_minute,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+
+_limiters_lock = threading.Lock()
+_limiters = {}
+
+
+def get_limiter(model_name: str) -> ModelLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(model_name)
+        if limiter is None:
+            limiter = _limiters[model_name] = ModelLimiter(model_name)
+        return limiter
+
+
+def limiter_stats() -> dict:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+def status_code_of(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(error) -> bool:
+    status = status_code_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def is_outage(error) -> bool:
+    """
+    Whether an error says the provider is unavailable (rate limits, timeouts,
+    5xx) rather than that this request was bad. Only outages trip the breaker;
+    e.g. the 400 Groq returns for malformed JSON-mode output does not.
+    """
+    status = status_code_of(error)
+    return is_retryable(error) or (status is not None and status >= 500)
+
+
+def _record_outcome(limiter, error):
+    if is_outage(error):
+        limiter.breaker.record_failure()
+    else:
+        limiter.breaker.record_success()
+
+
+def retry_after_seconds(error):
+    """
+    Reads the provider's retry hint from a Retry-After header, or from the
+    "Please try again in 7.5s" text Groq puts in its 429 messages.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+    match = RETRY_HINT_PATTERN.search(str(error))
+    if match:
+        minutes, amount, unit = match.groups()
+        seconds = float(amount) / 1000.0 if unit.lower() == "ms" else float(amount)
+        return seconds + 60.0 * int(minutes or 0)
+    return None
+
+
+def backoff_seconds(attempt: int, error=None) -> float:
+    """
+    Full-jitter exponential backoff, raised to the provider's retry hint when there is one.
+    """
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+    hint = retry_after_seconds(error) if error is not None else None
+    if hint is not None:
+        delay = max(delay, hint + random.uniform(0, 0.25 * LLM_BACKOFF_BASE_SECONDS))
+    return min(delay, LLM_BACKOFF_MAX_SECONDS)
+
+
+def model_name_of(llm) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+def _estimate_tokens(messages) -> int:
+    if isinstance(messages, str):
+        return count_tokens(messages) + LLM_EXPECTED_COMPLETION_TOKENS
+    return sum(count_tokens(str(getattr(m, "content", m))) for m in messages) + LLM_EXPECTED_COMPLETION_TOKENS
+
+
+@contextmanager
+def llm_slot(model_name: str, estimated_tokens: int, check_breaker: bool = True):
+    """
+    Reserves capacity for one call: refuses it if the breaker is open, then
+    waits for the request and token buckets and a concurrency slot. Retries
+    pass check_breaker=False: the call was already admitted, possibly as the
+    half-open trial, which must not be refused by its own retries.
+    """
+    limiter = get_limiter(model_name)
+    if check_breaker and not limiter.breaker.allow():
+        BREAKER_REJECTIONS.inc(model=model_name)
+        raise CircuitOpenError(f"Circuit breaker for {model_name} is open after repeated failures.")
+    start = time.perf_counter()
+    limiter.requests.acquire(1)
+    limiter.tokens.acquire(estimated_tokens)
+    with limiter.concurrency:
+        LIMITER_WAIT.observe(time.perf_counter() - start, model=model_name)
+        yield limiter
+
+
+def _record_usage(limiter: ModelLimiter, response, estimated_tokens: int):
+    usage = getattr(response, "usage_metadata", None) or {}
+    used = usage.get("total_tokens")
+    if not used:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        used = token_usage.get("total_tokens")
+    if used:
+        limiter.tokens.adjust(estimated_tokens - used)
+
+
+def invoke_llm(llm, messages, model_name: str = None):
+    """
+    Calls `llm.invoke(messages)` through the shared rate limiter, retrying
+    rate-limit, timeout and server errors with jittered exponential backoff
+    that honours Retry-After.
+
+    Args:
+        llm: A chat model from get_llm().
+        messages: Chat messages (or a prompt string) to send.
+        model_name: Limiter key; defaults to the model's own name.
+
+    Returns:
+        The model's response message.
+
+    Raises:
+        CircuitOpenError: If the model's breaker is open.
+        Exception: The provider error once retries are exhausted or it is not retryable.
+    """
+    model_name = model_name or model_name_of(llm)
+    estimated = _estimate_tokens(messages)
+    attempt = 0
+    while True:
+        with llm_slot(model_name, estimated, check_breaker=attempt == 0) as limiter:
+            try:
+                response = llm.invoke(messages)
+            except Exception as e:
+                error = e
+            else:
+                limiter.breaker.record_success()
+                limiter.on_success()
+                _record_usage(limiter, response, estimated)
+                return response
+        if status_code_of(error) == 429:
+            limiter.on_rate_limited()
+        if not is_retryable(error) or attempt >= LLM_MAX_RETRIES:
+            _record_outcome(limiter, error)
+            raise error
+        delay = backoff_seconds(attempt, error)
+        attempt += 1
+        LLM_RETRIES.inc(model=model_name)
+        print(f"---LLM RETRY: {model_name} attempt {attempt}/{LLM_MAX_RETRIES} in {delay:.1f}s ({type(error).__name__}).---")
+        time.sleep(delay)
+
+
+def stream_llm(llm, messages, model_name: str = None):
+    """
+    Streaming counterpart of invoke_llm. Retries only happen before the first
+    chunk arrives, so a caller never sees a response restart halfway.
+
+    Yields:
+        Text chunks of the response.
+    """
+    model_name = model_name or model_name_of(llm)
+    estimated = _estimate_tokens(messages)
+    attempt = 0
+    admitted = settled = False
+    try:
+        while True:
+            started = False
+            with llm_slot(model_name, estimated, check_breaker=attempt == 0) as limiter:
+                admitted = True
+                try:
+                    for chunk in llm.stream(messages):
+                        started = True
+                        if chunk.content:
+                            yield chunk.content
+                except Exception as e:
+                    error = e
+                else:
+                    settled = True
+                    limiter.breaker.record_success()
+                    limiter.on_success()
+                    return
+            if status_code_of(error) == 429:
+                limiter.on_rate_limited()
+            if started or not is_retryable(error) or attempt >= LLM_MAX_RETRIES:
+                settled = True
+                _record_outcome(limiter, error)
+                raise error
+            delay = backoff_seconds(attempt, error)
+            attempt += 1
+            LLM_RETRIES.inc(model=model_name)
+            time.sleep(delay)
+    finally:
+        # The caller stopped reading (GeneratorExit when the client disconnects):
+        # a half-open trial must not stay in flight forever.
+        if admitted and not settled:
+            get_limiter(model_name).breaker.release_trial()
@@ -0,0 +1,103 @@
+import os
+import threading
+
+from src.core.metrics import METRICS_ENABLED, llm_metrics_callback
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 16))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", 60))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", 120))
+
+_lock = threading.Lock()
+_clients = {}
+_llm_factory = None
+_http_clients = None
+_owner_pid = None
+
+
+def _shared_http_clients():
+    """
+    Returns the (sync, async) httpx clients shared by every chat model, so all
+    agents draw from one keep-alive connection pool instead of opening a new
+    connection and TLS session per call.
+    """
+    global _http_clients
+    if _http_clients is None:
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        _http_clients = (
+            httpx.Client(limits=limits, timeout=LLM_REQUEST_TIMEOUT_SECONDS),
+            httpx.AsyncClient(limits=limits, timeout=LLM_REQUEST_TIMEOUT_SECONDS),
+        )
+    return _http_clients
+
+
+def model_for(role: str, default: str) -> str:
+    """
+    Returns the model configured for an agent role through LLM_MODEL_<ROLE>
+    (e.g. LLM_MODEL_SCREENING, LLM_MODEL_INVITATION), or `default`.
+    """
+    return os.getenv(f"LLM_MODEL_{role.upper()}") or default
+
+
+def set_llm_factory(factory):
+    """
+    Replaces ChatGroq with another chat model for every agent, e.g. the fake
+    model used by benchmark.py. Pass None to go back to ChatGroq.
+
+    Args:
+        factory: A callable (model_name, temperature) -> chat model, or None.
+    """
+    global _clients, _llm_factory
+    with _lock:
+        _llm_factory = factory
+        _clients = {}
+
+
+def get_llm(model_name: str, temperature: float):
+    """
+    Returns the shared ChatGroq client for a (model, temperature) pair, creating
+    it on first use. Clients are safe to share between threads.
+
+    Args:
+        model_name: The Groq model identifier, e.g. "llama-3.3-70b-versatile".
+        temperature: Sampling temperature for the model.
+
+    Returns:
+        A ChatGroq instance backed by the shared HTTP connection pool.
+    """
+    global _clients, _http_clients, _owner_pid
+    key = (model_name, round(float(temperature), 3))
+    with _lock:
+        # Sockets must not be shared with a parent process after fork.
+        if _owner_pid != os.getpid():
+            _clients = {}
+            _http_clients = None
+            _owner_pid = os.getpid()
+        client = _clients.get(key)
+        if client is None and _llm_factory is not None:
+            client = _llm_factory(model_name, temperature)
+            if METRICS_ENABLED and not client.callbacks:
+                client.callbacks = [llm_metrics_callback(model_name)]
+            _clients[key] = client
+        elif client is None:
+            from langchain_groq import ChatGroq
+
+            http_client, http_async_client = _shared_http_clients()
+            client = ChatGroq(
+                model_name=model_name,
+                temperature=temperature,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                # Retries and backoff are handled by src.core.llm_calls, not by the client.
+                max_retries=0,
+                callbacks=[llm_metrics_callback(model_name)] if METRICS_ENABLED else None,
+            )
+            _clients[key] = client
+        return client
+
@@ -0,0 +1,400 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.core.settings import data_path, env_flag
+from src.core.storage import connect_sqlite
+
+METRICS_ENABLED = env_flag("METRICS_ENABLED", True)
+# Keeps a short span log per thread_id, served at /traces/<thread_id>. Spans are
+# written to SQLite so any worker process can serve the trace of any thread.
+TRACING_ENABLED = env_flag("TRACING_ENABLED", True)
+TRACE_DB_PATH = os.getenv("TRACE_DB_PATH") or data_path("traces.sqlite3")
+TRACE_RETENTION_SECONDS = int(os.getenv("TRACE_RETENTION_SECONDS", 24 * 3600))
+MAX_SPANS_PER_TRACE = 200
+# Spans are buffered and written together; a trace is also written out when its trace_context exits.
+TRACE_FLUSH_SPANS = 256
+TRACE_FLUSH_SECONDS = 2.0
+TRACE_PRUNE_INTERVAL_SECONDS = 600
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """
+    Monotonic counter with a fixed set of label names.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus layout (_bucket, _sum, _count).
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, dict(series, counts=list(series["counts"]))) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            labels = _format_labels(self.labels, key)
+            bucket_names = self.labels + ("le",)
+            for bound, count in zip(self.buckets, series["counts"]):
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_names, key + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_names, key + ('+Inf',))} {series['count']}")
+            lines.append(f"{self.name}_sum{labels} {series['sum']}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics registry rendered in the Prometheus text format. Each
+    worker process keeps its own values; scrape every worker, or aggregate.
+    """
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+NODE_LATENCY = registry.histogram("hiring_node_duration_seconds", "Graph node latency.", ("node",))
+NODE_ERRORS = registry.counter("hiring_node_errors_total", "Graph node invocations that raised.", ("node",))
+STAGE_LATENCY = registry.histogram("hiring_stage_duration_seconds", "Latency of non-graph stages (PDF parsing, SMTP).", ("stage",))
+STAGE_ERRORS = registry.counter("hiring_stage_errors_total", "Non-graph stage calls that raised.", ("stage",))
+LLM_LATENCY = registry.histogram("hiring_llm_request_duration_seconds", "LLM request latency.", ("model",))
+LLM_REQUESTS = registry.counter("hiring_llm_requests_total", "LLM requests by outcome.", ("model", "outcome"))
+LLM_TOKENS = registry.counter("hiring_llm_tokens_total", "LLM tokens reported by the provider.", ("model", "kind"))
+LLM_RETRIES = registry.counter("hiring_llm_retries_total", "LLM request retries.", ("model",))
+CACHE_REQUESTS = registry.counter("hiring_llm_cache_requests_total", "LLM result cache lookups and writes.", ("namespace", "outcome"))
+
+
+class _TraceLog:
+    def __init__(self, path: str, retention_seconds: int):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._unsaved = []
+        self._unsaved_pid = os.getpid()
+        self._last_flush = time.monotonic()
+        self._last_prune = 0.0
+
+    def _connection(self):
+        # Opened lazily and per process so the log is safe in a pre-fork server.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS trace_spans ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, trace_id TEXT NOT NULL, span TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trace_spans_trace ON trace_spans (trace_id, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trace_spans_created ON trace_spans (created_at)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def add(self, trace_id: str, span: dict):
+        with self._lock:
+            if self._unsaved_pid != os.getpid():
+                # Spans buffered before a fork belong to the parent process.
+                self._unsaved, self._unsaved_pid = [], os.getpid()
+            self._unsaved.append((trace_id, json.dumps(span, default=str), time.time()))
+            due = len(self._unsaved) >= TRACE_FLUSH_SPANS or time.monotonic() - self._last_flush >= TRACE_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        now = time.time()
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._unsaved:
+                return
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.executemany("INSERT INTO trace_spans (trace_id, span, created_at) VALUES (?, ?, ?)", self._unsaved)
+                    if now - self._last_prune >= TRACE_PRUNE_INTERVAL_SECONDS:
+                        self._last_prune = now
+                        conn.execute("DELETE FROM trace_spans WHERE created_at < ?", (now - self.retention_seconds,))
+            except Exception as e:
+                print(f"ERROR: Could not save {len(self._unsaved)} trace span(s). {e}")
+            self._unsaved = []
+
+    def get(self, trace_id: str):
+        """
+        Returns the newest MAX_SPANS_PER_TRACE spans of a trace, oldest first,
+        or None if it has none.
+        """
+        self.flush()
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT span FROM trace_spans WHERE trace_id = ? ORDER BY id DESC LIMIT ?",
+                (trace_id, MAX_SPANS_PER_TRACE),
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)] or None
+
+
+trace_log = _TraceLog(TRACE_DB_PATH, TRACE_RETENTION_SECONDS)
+
+
+class trace_context:
+    """
+    Context manager that tags every span recorded inside it (graph nodes, LLM
+    requests, stages) with a trace ID, normally the graph thread_id.
+    """
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_trace.set(self.trace_id)
+        return self
+
+    def __exit__(self, *exc):
+        _current_trace.reset(self._token)
+        # The run is over: make its spans readable from every worker now.
+        if TRACING_ENABLED:
+            trace_log.flush()
+        return False
+
+
+def current_trace_id():
+    return _current_trace.get()
+
+
+def record_span(kind: str, name: str, started_at: float, duration: float, error: str = None, **attributes):
+    """
+    Adds a span to the current trace, if there is one and tracing is enabled.
+    """
+    trace_id = _current_trace.get()
+    if not TRACING_ENABLED or trace_id is None:
+        return
+    span = {"kind": kind, "name": name, "start": round(started_at, 6), "duration_seconds": round(duration, 6)}
+    if error:
+        span["error"] = error
+    span.update(attributes)
+    trace_log.add(trace_id, span)
+
+
+def instrument_node(name: str, func):
+    """
+    Wraps a graph node so its latency and failures are recorded under `name`.
+    """
+    if not METRICS_ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(state, *args, **kwargs):
+        started_at, start = time.time(), time.perf_counter()
+        error = None
+        try:
+            return func(state, *args, **kwargs)
+        except Exception as e:
+            error = repr(e)
+            NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            NODE_LATENCY.observe(duration, node=name)
+            record_span("node", name, started_at, duration, error)
+
+    return wrapper
+
+
+def timed_stage(stage: str):
+    """
+    Decorator recording latency and failures of a non-graph stage, e.g. PDF parsing.
+    """
+
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started_at, start = time.time(), time.perf_counter()
+            error = None
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                error = repr(e)
+                STAGE_ERRORS.inc(stage=stage)
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                STAGE_LATENCY.observe(duration, stage=stage)
+                record_span("stage", stage, started_at, duration, error)
+
+        return wrapper
+
+    return decorator
+
+
+class _LLMMetricsRecorder:
+    """
+    LangChain callback attached to every shared chat model: records request
+    latency, outcome, provider-reported token usage and retries.
+    """
+
+    def __init__(self, model_name: str):
+        super().__init__()
+        self.model_name = model_name
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        with self._lock:
+            self._runs[run_id] = (time.time(), time.perf_counter(), _current_trace.get())
+
+    def _finish(self, run_id, outcome: str, usage: dict = None):
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        LLM_REQUESTS.inc(model=self.model_name, outcome=outcome)
+        usage = usage or {}
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                LLM_TOKENS.inc(usage[kind], model=self.model_name, kind=kind.replace("_tokens", ""))
+        if started is None:
+            return
+        started_at, start, trace_id = started
+        duration = time.perf_counter() - start
+        LLM_LATENCY.observe(duration, model=self.model_name)
+        if TRACING_ENABLED and trace_id is not None:
+            span = {"kind": "llm", "name": self.model_name, "start": round(started_at, 6),
+                    "duration_seconds": round(duration, 6), "outcome": outcome}
+            span.update({kind: usage[kind] for kind in ("prompt_tokens", "completion_tokens") if usage.get(kind)})
+            trace_log.add(trace_id, span)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {}
+        llm_output = getattr(response, "llm_output", None) or {}
+        if isinstance(llm_output.get("token_usage"), dict):
+            usage = llm_output["token_usage"]
+        else:
+            for generations in getattr(response, "generations", None) or []:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    if metadata:
+                        usage = {"prompt_tokens": metadata.get("input_tokens"),
+                                 "completion_tokens": metadata.get("output_tokens")}
+        self._finish(run_id, "success", usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        LLM_RETRIES.inc(model=self.model_name)
+
+
+_callback_class = None
+
+
+def llm_metrics_callback(model_name: str):
+    """
+    Returns the metrics callback for one chat model. The LangChain base class
+    is only imported here, on first use, so importing this module stays cheap.
+    """
+    global _callback_class
+    if _callback_class is None:
+        try:
+            from langchain_core.callbacks import BaseCallbackHandler
+        except ImportError:
+            BaseCallbackHandler = object
+        _callback_class = type("LLMMetricsCallback", (_LLMMetricsRecorder, BaseCallbackHandler), {})
+    return _callback_class(model_name)
+
+
+def render_metrics() -> str:
+    return registry.render()
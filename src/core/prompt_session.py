@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.core.cache import make_cache_key
+from src.core.settings import data_path
+from src.core.storage import connect_sqlite
+
+# How many distinct job descriptions keep a live session at once.
+MAX_JD_SESSIONS = 32
+# Prompt statistics of every worker process are added up in SQLite (served at /prompt_sessions/<jd_hash>).
+PROMPT_STATS_PATH = os.getenv("PROMPT_STATS_PATH") or data_path("prompt_stats.sqlite3")
+PROMPT_STATS_TTL_SECONDS = int(os.getenv("PROMPT_STATS_TTL_SECONDS", 7 * 24 * 3600))
+PROMPT_STATS_PRUNE_INTERVAL_SECONDS = 3600
+
+# Shared by every node's prompt so all requests for one JD start with the same tokens.
+JD_PREFIX_TEMPLATE = (
+    "You are an expert AI recruitment assistant working on a single open role. "
+    "Every task you receive concerns the job described below.\n\n"
+    "**Job Description:**\n---\n{job_description}\n---"
+)
+
+# None until the first count; False when tiktoken is not installed.
+_encoding = None
+_sessions_lock = threading.Lock()
+_sessions = OrderedDict()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with tiktoken's cl100k_base encoding when it is installed,
+    otherwise estimates about four characters per token. Either way the number
+    is an approximation of what the Groq-hosted models will count.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text or "", disallowed_special=()))
+    return len(text or "") // 4 + 1
+
+
+class PromptStatsStore:
+    """
+    Prompt and token totals per job description, summed over every worker
+    process in SQLite (WAL). One small upsert per prompt, next to an LLM call
+    that takes seconds.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._last_prune = 0.0
+
+    def _connection(self):
+        # Opened lazily and per process so the store is safe in a pre-fork server.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_stats ("
+                " jd_hash TEXT PRIMARY KEY, prefix_tokens INTEGER NOT NULL, prompts INTEGER NOT NULL,"
+                " prompt_tokens INTEGER NOT NULL, task_tokens INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def add(self, jd_hash: str, prefix_tokens: int, counts: dict):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO prompt_stats (jd_hash, prefix_tokens, prompts, prompt_tokens, task_tokens, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (jd_hash) DO UPDATE SET"
+                    " prompts = prompts + excluded.prompts, prompt_tokens = prompt_tokens + excluded.prompt_tokens,"
+                    " task_tokens = task_tokens + excluded.task_tokens, updated_at = excluded.updated_at",
+                    (jd_hash, prefix_tokens, counts["prompts"], counts["prompt_tokens"], counts["task_tokens"], now),
+                )
+                if now - self._last_prune >= PROMPT_STATS_PRUNE_INTERVAL_SECONDS:
+                    self._last_prune = now
+                    conn.execute("DELETE FROM prompt_stats WHERE updated_at < ?", (now - self.ttl_seconds,))
+
+    def get(self, jd_hash: str):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT prefix_tokens, prompts, prompt_tokens, task_tokens FROM prompt_stats WHERE jd_hash = ?",
+                (jd_hash,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("prefix_tokens", "prompts", "prompt_tokens", "task_tokens"), row))
+
+
+prompt_stats = PromptStatsStore(PROMPT_STATS_PATH, PROMPT_STATS_TTL_SECONDS)
+
+
+def task_prompt(template: str):
+    """
+    Compiles the candidate-specific part of a prompt once, when the agent
+    module defining it is imported.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages([("human", template)])
+
+
+class JDSession:
+    """
+    Per-job-description prompt context shared by every candidate in a batch.
+
+    The JD is rendered once into a system message that is placed first in
+    every prompt (screening, summary, invitation and rejection alike), so the
+    provider sees an identical prefix for every request about this role and
+    can reuse it. Its token count is computed once, and the session counts
+    the prompt tokens sent through it into the shared PromptStatsStore.
+    """
+
+    def __init__(self, job_description: str):
+        from langchain_core.messages import SystemMessage
+
+        self.job_description = job_description
+        self.jd_hash = make_cache_key(job_description)
+        prefix_text = JD_PREFIX_TEMPLATE.format(job_description=job_description)
+        self.prefix_message = SystemMessage(content=prefix_text)
+        self.prefix_tokens = count_tokens(prefix_text)
+        # Registers the JD right away, so its stats URL answers before the first prompt.
+        self._count({"prompts": 0, "prompt_tokens": 0, "task_tokens": 0})
+
+    def _count(self, counts: dict):
+        try:
+            prompt_stats.add(self.jd_hash, self.prefix_tokens, counts)
+        except Exception as e:
+            print(f"ERROR: Could not save prompt statistics. {e}")
+
+    def build_messages(self, task, **variables) -> list:
+        """
+        Returns the chat messages for one call: the shared JD prefix followed
+        by the rendered task prompt.
+        """
+        task_messages = task.format_messages(**variables)
+        task_tokens = sum(count_tokens(message.content) for message in task_messages)
+        self._count({"prompts": 1, "prompt_tokens": self.prefix_tokens + task_tokens, "task_tokens": task_tokens})
+        return [self.prefix_message] + task_messages
+
+    def stats(self):
+        return jd_session_stats(self.jd_hash)
+
+
+def get_jd_session(job_description: str) -> JDSession:
+    """
+    Returns the session for a job description, creating it on first use. The
+    most recently used MAX_JD_SESSIONS sessions are kept.
+    """
+    key = make_cache_key(job_description)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = JDSession(job_description)
+            _sessions[key] = session
+            while len(_sessions) > MAX_JD_SESSIONS:
+                _sessions.popitem(last=False)
+        else:
+            _sessions.move_to_end(key)
+        return session
+
+
+def find_jd_session(jd_hash: str):
+    """
+    Looks up a live session of this process by its JD hash without creating one.
+    """
+    with _sessions_lock:
+        return _sessions.get(jd_hash)
+
+
+def jd_session_stats(jd_hash: str):
+    """
+    Returns the prompt statistics of a job description summed over every
+    worker process, or None if no prompt session exists for it.
+    """
+    stats = prompt_stats.get(jd_hash)
+    if stats is None:
+        return None
+    stats["jd_hash"] = jd_hash
+    stats["shared_prefix_tokens"] = stats["prefix_tokens"] * max(stats["prompts"] - 1, 0)
+    return stats
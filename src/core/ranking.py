@@ -0,0 +1,153 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from src.core.settings import env_flag
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PREFILTER_ENABLED = env_flag("PREFILTER_ENABLED", False)
+# Keep at most this many resumes per batch for LLM screening (0 keeps all that pass the threshold).
+PREFILTER_TOP_K = int(os.getenv("PREFILTER_TOP_K", 0))
+# Minimum relevance (0-1, relative to the best resume in the batch) needed to reach LLM screening.
+PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", 0.2))
+# Optional local sentence-transformers model; when unset, ranking is BM25 only.
+PREFILTER_EMBEDDING_MODEL = os.getenv("PREFILTER_EMBEDDING_MODEL", "")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their this to "
+    "was we were will with you your who what which about into than then them they also such "
+    "job role candidate candidates experience work working team years year ability strong".split()
+)
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+_embedder_lock = threading.Lock()
+_embedder = None
+
+
+def tokenize(text: str) -> list:
+    """
+    Lowercases and splits text into skill-friendly tokens (keeps "c++", "c#",
+    "node.js", "ci-cd") and drops common stopwords.
+    """
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+def bm25_scores(query_tokens: list, documents: list) -> list:
+    """
+    Scores tokenized documents against a tokenized query with Okapi BM25.
+
+    Args:
+        query_tokens: Tokens of the job description.
+        documents: One token list per resume.
+
+    Returns:
+        A list of raw BM25 scores aligned with `documents`.
+    """
+    if not documents:
+        return []
+    doc_count = len(documents)
+    avg_length = sum(len(doc) for doc in documents) / doc_count or 1.0
+    frequencies = [Counter(doc) for doc in documents]
+    document_frequency = Counter(term for freq in frequencies for term in freq)
+    query_terms = set(query_tokens)
+
+    scores = []
+    for doc, freq in zip(documents, frequencies):
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_length)
+        score = 0.0
+        for term in query_terms:
+            tf = freq.get(term)
+            if not tf:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + length_norm)
+        scores.append(score)
+    return scores
+
+
+def _get_embedder():
+    global _embedder
+    if not PREFILTER_EMBEDDING_MODEL or np is None:
+        return None
+    with _embedder_lock:
+        if _embedder is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                _embedder = SentenceTransformer(PREFILTER_EMBEDDING_MODEL, device="cpu")
+            except Exception as e:
+                print(f"Could not load embedding model '{PREFILTER_EMBEDDING_MODEL}', using BM25 only. Error: {e}")
+                _embedder = False
+        return _embedder or None
+
+
+def embed_texts(texts: list):
+    """
+    Embeds texts with the local embedding model as L2-normalized NumPy vectors.
+
+    Returns:
+        A 2-D array (one row per text), or None if no embedding model is available.
+    """
+    embedder = _get_embedder()
+    if embedder is None:
+        return None
+    vectors = np.asarray(embedder.encode(texts, batch_size=32, show_progress_bar=False), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _normalize(scores: list) -> list:
+    top = max(scores) if scores else 0.0
+    return [score / top if top > 0 else 0.0 for score in scores]
+
+
+def rank_resumes(job_description: str, resume_texts: list) -> list:
+    """
+    Scores every resume's relevance to the job description without any LLM
+    call: BM25 over skill tokens, blended with cosine similarity of local
+    embeddings when PREFILTER_EMBEDDING_MODEL is configured.
+
+    Args:
+        job_description: The job description text.
+        resume_texts: Resume texts; None entries score 0.
+
+    Returns:
+        A list of relevance scores in [0, 1] aligned with `resume_texts`.
+    """
+    documents = [tokenize(text) if text else [] for text in resume_texts]
+    scores = _normalize(bm25_scores(tokenize(job_description), documents))
+
+    present = [i for i, text in enumerate(resume_texts) if text]
+    vectors = embed_texts([job_description] + [resume_texts[i] for i in present]) if present else None
+    if vectors is not None:
+        similarities = np.clip(vectors[1:] @ vectors[0], 0.0, 1.0)
+        for position, index in enumerate(present):
+            scores[index] = 0.5 * scores[index] + 0.5 * float(similarities[position])
+    return [round(score, 4) for score in scores]
+
+
+def select_for_screening(scores: list, top_k: int = PREFILTER_TOP_K, min_score: float = PREFILTER_MIN_SCORE) -> list:
+    """
+    Picks the resumes that go on to LLM screening: those scoring at least
+    `min_score`, capped at the best `top_k` when `top_k` is positive.
+
+    Returns:
+        A list of (index, rank, selected) tuples aligned with `scores`, where
+        rank 1 is the most relevant resume.
+    """
+    order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    ranks = {index: rank for rank, index in enumerate(order, start=1)}
+    selection = []
+    for index, score in enumerate(scores):
+        selected = score >= min_score and (top_k <= 0 or ranks[index] <= top_k)
+        selection.append((index, ranks[index], selected))
+    return selection
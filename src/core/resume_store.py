@@ -0,0 +1,308 @@
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from src.core.cache import normalize_text
+from src.core.ranking import BM25_B, BM25_K1, PREFILTER_EMBEDDING_MODEL, embed_texts, np, tokenize
+from src.core.settings import data_path, env_flag
+from src.core.storage import connect_sqlite
+
+RESUME_STORE_ENABLED = env_flag("RESUME_STORE_ENABLED", True)
+RESUME_STORE_PATH = os.getenv("RESUME_STORE_PATH") or data_path("resume_store.sqlite3")
+# Resumes are personal data: ones not uploaded again within this window are deleted (0 keeps them).
+RESUME_STORE_TTL_SECONDS = int(os.getenv("RESUME_STORE_TTL_SECONDS", 180 * 24 * 3600))
+RESUME_STORE_PRUNE_INTERVAL_SECONDS = 3600
+# Stays well under SQLite's limit on bound variables per statement (999 on older builds).
+SQLITE_MAX_VARIABLES = 500
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+
+def content_hash(text: str) -> str:
+    """
+    Returns the SHA-256 of the normalized resume text, used as its identity in
+    the store so re-uploads of the same resume are stored once.
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _chunks(items: list, size: int = None):
+    size = size or SQLITE_MAX_VARIABLES
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ResumeStore:
+    """
+    Local talent pool: parsed resume text deduplicated by content hash, a
+    term -> resume inverted index over skill tokens, and (when a local
+    embedding model is configured) one stored embedding per resume. A new JD
+    is matched against the whole pool with BM25 over the index, without
+    re-parsing or re-uploading any PDF.
+    """
+
+    def __init__(self, path: str, enabled: bool = True, ttl_seconds: int = 0):
+        self.path = path
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._last_prune = 0.0
+
+    def _connection(self):
+        # Opened lazily and per process so the store is safe in a pre-fork server.
+        if self._conn is None or self._pid != os.getpid():
+            conn = connect_sqlite(self.path)
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS resumes (
+                    content_hash TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    email TEXT,
+                    text TEXT NOT NULL,
+                    doc_length INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_seen_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, content_hash)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    content_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (content_hash, model)
+                );
+                CREATE INDEX IF NOT EXISTS idx_postings_hash ON postings (content_hash);
+                CREATE INDEX IF NOT EXISTS idx_resumes_email ON resumes (email);
+                CREATE INDEX IF NOT EXISTS idx_resumes_last_seen ON resumes (last_seen_at);
+                """
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def add_resume(self, filename: str, text: str):
+        """
+        Stores a parsed resume and indexes its terms. Re-adding the same content
+        only refreshes its last-seen time.
+
+        Args:
+            filename: Original upload name, kept for display.
+            text: Parsed resume text.
+
+        Returns:
+            The resume's content hash, or None if the store is disabled or the
+            text is empty.
+        """
+        if not self.enabled or not text or not text.strip():
+            return None
+        key = content_hash(text)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._prune(conn, now)
+            exists = conn.execute("SELECT 1 FROM resumes WHERE content_hash = ?", (key,)).fetchone()
+            if exists:
+                conn.execute("UPDATE resumes SET last_seen_at = ? WHERE content_hash = ?", (now, key))
+                conn.commit()
+                return key
+            tokens = tokenize(text)
+            email = EMAIL_PATTERN.search(text)
+            with conn:
+                conn.execute(
+                    "INSERT INTO resumes (content_hash, filename, email, text, doc_length, created_at, last_seen_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, filename, email.group(0) if email else None, text, len(tokens), now, now),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO postings (term, content_hash, tf) VALUES (?, ?, ?)",
+                    [(term, key, tf) for term, tf in Counter(tokens).items()],
+                )
+        self._store_embedding(key, text)
+        return key
+
+    def _store_embedding(self, key: str, text: str):
+        vectors = embed_texts([text]) if PREFILTER_EMBEDDING_MODEL else None
+        if vectors is None:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (content_hash, model, vector) VALUES (?, ?, ?)",
+                (key, PREFILTER_EMBEDDING_MODEL, vectors[0].tobytes()),
+            )
+            conn.commit()
+
+    def get_text(self, key: str):
+        with self._lock:
+            row = self._connection().execute("SELECT text FROM resumes WHERE content_hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_resumes(self, keys: list) -> list:
+        """
+        Returns stored resumes (hash, filename, text) for the given hashes, in
+        the given order, skipping unknown hashes.
+        """
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            for key in keys:
+                row = conn.execute(
+                    "SELECT content_hash, filename, text FROM resumes WHERE content_hash = ?", (key,)
+                ).fetchone()
+                if row:
+                    found[key] = {"content_hash": row[0], "filename": row[1], "text": row[2]}
+        return [found[key] for key in keys if key in found]
+
+    def search(self, job_description: str, top_k: int = 50) -> list:
+        """
+        Ranks the whole talent pool against a job description.
+
+        BM25 is computed from the inverted index, so only resumes sharing at
+        least one term with the JD are touched. When stored embeddings exist for
+        the configured model, BM25 (normalized to the best match) is blended
+        with cosine similarity.
+
+        Args:
+            job_description: The job description text.
+            top_k: Maximum number of matches to return.
+
+        Returns:
+            Matches sorted by score, each with content_hash, filename, email and score.
+        """
+        if not self.enabled:
+            return []
+        query_terms = sorted(set(tokenize(job_description)))
+        if not query_terms:
+            return []
+        postings = []
+        with self._lock:
+            conn = self._connection()
+            doc_count, avg_length = conn.execute("SELECT COUNT(*), AVG(doc_length) FROM resumes").fetchone()
+            if not doc_count:
+                return []
+            # A long JD has more distinct terms than SQLite allows bound variables.
+            for chunk in _chunks(query_terms):
+                postings.extend(conn.execute(
+                    f"SELECT p.term, p.content_hash, p.tf, r.doc_length FROM postings p"
+                    f" JOIN resumes r ON r.content_hash = p.content_hash"
+                    f" WHERE p.term IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ))
+
+        document_frequency = Counter(term for term, _, _, _ in postings)
+        scores = Counter()
+        for term, key, tf, doc_length in postings:
+            df = document_frequency[term]
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / (avg_length or 1.0))
+            scores[key] += idf * tf * (BM25_K1 + 1) / (tf + length_norm)
+        if not scores:
+            return []
+
+        best = max(scores.values())
+        ranked = {key: score / best for key, score in scores.items()}
+        self._blend_embeddings(job_description, ranked)
+
+        top = sorted(ranked.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        details = {}
+        with self._lock:
+            conn = self._connection()
+            for chunk in _chunks([key for key, _ in top]):
+                details.update(
+                    (row[0], row[1:]) for row in conn.execute(
+                        f"SELECT content_hash, filename, email FROM resumes"
+                        f" WHERE content_hash IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return [
+            {"content_hash": key, "filename": details[key][0], "email": details[key][1], "score": round(score, 4)}
+            for key, score in top if key in details
+        ]
+
+    def _blend_embeddings(self, job_description: str, ranked: dict):
+        if not PREFILTER_EMBEDDING_MODEL or np is None or not ranked:
+            return
+        query = embed_texts([job_description])
+        if query is None:
+            return
+        rows = []
+        with self._lock:
+            conn = self._connection()
+            for chunk in _chunks(list(ranked)):
+                rows.extend(conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ?"
+                    f" AND content_hash IN ({','.join('?' * len(chunk))})",
+                    [PREFILTER_EMBEDDING_MODEL] + chunk,
+                ).fetchall())
+        if not rows:
+            return
+        matrix = np.stack([np.frombuffer(vector, dtype=np.float32) for _, vector in rows])
+        similarities = np.clip(matrix @ query[0], 0.0, 1.0)
+        for (key, _), similarity in zip(rows, similarities):
+            ranked[key] = 0.5 * ranked[key] + 0.5 * float(similarity)
+
+    def _delete(self, conn, keys: list) -> int:
+        with conn:
+            for chunk in _chunks(keys):
+                placeholders = ",".join("?" * len(chunk))
+                conn.execute(f"DELETE FROM postings WHERE content_hash IN ({placeholders})", chunk)
+                conn.execute(f"DELETE FROM embeddings WHERE content_hash IN ({placeholders})", chunk)
+                conn.execute(f"DELETE FROM resumes WHERE content_hash IN ({placeholders})", chunk)
+        return len(keys)
+
+    def _prune(self, conn, now: float):
+        if not self.ttl_seconds or now - self._last_prune < RESUME_STORE_PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = now
+        expired = [row[0] for row in conn.execute(
+            "SELECT content_hash FROM resumes WHERE last_seen_at < ?", (now - self.ttl_seconds,)
+        )]
+        if expired:
+            self._delete(conn, expired)
+            print(f"---TALENT POOL: Deleted {len(expired)} resume(s) not seen for {self.ttl_seconds // 86400} day(s).---")
+
+    def delete(self, content_hash: str = None, email: str = None) -> int:
+        """
+        Removes a candidate's stored resumes with their index entries and
+        embeddings, e.g. on an erasure request.
+
+        Args:
+            content_hash: Delete this resume.
+            email: Delete every resume carrying this contact email.
+
+        Returns:
+            The number of resumes deleted.
+        """
+        with self._lock:
+            conn = self._connection()
+            keys = []
+            if content_hash:
+                keys += [row[0] for row in conn.execute("SELECT content_hash FROM resumes WHERE content_hash = ?", (content_hash,))]
+            if email:
+                keys += [row[0] for row in conn.execute("SELECT content_hash FROM resumes WHERE email = ? COLLATE NOCASE", (email,))]
+            return self._delete(conn, sorted(set(keys))) if keys else 0
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            conn = self._connection()
+            resumes = conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+            terms = conn.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+            embeddings = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"enabled": True, "resumes": resumes, "indexed_terms": terms, "embeddings": embeddings}
+
+
+resume_store = ResumeStore(RESUME_STORE_PATH, enabled=RESUME_STORE_ENABLED, ttl_seconds=RESUME_STORE_TTL_SECONDS)
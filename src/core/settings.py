@@ -0,0 +1,22 @@
+import os
+
+# Root folder for everything the app persists locally (caches, stores, checkpoints).
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """
+    Reads a boolean flag from the environment ("1", "true", "yes", "on").
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def data_path(filename: str) -> str:
+    """
+    Returns the path of a file inside DATA_DIR, creating the folder if needed.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, filename)
@@ -0,0 +1,17 @@
+import os
+import sqlite3
+
+
+def connect_sqlite(path: str):
+    """
+    Opens a SQLite connection tuned for the app's local stores: WAL journaling
+    so readers never block the writer, relaxed fsync, and a generous busy
+    timeout because several worker processes may share the same file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
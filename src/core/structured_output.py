@@ -0,0 +1,204 @@
+import math
+import os
+
+from src.core.llm_calls import invoke_llm, model_name_of, status_code_of
+from src.core.metrics import registry
+from src.utils.helpers import extract_json
+
+# Models whose provider JSON mode (response_format={"type": "json_object"}) is used for
+# structured calls; "*" enables it for every model. Reasoning models such as qwen3 are
+# left out by default and go through the extractor, which strips their <think> blocks.
+LLM_JSON_MODE_MODELS = {
+    name.strip() for name in os.getenv("LLM_JSON_MODE_MODELS", "llama-3.3-70b-versatile,llama-3.1-8b-instant").split(",")
+    if name.strip()
+}
+JSON_MODE_FORMAT = {"type": "json_object"}
+
+STRUCTURED_OUTPUTS = registry.counter(
+    "hiring_llm_structured_outputs_total", "Structured LLM outputs by parse outcome.", ("model", "outcome")
+)
+
+# Models that rejected response_format at runtime; they fall back to plain text calls.
+_json_mode_unsupported = set()
+
+
+class StructuredOutputError(ValueError):
+    """
+    Raised when a model's output is not a JSON object or does not match its schema.
+    """
+
+
+class Field:
+    """
+    One key of a structured-output schema. Values are coerced to `kind`
+    ("str", "int", "float", "list" of strings, or "object" with a nested
+    schema) and numbers are clamped to [minimum, maximum].
+    """
+
+    def __init__(self, kind: str, required: bool = True, default=None, minimum=None, maximum=None, schema: dict = None):
+        self.kind = kind
+        self.required = required
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.schema = schema
+
+    def _clamp(self, value):
+        if self.minimum is not None:
+            value = max(self.minimum, value)
+        if self.maximum is not None:
+            value = min(self.maximum, value)
+        return value
+
+    def coerce(self, value, path: str):
+        if self.kind == "object":
+            return validate(value, self.schema, path)
+        if self.kind == "list":
+            if isinstance(value, str):
+                return [value]
+            if isinstance(value, list):
+                return [str(item) for item in value if item is not None and not isinstance(item, (dict, list))]
+            raise StructuredOutputError(f"{path} must be a list")
+        if isinstance(value, (dict, list)):
+            raise StructuredOutputError(f"{path} must be a {self.kind}")
+        if self.kind == "str":
+            return str(value)
+        try:
+            number = float(str(value).strip().rstrip("%"))
+        except ValueError:
+            raise StructuredOutputError(f"{path} must be a number, got {value!r}") from None
+        if not math.isfinite(number):
+            raise StructuredOutputError(f"{path} must be a finite number, got {value!r}")
+        return self._clamp(int(number) if self.kind == "int" else number)
+
+
+def validate(data, schema: dict, path: str = "output") -> dict:
+    """
+    Checks a parsed object against a schema and coerces its values.
+
+    Args:
+        data: The parsed JSON value.
+        schema: Mapping of key name to Field.
+        path: Name used for `data` in error messages.
+
+    Returns:
+        A copy of `data` with coerced values and defaults filled in. Empty
+        optional keys without a default are dropped, and keys the schema does
+        not mention are kept as they are.
+
+    Raises:
+        StructuredOutputError: If `data` is not an object, a required key is
+            missing or a value cannot be coerced.
+    """
+    if not isinstance(data, dict):
+        raise StructuredOutputError(f"{path} is not a JSON object")
+    result = dict(data)
+    for name, field in schema.items():
+        value = data.get(name)
+        if value is None or value == "":
+            if field.required:
+                raise StructuredOutputError(f"{path}.{name} is missing")
+            if field.default is not None:
+                result[name] = list(field.default) if isinstance(field.default, list) else field.default
+            else:
+                result.pop(name, None)
+            continue
+        result[name] = field.coerce(value, f"{path}.{name}")
+    return result
+
+
+PROFILE_SCHEMA = {
+    "top_skills_matched": Field("list"),
+    "experience_gaps": Field("list", required=False, default=[]),
+    "key_accomplishments": Field("list", required=False, default=[]),
+    "overall_fit_comment": Field("str", required=False, default=""),
+}
+
+SCREENING_SCHEMA = {
+    # No default: the drafting agents fall back to "Candidate" when the name is missing.
+    "candidateName": Field("str", required=False),
+    "candidateEmail": Field("str", required=False, default="N/A"),
+    "matchScore": Field("int", minimum=0, maximum=100),
+    "summary": Field("str", required=False, default=""),
+    "confidence": Field("float", required=False, minimum=0.0, maximum=1.0),
+}
+
+SCREENING_WITH_PROFILE_SCHEMA = dict(SCREENING_SCHEMA, profile=Field("object", schema=PROFILE_SCHEMA))
+
+BATCH_ENTRY_SCHEMA = dict(SCREENING_WITH_PROFILE_SCHEMA, index=Field("int"))
+
+EMAIL_SCHEMA = {
+    "subject": Field("str"),
+    "body": Field("str"),
+}
+
+EMAIL_EDIT_SCHEMA = {
+    "find": Field("str"),
+    "replace": Field("str", required=False, default=""),
+}
+
+
+def supports_json_mode(model_name: str) -> bool:
+    if model_name in _json_mode_unsupported:
+        return False
+    return "*" in LLM_JSON_MODE_MODELS or model_name in LLM_JSON_MODE_MODELS
+
+
+def _failed_generation(error):
+    # Groq answers a JSON-mode response that is not valid JSON with a 400 that
+    # carries the raw output, which is usually repairable.
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        body = body.get("error", body)
+        if isinstance(body, dict):
+            return body.get("failed_generation")
+    return None
+
+
+def invoke_structured(llm, messages, schema: dict = None, model_name: str = None):
+    """
+    Calls the model for a JSON object, with provider JSON mode where the model
+    supports it, then extracts, repairs and validates the output.
+
+    Args:
+        llm: A chat model from get_llm().
+        messages: Chat messages to send; they must ask for JSON.
+        schema: Optional schema (mapping of key name to Field) to validate against.
+        model_name: Limiter key; defaults to the model's own name.
+
+    Returns:
+        The parsed (and, with a schema, validated) JSON object.
+
+    Raises:
+        StructuredOutputError: If no valid object can be recovered from the output.
+        Exception: The provider error from invoke_llm.
+    """
+    model_name = model_name or model_name_of(llm)
+    content = None
+    if supports_json_mode(model_name):
+        try:
+            content = invoke_llm(llm.bind(response_format=JSON_MODE_FORMAT), messages, model_name=model_name).content
+        except Exception as e:
+            if status_code_of(e) != 400:
+                raise
+            content = _failed_generation(e)
+            if content is None:
+                print(f"---JSON MODE: {model_name} rejected response_format, using plain output. ({e})---")
+                _json_mode_unsupported.add(model_name)
+            else:
+                STRUCTURED_OUTPUTS.inc(model=model_name, outcome="failed_generation")
+    if content is None:
+        content = invoke_llm(llm, messages, model_name=model_name).content
+
+    parsed = extract_json(content)
+    if not isinstance(parsed, dict):
+        STRUCTURED_OUTPUTS.inc(model=model_name, outcome="unparseable")
+        raise StructuredOutputError(f"{model_name} did not return a JSON object")
+    if schema is not None:
+        try:
+            parsed = validate(parsed, schema)
+        except StructuredOutputError:
+            STRUCTURED_OUTPUTS.inc(model=model_name, outcome="invalid")
+            raise
+    STRUCTURED_OUTPUTS.inc(model=model_name, outcome="ok")
+    return parsed
@@ -1,45 +1,202 @@
 import smtplib
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
-SMTP_HOST = os.getenv("EMAIL_HOST")
-SMTP_PORT = int(os.getenv("EMAIL_PORT", 587)) 
-SMTP_USER = os.getenv("EMAIL_USER")
-SMTP_PASS = os.getenv("EMAIL_PASS")
+from src.core.metrics import timed_stage
+
+# main.py's SMTP_* names take precedence; the older EMAIL_* names are only a fallback.
+SMTP_HOST = os.getenv("SMTP_SERVER") or os.getenv("EMAIL_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT") or os.getenv("EMAIL_PORT") or 587)
+SMTP_USER = os.getenv("SMTP_USER") or os.getenv("EMAIL_USER")
+SMTP_PASS = os.getenv("SMTP_PASSWORD") or os.getenv("EMAIL_PASS")
+# STARTTLS can be switched off for a local SMTP stand-in such as aiosmtpd.
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").strip().lower() not in ("0", "false", "no", "off")
+SMTP_MAX_PER_MINUTE = int(os.getenv("SMTP_MAX_PER_MINUTE", 60))
+# Connections idle for longer than this are checked with NOOP before reuse.
+SMTP_IDLE_CHECK_SECONDS = float(os.getenv("SMTP_IDLE_CHECK_SECONDS", 30))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+
+_sender_lock = threading.Lock()
+_sender = None
+
+
+class PooledSMTPSender:
+    """
+    Long-lived SMTP sender. A single background thread owns one authenticated
+    connection and drains a send queue, so STARTTLS and login happen once per
+    session instead of once per email. Sends are rate limited to
+    `max_per_minute`. If a reused connection turns out to have been dropped,
+    it is re-established and the message retried once; any other SMTP error
+    (auth, refused recipient, rejected data) is raised without a retry, so a
+    message is never sent twice.
+    """
+
+    def __init__(self, host, port, user=None, password=None, use_tls=True, max_per_minute=60):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.min_interval = 60.0 / max_per_minute if max_per_minute > 0 else 0.0
+        self._queue = queue.Queue()
+        self._server = None
+        self._last_used = 0.0
+        self._last_sent = 0.0
+        self._sent_on_connection = 0
+        self._worker = threading.Thread(target=self._run, name="smtp-sender", daemon=True)
+        self._worker.start()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        if self.use_tls:
+            server.starttls()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        return server
+
+    def _disconnect(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def _connection(self):
+        if self._server is not None and time.time() - self._last_used > SMTP_IDLE_CHECK_SECONDS:
+            try:
+                if self._server.noop()[0] != 250:
+                    self._disconnect()
+            except Exception:
+                self._disconnect()
+        if self._server is None:
+            self._server = self._connect()
+            self._sent_on_connection = 0
+        return self._server
+
+    def _deliver(self, msg):
+        wait = self.min_interval - (time.time() - self._last_sent)
+        if wait > 0:
+            time.sleep(wait)
+        for attempt in range(2):
+            server = self._connection()
+            try:
+                server.send_message(msg)
+                self._sent_on_connection += 1
+                self._last_sent = self._last_used = time.time()
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Only a pooled connection that went stale is retried; a fresh one failing is a real error.
+                # SMTPException subclasses OSError, so OSError itself is not caught here.
+                reused = self._sent_on_connection > 0
+                self._disconnect()
+                if attempt == 1 or not reused:
+                    raise
+
+    def _run(self):
+        while True:
+            msg, future = self._queue.get()
+            if msg is None:
+                self._disconnect()
+                future.set_result(None)
+                return
+            try:
+                self._deliver(msg)
+                future.set_result(None)
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, msg) -> Future:
+        """
+        Queues a message and returns a Future that resolves once it is sent.
+        """
+        future = Future()
+        self._queue.put((msg, future))
+        return future
+
+    @timed_stage("smtp_send")
+    def send_message(self, msg):
+        """
+        Sends one message over the pooled connection, blocking until it is sent.
+        """
+        self.submit(msg).result()
+
+    def close(self):
+        future = Future()
+        self._queue.put((None, future))
+        future.result()
+
+
+def get_smtp_sender() -> PooledSMTPSender:
+    """
+    Returns this process's shared SMTP sender, creating it on first use.
+
+    Raises:
+        ValueError: If no SMTP host is configured.
+    """
+    global _sender
+    with _sender_lock:
+        if _sender is None or not _sender._worker.is_alive():
+            if not SMTP_HOST:
+                raise ValueError("Email configuration is incomplete.")
+            _sender = PooledSMTPSender(
+                SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS,
+                use_tls=SMTP_USE_TLS, max_per_minute=SMTP_MAX_PER_MINUTE,
+            )
+        return _sender
+
+
+def close_smtp_sender():
+    """
+    Closes this process's SMTP session, if one was opened (used on shutdown).
+    """
+    global _sender
+    with _sender_lock:
+        sender, _sender = _sender, None
+    if sender is not None and sender._worker.is_alive():
+        sender.close()
+
+
+def build_message(to_address: str, subject: str, body_html: str):
+    msg = MIMEMultipart('alternative')
+    msg['From'] = SMTP_USER or os.getenv("EMAIL_FROM", "noreply@localhost")
+    msg['To'] = to_address
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body_html, 'html'))
+    return msg
+
 
 def send_email(to_address: str, subject: str, body_html: str):
     """
     Sends an email using the configured SMTP settings from the .env file.
 
+    The message goes through the shared pooled sender, so consecutive emails
+    reuse one authenticated SMTP session.
+
     Args:
         to_address: The recipient's email address.
         subject: The subject line of the email.
         body_html: The HTML content of the email body.
     """
-    
-    if not all([SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS]):
+
+    # Credentials are optional when STARTTLS is off (local test servers accept anonymous mail).
+    if not SMTP_HOST or (SMTP_USE_TLS and not all([SMTP_USER, SMTP_PASS])):
         print("\n--- EMAIL ERROR ---")
         print("Email configuration is missing. Please check your .env file.")
-        print("Required variables: EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASS")
+        print("Required variables: SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASSWORD "
+              "(or EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASS)")
         print("---------------------\n")
         raise ValueError("Email configuration is incomplete.")
 
     try:
-        msg = MIMEMultipart('alternative')
-        msg['From'] = SMTP_USER
-        msg['To'] = to_address
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(body_html, 'html'))
-
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()  
-            server.login(SMTP_USER, SMTP_PASS) 
-            server.send_message(msg) 
-            print(f"Email sent successfully to {to_address}")
+        get_smtp_sender().send_message(build_message(to_address, subject, body_html))
+        print(f"Email sent successfully to {to_address}")
 
     except Exception as e:
         print(f"Failed to send email to {to_address}: {e}")
         raise
-
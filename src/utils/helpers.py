@@ -1,6 +1,106 @@
 import json
 import re
 
+# Only the characters that change the JSON structure are visited when scanning.
+STRUCTURAL_PATTERN = re.compile(r'[{}\[\]"\\]')
+DANGLING_KEY_PATTERN = re.compile(r'(?:,|(?<=\{))\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+PARTIAL_VALUE_PATTERN = re.compile(r'(?<=[:,\[])\s*(?:t|tr|tru|f|fa|fal|fals|n|nu|nul|-|-?\d+\.|-?\d+(?:\.\d+)?[eE][-+]?)$')
+TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+MAX_EXTRACTION_ATTEMPTS = 3
+
+
+def strip_think_blocks(text: str) -> str:
+    """
+    Drops the reasoning that models such as qwen3 emit in <think>...</think>
+    before their answer. Output cut off inside the reasoning has no answer.
+    """
+    end = text.rfind("</think>")
+    if end != -1:
+        return text[end + len("</think>"):]
+    if text.lstrip().startswith("<think>"):
+        return ""
+    return text
+
+
+def _scan_json(text: str, start: int):
+    # Walks the structural characters from the '{' at `start`. Returns the end
+    # of the value, the brackets still open and whether it stopped inside a string.
+    stack, in_string, skip_until = [], False, -1
+    for match in STRUCTURAL_PATTERN.finditer(text, start):
+        position, char = match.start(), match.group()
+        if position < skip_until:
+            continue
+        if in_string:
+            if char == "\\":
+                skip_until = position + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return position + 1, [], False
+    return len(text), stack, in_string
+
+
+def _repair_json(fragment: str, stack: list, in_string: bool) -> str:
+    # Makes a truncated or slightly malformed object parseable: closes an open
+    # string, drops a dangling key or partial value, removes trailing commas and
+    # closes every open bracket.
+    if in_string:
+        if fragment.endswith("\\"):
+            fragment = fragment[:-1]
+        fragment += '"'
+    for _ in range(3):
+        trimmed = fragment.rstrip().rstrip(",")
+        trimmed = PARTIAL_VALUE_PATTERN.sub("", trimmed).rstrip().rstrip(",")
+        if stack and stack[-1] == "{":
+            trimmed = DANGLING_KEY_PATTERN.sub("", trimmed).rstrip().rstrip(",")
+        if trimmed == fragment:
+            break
+        fragment = trimmed
+    fragment = TRAILING_COMMA_PATTERN.sub(r"\1", fragment)
+    return fragment + "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+
+
+def extract_json(llm_output: str):
+    """
+    Extracts the first JSON object from raw model output in one pass over its
+    structural characters. <think> blocks, code fences and surrounding prose
+    are skipped, control characters inside strings are accepted, and an object
+    cut off by the token limit is repaired by closing what is still open.
+
+    Args:
+        llm_output: The raw string output from the language model.
+
+    Returns:
+        The parsed object, or None if no JSON object could be recovered.
+    """
+    if not llm_output:
+        return None
+    text = strip_think_blocks(llm_output)
+    start = text.find("{")
+    for _ in range(MAX_EXTRACTION_ATTEMPTS):
+        if start == -1:
+            return None
+        end, stack, in_string = _scan_json(text, start)
+        fragment = text[start:end]
+        if not stack:
+            try:
+                return json.loads(fragment, strict=False)
+            except ValueError:
+                pass
+        try:
+            return json.loads(_repair_json(fragment, stack, in_string), strict=False)
+        except ValueError:
+            start = text.find("{", start + 1)
+    return None
+
+
 def clean_and_parse_json(llm_output: str) -> dict:
     """
     Cleans and parses a JSON string from an LLM, now with added logic
@@ -13,22 +113,8 @@ def clean_and_parse_json(llm_output: str) -> dict:
         A dictionary parsed from the JSON string. Returns an empty dictionary
         if parsing fails.
     """
-    try:
-        cleaned_string = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', llm_output)
-
-        cleaned_string = cleaned_string.strip().replace('```json', '').replace('```', '')
-        
-        start_index = cleaned_string.find('{')
-        end_index = cleaned_string.rfind('}') + 1
-        
-        if start_index != -1 and end_index != 0:
-            json_string = cleaned_string[start_index:end_index]
-            return json.loads(json_string)
-        else:
-            print("ERROR: No valid JSON object found in the LLM output.")
-            return {}
-            
-    except json.JSONDecodeError as e:
-        print(f"ERROR: Failed to parse JSON from LLM response. Details: {e}")
+    parsed = extract_json(llm_output or "")
+    if not isinstance(parsed, dict):
+        print("ERROR: No valid JSON object found in the LLM output.")
         return {}
-
+    return parsed
@@ -1,4 +1,171 @@
-import fitz  
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.metrics import timed_stage
+
+# Uploads larger than this many bytes, or with more pages, are refused outright.
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", 10 * 1024 * 1024))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 40))
+# Extracted text beyond this many characters is dropped; nothing downstream needs more.
+PDF_MAX_TEXT_CHARS = int(os.getenv("PDF_MAX_TEXT_CHARS", 200000))
+# Documents with at least this many pages are split across worker processes.
+PDF_PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", 12))
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+
+
+class PDFLimitError(ValueError):
+    """Raised when an uploaded PDF exceeds the configured size or page limits."""
+
+
+def _page_pool():
+    # PyMuPDF is not thread-safe, so parallel extraction uses processes. The
+    # pool is created lazily and per process so forked servers get their own.
+    # Children are spawned, not forked: forking a process that runs job and
+    # request threads can copy a held lock into the child and deadlock it.
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=PDF_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _check_size(data: bytes):
+    if len(data) > PDF_MAX_BYTES:
+        raise PDFLimitError(f"PDF is {len(data)} bytes; the limit is {PDF_MAX_BYTES} bytes.")
+
+
+def _check_pages(page_count: int):
+    if page_count > PDF_MAX_PAGES:
+        raise PDFLimitError(f"PDF has {page_count} pages; the limit is {PDF_MAX_PAGES} pages.")
+
+
+def _take_text(pages, max_chars: int) -> list:
+    # Collects page texts until max_chars is reached; later pages are never read.
+    taken = []
+    for text in pages:
+        if max_chars <= 0:
+            break
+        taken.append(text[:max_chars])
+        max_chars -= len(text) + 1
+    return taken
+
+
+def _extract_page_range(path: str, start: int, stop: int, max_chars: int) -> list:
+    # Runs in a spawned worker, which opens the spooled file itself instead of
+    # being sent a copy of the PDF. PyMuPDF is imported on first use so
+    # importing the app stays fast.
+    import fitz
+
+    with fitz.open(path) as doc:
+        return _take_text((doc[i].get_text() for i in range(start, stop)), max_chars)
+
+
+def _parse_in_parallel(data: bytes, page_count: int) -> list:
+    # The upload is written once to a temporary file that every worker reads
+    # its page range from, and deleted when they are done.
+    chunk = -(-page_count // PDF_PARSE_WORKERS)
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            spool.write(data)
+        pool = _page_pool()
+        futures = [
+            pool.submit(_extract_page_range, path, start, min(start + chunk, page_count), PDF_MAX_TEXT_CHARS)
+            for start in range(0, page_count, chunk)
+        ]
+        try:
+            pages = []
+            for future in futures:
+                pages.extend(future.result())
+                if sum(len(text) + 1 for text in pages) >= PDF_MAX_TEXT_CHARS:
+                    break
+            return pages
+        finally:
+            for future in futures:
+                future.cancel()
+            # The workers that already started must finish before their file is removed.
+            for future in futures:
+                if not future.cancelled():
+                    future.exception()
+    finally:
+        os.remove(path)
+
+
+def iter_pdf_pages(data: bytes):
+    """
+    Lazily yields the text of each page of an in-memory PDF, one page at a
+    time, so callers can stop early or process very long documents without
+    holding all of their text at once.
+
+    Args:
+        data: The raw bytes of the PDF upload.
+
+    Yields:
+        The text of each page, in page order.
+
+    Raises:
+        PDFLimitError: If the document exceeds PDF_MAX_BYTES or PDF_MAX_PAGES.
+    """
+    _check_size(data)
+    import fitz
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        _check_pages(doc.page_count)
+        for page in doc:
+            yield page.get_text()
+
+
+@timed_stage("pdf_parse")
+def parse_pdf_from_bytes(data: bytes, filename: str = "upload.pdf") -> str:
+    """
+    Parses a PDF held in memory (e.g. a Flask upload). Short documents are
+    read page by page, and reading stops once PDF_MAX_TEXT_CHARS of text are
+    collected. Long ones are spooled to a temporary file whose page ranges
+    are extracted in parallel worker processes.
+
+    Args:
+        data: The raw bytes of the PDF upload.
+        filename: Name used in log and error messages.
+
+    Returns:
+        A single string containing the text of the PDF, capped at
+        PDF_MAX_TEXT_CHARS. Returns an error message if the file cannot be
+        opened or read.
+
+    Raises:
+        PDFLimitError: If the document exceeds PDF_MAX_BYTES or PDF_MAX_PAGES.
+    """
+    try:
+        _check_size(data)
+        import fitz
+
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            page_count = doc.page_count
+            _check_pages(page_count)
+            parallel = page_count >= PDF_PARALLEL_PAGE_THRESHOLD and PDF_PARSE_WORKERS > 1
+            if not parallel:
+                pages = _take_text((page.get_text() for page in doc), PDF_MAX_TEXT_CHARS)
+        if parallel:
+            pages = _parse_in_parallel(data, page_count)
+
+        return "\n".join(pages)[:PDF_MAX_TEXT_CHARS]
+
+    except PDFLimitError:
+        raise
+    except Exception as e:
+        print(f"Error reading PDF upload {filename}: {e}")
+        return f"Error: Could not read the PDF file. Details: {e}"
+
+
+@timed_stage("pdf_parse")
 def parse_pdf_from_path(file_path: str) -> str:
     """
     Parses a PDF file from a given path and extracts all its text content.
@@ -14,6 +181,8 @@ def parse_pdf_from_path(file_path: str) -> str:
         error message if the file cannot be opened or read.
     """
     try:
+        import fitz
+
         doc = fitz.open(file_path)
         
         full_text = []
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Module-level stores resolve their paths at import time, so point them at a scratch folder first.
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="hiring-tests-"))
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Routes every agent to benchmark.py's deterministic fake chat model, with no
+    latency and the LLM result cache off.
+    """
+    pytest.importorskip("langchain_core")
+    from benchmark import build_fake_chat_model
+    from src.core import llm_calls
+    from src.core.cache import llm_cache
+    from src.core.llm_registry import set_llm_factory
+
+    monkeypatch.setattr(llm_calls, "LLM_REQUESTS_PER_MINUTE", 0)
+    monkeypatch.setattr(llm_cache, "enabled", False)
+    set_llm_factory(build_fake_chat_model(0.0, 0.0, seed=7))
+    yield
+    set_llm_factory(None)
+
+
+@pytest.fixture
+def sent_emails():
+    return []
+
+
+@pytest.fixture
+def app_module(fake_llm, sent_emails, monkeypatch):
+    """
+    main.py with the fake LLM, an SMTP sender that records into sent_emails,
+    and its graph rebuilt (checkpointer reopened) on next use.
+    """
+    pytest.importorskip("langgraph")
+    import main
+
+    sender = type("RecordingSender", (), {"send_message": lambda self, msg: sent_emails.append(msg)})()
+    monkeypatch.setattr(main, "get_smtp_sender", lambda: sender)
+    monkeypatch.setattr(main, "SMTP_HOST", "localhost")
+    monkeypatch.setattr(main, "SMTP_USE_TLS", False)
+    monkeypatch.setattr(main, "_graph", None)
+    monkeypatch.setattr(main, "_checkpointer", None)
+    return main
@@ -0,0 +1,84 @@
+import io
+import json
+import uuid
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+from benchmark import JOB_DESCRIPTION, synthetic_resume_text
+from src.core.decisions import decision_claims
+
+
+def paused_thread(app_module):
+    thread_id = f"thread-{uuid.uuid4().hex}"
+    config = {"configurable": {"thread_id": thread_id}}
+    app_module.run_graph(app_module.graph_input(JOB_DESCRIPTION, synthetic_resume_text(1, seed=7)), config)
+    assert app_module.get_graph().get_state(config).next == ("email_sender",)
+    return thread_id
+
+
+def test_duplicate_approvals_send_one_email(app_module, sent_emails):
+    thread_id = paused_thread(app_module)
+    results = app_module.apply_decisions_concurrently([{"thread_id": thread_id, "decision": "approve"}] * 2)
+    assert sorted(result["status"] for result in results) == [200, 409]
+    assert len(sent_emails) == 1
+
+    body, status = app_module.apply_decision(thread_id, "manual_edit_and_send", {"edited_email": "Again"})
+    assert status == 409 and body["state"]["final_status"] == "Email Sent Successfully"
+    assert len(sent_emails) == 1
+
+
+def test_claimed_thread_refuses_other_decisions(app_module, sent_emails):
+    thread_id = paused_thread(app_module)
+    # Held by a decision running on another worker process.
+    token = decision_claims.claim(thread_id)
+    try:
+        body, status = app_module.apply_decision(thread_id, "approve", {})
+        assert status == 409 and "in progress" in body["error"]
+    finally:
+        decision_claims.release(thread_id, token)
+    assert app_module.apply_decision(thread_id, "approve", {})[1] == 200
+    assert len(sent_emails) == 1
+
+
+def test_unparseable_uploads_are_reported_without_a_graph_run(app_module, monkeypatch):
+    fitz = pytest.importorskip("fitz")
+    from src.utils import pdf_parser
+
+    doc = fitz.open()
+    doc.new_page()
+    one_page_pdf = doc.tobytes()
+
+    monkeypatch.setattr(pdf_parser, "PDF_MAX_PAGES", 0)
+    parsed = []
+    parse = app_module.parse_pdf_from_bytes
+    monkeypatch.setattr(app_module, "parse_pdf_from_bytes", lambda data, name: parsed.append(name) or parse(data, name))
+    monkeypatch.setattr(app_module, "run_graph", lambda *args: pytest.fail("the graph must not run"))
+
+    items = [{"filename": "long.pdf", "resume_bytes": one_page_pdf}, {"filename": "broken.pdf", "resume_bytes": b"junk"}]
+    prepared = app_module.prepare_resumes(JOB_DESCRIPTION, items)
+    results = [app_module.process_single_resume(JOB_DESCRIPTION, item) for item in prepared]
+    assert sorted(parsed) == ["broken.pdf", "long.pdf"]
+    assert "the limit is 0 pages" in results[0]["error"]
+    assert results[1]["error"].startswith("Could not read the PDF file")
+
+
+def test_job_stream_reports_every_resume_then_done(app_module):
+    pytest.importorskip("fitz")
+    from benchmark import synthetic_resume_pdf
+
+    client = app_module.app.test_client()
+    response = client.post("/process", data={
+        "job_description_text": JOB_DESCRIPTION,
+        "resumes": [(io.BytesIO(synthetic_resume_pdf(index, seed=11)), f"resume-{index}.pdf") for index in (1, 2)],
+    }, content_type="multipart/form-data")
+    job = response.get_json()
+    assert job["total"] == 2
+
+    frames = client.get(job["stream_url"]).get_data(as_text=True).strip().split("\n\n")
+    events = [(frame.split("\n")[0], json.loads(frame.split("data: ", 1)[1])) for frame in frames]
+    assert [event for event, _ in events] == ["event: result", "event: result", "event: done"]
+    assert sorted(payload["filename"] for _, payload in events[:2]) == ["resume-1.pdf", "resume-2.pdf"]
+    assert events[-1][1] == {"job_id": job["job_id"], "total": 2, "status": "completed"}
+    assert client.get(job["status_url"]).get_json()["completed"] == 2
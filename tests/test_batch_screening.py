@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from src.agents import resume_screening_agent as screening
+from src.core.prompt_session import get_jd_session
+
+JOB_DESCRIPTION = "Senior Python developer with Flask and SQL experience."
+
+
+@pytest.fixture
+def words_as_tokens(monkeypatch):
+    # One token per word keeps the budget arithmetic readable.
+    monkeypatch.setattr(screening, "count_tokens", lambda text: len((text or "").split()))
+    overhead = get_jd_session(JOB_DESCRIPTION).prefix_tokens + len(screening.BATCH_SCREENING_TEMPLATE.split())
+
+    def configure(budget, batch_size=10, max_resume_tokens=1000):
+        monkeypatch.setattr(screening, "SCREENING_BATCH_TOKEN_BUDGET", overhead + budget)
+        monkeypatch.setattr(screening, "SCREENING_BATCH_SIZE", batch_size)
+        monkeypatch.setattr(screening, "SCREENING_BATCH_MAX_RESUME_TOKENS", max_resume_tokens)
+
+    return configure
+
+
+def resume(words):
+    return " ".join(["skill"] * words)
+
+
+def test_packs_resumes_up_to_the_token_budget(words_as_tokens):
+    words_as_tokens(budget=100)
+    texts = {0: resume(40), 1: resume(40), 2: resume(40), 3: resume(40)}
+    assert screening.plan_screening_batches(JOB_DESCRIPTION, texts) == [[0, 1], [2, 3]]
+
+
+def test_respects_the_batch_size(words_as_tokens):
+    words_as_tokens(budget=1000, batch_size=3)
+    texts = {i: resume(10) for i in range(7)}
+    assert screening.plan_screening_batches(JOB_DESCRIPTION, texts) == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_long_resumes_and_singletons_are_left_for_single_screening(words_as_tokens):
+    words_as_tokens(budget=100, max_resume_tokens=50)
+    texts = {0: resume(60), 1: resume(30), 2: resume(30), 3: resume(80)}
+    batches = screening.plan_screening_batches(JOB_DESCRIPTION, texts)
+    assert batches == [[1, 2]]
+    assert screening.plan_screening_batches(JOB_DESCRIPTION, {0: resume(30)}) == []
@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("langgraph")
+
+BENCHMARK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark.py")
+
+
+def test_benchmark_runs_on_the_default_checkpointer(tmp_path):
+    # A separate process: the benchmark rewrites the environment and swaps in the fake LLM.
+    report = tmp_path / "report.json"
+    env = dict(os.environ, CHECKPOINTER_BACKEND="memory")
+    completed = subprocess.run(
+        [sys.executable, BENCHMARK, "--batch-sizes", "3", "--concurrency", "2",
+         "--latency-ms", "0", "--jitter-ms", "0", "--json", str(report)],
+        env=env, capture_output=True, text=True, timeout=300,
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    data = json.loads(report.read_text())
+    assert data["settings"]["checkpointer"] == "sqlite"
+    assert {row["scenario"] for row in data["results"]} == {"graph", "process", "resume"}
+    assert all(row["errors"] == 0 for row in data["results"])
+    assert data["emails_sent"] == 6
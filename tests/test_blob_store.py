@@ -0,0 +1,50 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.core import blob_store as blob_store_module
+from src.core.blob_store import BlobStore, blob_ref, state_text
+
+RESUME = "Senior Python developer. Flask, SQL, AWS. " * 200
+
+
+def test_texts_round_trip_through_another_process(tmp_path):
+    path = str(tmp_path / "blobs.sqlite3")
+    store = BlobStore(path, cache_max_bytes=1024 * 1024, ttl_seconds=3600)
+    ref = store.put(RESUME)
+    assert ref == blob_ref(RESUME) and ref.startswith("sha256:")
+    assert store.put(RESUME) == ref
+
+    # A second store on the same file stands in for another worker process.
+    other = BlobStore(path, cache_max_bytes=1024 * 1024, ttl_seconds=3600)
+    assert other.get(ref) == RESUME
+    assert other.get(blob_ref("never stored")) is None
+    stats = store.stats()
+    assert stats["blobs"] == 1 and stats["writes"] == 1
+    assert stats["stored_bytes"] < len(RESUME) // 10
+
+
+def test_unused_blobs_are_collected_after_the_ttl(tmp_path):
+    path = str(tmp_path / "blobs.sqlite3")
+    store = BlobStore(path, cache_max_bytes=1024 * 1024, ttl_seconds=60)
+    old, recent = store.put("old resume"), store.put("recent resume")
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE blobs SET last_used_at = ? WHERE ref = ?", (time.time() - 120, old))
+
+    collector = BlobStore(path, cache_max_bytes=1024 * 1024, ttl_seconds=60)
+    collector.put("new resume")
+    assert collector.get(old) is None
+    assert collector.get(recent) == "recent resume"
+    assert collector.stats()["blobs"] == 2
+
+
+def test_state_text_reads_references_and_inline_texts(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / "blobs.sqlite3"), cache_max_bytes=1024, ttl_seconds=3600)
+    monkeypatch.setattr(blob_store_module, "blob_store", store)
+    state = {"resume_content_ref": store.put(RESUME), "job_description": "Inline JD"}
+    assert state_text(state, "resume_content") == RESUME
+    assert state_text(state, "job_description") == "Inline JD"
+    assert state_text({}, "job_description", "") == ""
+    with pytest.raises(KeyError):
+        state_text({"resume_content_ref": blob_ref("gone")}, "resume_content")
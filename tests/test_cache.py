@@ -0,0 +1,48 @@
+import time
+
+from src.core import cache
+from src.core.cache import ResultCache, make_cache_key
+
+
+def make_cache(tmp_path, **kwargs):
+    options = {"ttl_seconds": 3600, "max_entries": 100}
+    options.update(kwargs)
+    return ResultCache(str(tmp_path / "cache.sqlite3"), **options)
+
+
+def test_cache_key_ignores_cosmetic_whitespace():
+    assert make_cache_key("screening", "Senior  Python\r\ndeveloper ") == make_cache_key("screening", "Senior Python developer")
+    assert make_cache_key("screening", "a", 1) != make_cache_key("screening", "a", 2)
+
+
+def test_round_trip_and_stats(tmp_path):
+    store = make_cache(tmp_path)
+    assert store.get("screening", "k") is None
+    store.set("screening", "k", {"matchScore": 80})
+    assert store.get("screening", "k") == {"matchScore": 80}
+    stats = store.stats()
+    assert stats["entries"] == 1
+    assert stats["namespaces"]["screening"] == {"hits": 1, "misses": 1, "writes": 1}
+
+
+def test_expired_entries_are_misses(tmp_path):
+    store = make_cache(tmp_path, ttl_seconds=0)
+    store.set("screening", "k", "value")
+    time.sleep(0.01)
+    assert store.get("screening", "k") is None
+
+
+def test_eviction_is_periodic_and_keeps_recent_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "LLM_CACHE_PRUNE_INTERVAL_SECONDS", 3600)
+    store = make_cache(tmp_path, max_entries=100)
+    for i in range(150):
+        store.set("screening", f"k{i}", i)
+    # Pruning runs every max_entries // 100 writes here, so the table never drifts far past the bound.
+    assert store.stats()["entries"] <= 100
+    assert store.get("screening", "k149") == 149
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    store = make_cache(tmp_path, enabled=False)
+    store.set("screening", "k", 1)
+    assert store.get("screening", "k") is None
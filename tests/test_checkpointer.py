@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("langgraph")
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from benchmark import JOB_DESCRIPTION, synthetic_resume_text
+from src.core import checkpointer as checkpointing
+from src.core.checkpointer import SqliteCheckpointSaver
+
+
+@pytest.fixture
+def sqlite_saver(tmp_path, monkeypatch):
+    # Every graph build opens a fresh saver on the same file, like another worker process would.
+    path = str(tmp_path / "checkpoints.sqlite3")
+    savers = []
+
+    def build_checkpointer():
+        savers.append(SqliteCheckpointSaver(path))
+        return savers[-1]
+
+    monkeypatch.setattr(checkpointing, "build_checkpointer", build_checkpointer)
+    return savers
+
+
+def reopen(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "_graph", None)
+    monkeypatch.setattr(app_module, "_checkpointer", None)
+
+
+def test_paused_thread_is_refined_and_approved_from_a_fresh_saver(app_module, sqlite_saver, sent_emails, monkeypatch):
+    config = {"configurable": {"thread_id": "checkpointed-thread"}}
+    state = app_module.run_graph(app_module.graph_input(JOB_DESCRIPTION, synthetic_resume_text(1, seed=7)), config)
+    assert "final_status" not in state
+    assert app_module.get_graph().get_state(config).next == ("email_sender",)
+
+    reopen(app_module, monkeypatch)
+    body, status = app_module.apply_decision("checkpointed-thread", "refine", {"feedback": "Add a closing line."})
+    assert status == 200, body
+    assert body["state"]["drafted_email"]["body"].endswith("P.S. Revised based on your feedback.")
+
+    reopen(app_module, monkeypatch)
+    body, status = app_module.apply_decision("checkpointed-thread", "approve", {})
+    assert status == 200, body
+    assert body["state"]["final_status"] == "Email Sent Successfully"
+    assert [version["source"] for version in body["state"]["draft_versions"]] == ["draft", "refine"]
+    assert len(sent_emails) == 1 and "P.S. Revised" in sent_emails[0].get_payload()
+    assert len(sqlite_saver) == 3
+
+
+def test_writes_keep_their_namespace_and_task_path(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "checkpoints.sqlite3"))
+    for namespace in ("", "child:1"):
+        config = {"configurable": {"thread_id": "t", "checkpoint_ns": namespace, "checkpoint_id": None}}
+        checkpoint = dict(empty_checkpoint(), channel_values={"value": namespace or "root"})
+        saved = saver.put(config, checkpoint, {"step": 1}, {})
+        saver.put_writes(saved, [("value", "b"), ("value", "a")], "task-b", task_path="~2")
+        saver.put_writes(saved, [("value", "c")], "task-a", task_path="~1")
+
+    fresh = SqliteCheckpointSaver(str(tmp_path / "checkpoints.sqlite3"))
+    saver.flush()
+    root = fresh.get_tuple({"configurable": {"thread_id": "t"}})
+    child = fresh.get_tuple({"configurable": {"thread_id": "t", "checkpoint_ns": "child:1"}})
+    assert root.checkpoint["channel_values"] == {"value": "root"}
+    assert child.checkpoint["channel_values"] == {"value": "child:1"}
+    assert child.config["configurable"]["checkpoint_ns"] == "child:1"
+    assert [(task, value) for task, _, value in root.pending_writes] == [("task-a", "c"), ("task-b", "b"), ("task-b", "a")]
+    fresh.delete_thread("t")
+    assert fresh.get_tuple({"configurable": {"thread_id": "t"}}) is None
@@ -0,0 +1,80 @@
+import random
+from concurrent.futures import Future
+
+import pytest
+
+from src.core import dedup
+from src.core.dedup import DedupHistory, Fingerprint, find_duplicates, hamming_distance, jd_key, simhash
+from src.core.jobs import JobManager
+
+WORDS = [f"skill{i}" for i in range(3000)]
+
+
+def resume_text(seed, words=600, email="jane.doe@example.com"):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + f" contact {email}"
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    store = DedupHistory(str(tmp_path / "dedup.sqlite3"), history_seconds=3600)
+    monkeypatch.setattr(dedup, "dedup_history", store)
+    return store
+
+
+def test_simhash_is_close_for_small_edits_and_far_otherwise():
+    base = resume_text(1)
+    edited = base.replace(base.split()[50], "changed", 1)
+    assert hamming_distance(simhash(base), simhash(edited)) <= dedup.DEDUP_SIMHASH_MAX_DISTANCE
+    assert hamming_distance(simhash(base), simhash(resume_text(2))) > 10
+    assert simhash("Senior  Python\n\nDeveloper") == simhash("senior python developer")
+
+
+def test_fingerprint_match_kinds():
+    base = resume_text(1)
+    fingerprint = Fingerprint.of(base, b"pdf-1")
+    assert fingerprint.match(Fingerprint.of(base, b"pdf-1"))[0] == "bytes"
+    assert fingerprint.match(Fingerprint.of(base.upper() + "  ", b"pdf-2"))[0] == "text"
+    assert fingerprint.match(Fingerprint.of(base.replace(base.split()[10], "x", 1)))[0] == "near"
+    assert fingerprint.match(Fingerprint.of(resume_text(2)))[0] == "email"
+    assert fingerprint.match(Fingerprint.of(resume_text(2, email="someone@else.org"))) is None
+
+
+def test_short_texts_only_match_on_bytes():
+    scanned_a, scanned_b = Fingerprint.of("  ", b"scan-a"), Fingerprint.of("Page 1", b"scan-b")
+    assert scanned_a.text_hash is None and scanned_a.simhash is None
+    assert scanned_a.match(scanned_b) is None
+    assert scanned_a.match(Fingerprint.of("  ", b"scan-a"))[0] == "bytes"
+
+
+def test_find_duplicates_within_batch_and_against_history(history):
+    base, other = resume_text(1), resume_text(2, email="sam@example.com")
+    texts = [base, other, base.replace(base.split()[5], "y", 1), None, base]
+    fingerprints, duplicates = find_duplicates("JD", texts, [b"a", b"b", b"c", None, b"a"])
+    assert duplicates[:2] == [None, None]
+    assert duplicates[2]["index"] == 0 and duplicates[2]["match"] == "near"
+    assert duplicates[3] is None
+    assert duplicates[4] == {"index": 0, "match": "bytes", "distance": 0}
+
+    history.record(jd_key("JD"), fingerprints[0], "a.pdf", {"thread_id": "t1", "screening_results": {"matchScore": 80}})
+    _, later = find_duplicates("JD", [base], [b"a-again"])
+    assert later[0]["history"] and later[0]["filename"] == "a.pdf" and later[0]["match"] == "text"
+    assert later[0]["result"]["thread_id"] == "t1"
+    assert find_duplicates("Another JD", [base], [b"a"])[1] == [None]
+    assert history.stats()["history_duplicates"] == 1
+
+
+def test_job_results_can_resolve_later_without_a_worker():
+    manager = JobManager(max_workers=1)
+    pending = Future()
+
+    def work(item):
+        return pending if item == "duplicate" else {"value": item}
+
+    job = manager.submit(work, ["duplicate", "original"], ["d", "o"])
+    assert not job.wait(timeout=0.5)
+    # The single worker was not held by the pending item: the second one already finished.
+    assert job.completed == 1
+    pending.set_result({"value": "reused"})
+    assert job.wait(timeout=1)
+    assert [result["value"] for result in job.to_dict()["results"]] == ["reused", "original"]
@@ -0,0 +1,146 @@
+import importlib
+import smtplib
+import socket
+from email.mime.text import MIMEText
+
+import pytest
+
+from src.utils import email_sender
+from src.utils.email_sender import PooledSMTPSender, build_message
+
+
+class FakeSMTP:
+    """
+    Stands in for smtplib.SMTP: fails the sends listed in `failures` (one
+    exception per call, None for success) and records what it delivered.
+    """
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.sent = []
+
+    def send_message(self, msg):
+        failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise failure
+        self.sent.append(msg["Subject"])
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self):
+        pass
+
+
+def make_sender(connections):
+    sender = PooledSMTPSender("localhost", 25, use_tls=False, max_per_minute=0)
+    opened = []
+
+    def connect():
+        server = connections.pop(0)
+        opened.append(server)
+        return server
+
+    sender._connect = connect
+    return sender, opened
+
+
+def message(subject):
+    msg = MIMEText("body")
+    msg["Subject"] = subject
+    return msg
+
+
+def test_reuses_one_connection():
+    sender, opened = make_sender([FakeSMTP()])
+    try:
+        for i in range(3):
+            sender.send_message(message(f"m{i}"))
+    finally:
+        sender.close()
+    assert len(opened) == 1
+    assert opened[0].sent == ["m0", "m1", "m2"]
+
+
+def test_stale_pooled_connection_is_retried_once():
+    stale = FakeSMTP(failures=[None, smtplib.SMTPServerDisconnected("gone")])
+    fresh = FakeSMTP()
+    sender, opened = make_sender([stale, fresh])
+    try:
+        sender.send_message(message("first"))
+        sender.send_message(message("second"))
+    finally:
+        sender.close()
+    assert stale.sent == ["first"]
+    assert fresh.sent == ["second"]
+
+
+def test_fresh_connection_failure_is_not_retried():
+    sender, opened = make_sender([FakeSMTP(failures=[smtplib.SMTPServerDisconnected("gone")]), FakeSMTP()])
+    try:
+        with pytest.raises(smtplib.SMTPServerDisconnected):
+            sender.send_message(message("only"))
+    finally:
+        sender.close()
+    assert len(opened) == 1
+
+
+def test_smtp_errors_are_not_retried():
+    refused = smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"no such user")})
+    server = FakeSMTP(failures=[None, refused])
+    sender, opened = make_sender([server, FakeSMTP()])
+    try:
+        sender.send_message(message("ok"))
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            sender.send_message(message("refused"))
+    finally:
+        sender.close()
+    assert len(opened) == 1
+    assert server.sent == ["ok"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_delivers_to_a_local_smtp_server():
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    received = []
+
+    class Handler:
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope.rcpt_tos)
+            return "250 OK"
+
+    port = free_port()
+    controller = controller_module.Controller(Handler(), hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        sender = PooledSMTPSender("127.0.0.1", port, use_tls=False, max_per_minute=0)
+        try:
+            for address in ("a@example.com", "b@example.com"):
+                sender.send_message(build_message(address, "Hello", "<p>Hi</p>"))
+        finally:
+            sender.close()
+    finally:
+        controller.stop()
+    assert received == [["a@example.com"], ["b@example.com"]]
+
+
+def test_smtp_names_take_precedence_over_email_names(monkeypatch):
+    for name in ("SMTP_SERVER", "SMTP_PORT", "SMTP_USER", "SMTP_PASSWORD", "EMAIL_HOST", "EMAIL_PORT", "EMAIL_USER", "EMAIL_PASS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("SMTP_SERVER", "smtp.example.com")
+    monkeypatch.setenv("EMAIL_HOST", "legacy.example.com")
+    monkeypatch.setenv("EMAIL_PORT", "2525")
+    monkeypatch.setenv("EMAIL_USER", "legacy-user")
+    try:
+        importlib.reload(email_sender)
+        assert email_sender.SMTP_HOST == "smtp.example.com"
+        assert email_sender.SMTP_PORT == 2525
+        assert email_sender.SMTP_USER == "legacy-user"
+    finally:
+        monkeypatch.undo()
+        importlib.reload(email_sender)
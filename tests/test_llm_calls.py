@@ -0,0 +1,126 @@
+import time
+import uuid
+
+import pytest
+
+from src.core import llm_calls
+from src.core.llm_calls import (
+    CircuitBreaker, CircuitOpenError, TokenBucket, get_limiter, invoke_llm, retry_after_seconds, stream_llm,
+)
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code, message="provider error"):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeLLM:
+    """
+    Raises the queued errors in order, then answers.
+    """
+
+    def __init__(self, errors=()):
+        self.model_name = f"fake-{uuid.uuid4().hex[:8]}"
+        self.errors = list(errors)
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return type("Response", (), {"content": "ok", "usage_metadata": {"total_tokens": 10}})()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_calls, "backoff_seconds", lambda attempt, error=None: 0.0)
+    monkeypatch.setattr(llm_calls, "LLM_REQUESTS_PER_MINUTE", 0)
+
+
+def test_token_bucket_allows_a_burst_then_waits():
+    bucket = TokenBucket(600)
+    assert bucket.acquire(600) == 0.0
+    start = time.monotonic()
+    waited = bucket.acquire(5)
+    assert waited == pytest.approx(0.5, abs=0.05)
+    assert time.monotonic() - start >= 0.45
+
+
+def test_token_bucket_adjust_and_unlimited():
+    bucket = TokenBucket(60)
+    bucket.acquire(60)
+    bucket.adjust(30)
+    assert bucket.tokens == pytest.approx(30, abs=0.1)
+    assert TokenBucket(0).acquire(10 ** 6) == 0.0
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_retry_hint_is_read_from_the_message():
+    assert retry_after_seconds(Exception("Please try again in 1m7.5s.")) == pytest.approx(67.5)
+    assert retry_after_seconds(Exception("Please try again in 250ms")) == pytest.approx(0.25)
+
+
+def test_client_errors_do_not_open_the_breaker(monkeypatch):
+    monkeypatch.setattr(llm_calls, "LLM_BREAKER_FAILURE_THRESHOLD", 2)
+    llm = FakeLLM(errors=[ProviderError(400, "json_validate_failed") for _ in range(5)])
+    for _ in range(5):
+        with pytest.raises(ProviderError):
+            invoke_llm(llm, "prompt")
+    assert get_limiter(llm.model_name).breaker.state == "closed"
+    assert invoke_llm(llm, "prompt").content == "ok"
+
+
+def test_outages_open_the_breaker(monkeypatch):
+    monkeypatch.setattr(llm_calls, "LLM_BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(llm_calls, "LLM_MAX_RETRIES", 0)
+    llm = FakeLLM(errors=[ProviderError(503), ProviderError(503)])
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            invoke_llm(llm, "prompt")
+    with pytest.raises(CircuitOpenError):
+        invoke_llm(llm, "prompt")
+    assert llm.calls == 2
+
+
+def test_half_open_trial_keeps_its_own_retries(monkeypatch):
+    monkeypatch.setattr(llm_calls, "LLM_BREAKER_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(llm_calls, "LLM_BREAKER_RESET_SECONDS", 0.01)
+    llm = FakeLLM(errors=[ProviderError(503), ProviderError(429), ProviderError(503)])
+    monkeypatch.setattr(llm_calls, "LLM_MAX_RETRIES", 0)
+    with pytest.raises(ProviderError):
+        invoke_llm(llm, "prompt")
+    time.sleep(0.02)
+    monkeypatch.setattr(llm_calls, "LLM_MAX_RETRIES", 3)
+    assert invoke_llm(llm, "prompt").content == "ok"
+    assert get_limiter(llm.model_name).breaker.state == "closed"
+
+
+def test_closing_a_half_open_stream_frees_the_trial(monkeypatch):
+    monkeypatch.setattr(llm_calls, "LLM_BREAKER_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(llm_calls, "LLM_BREAKER_RESET_SECONDS", 0.01)
+    llm = FakeLLM()
+    llm.stream = lambda messages: iter(type("Chunk", (), {"content": text})() for text in ("a", "b"))
+    breaker = get_limiter(llm.model_name).breaker
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    stream = stream_llm(llm, "prompt")
+    assert next(stream) == "a"
+    # The client disconnects after the first chunk.
+    stream.close()
+    assert breaker.state == "half-open"
+    assert list(stream_llm(llm, "prompt")) == ["a", "b"]
+    assert breaker.state == "closed"
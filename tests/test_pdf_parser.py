@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from src.utils import pdf_parser
+from src.utils.pdf_parser import PDFLimitError, parse_pdf_from_bytes
+
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_long_pdfs_are_parsed_in_parallel_from_a_spooled_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_parser, "PDF_PARALLEL_PAGE_THRESHOLD", 4)
+    monkeypatch.setattr(pdf_parser, "PDF_PARSE_WORKERS", 2)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    text = parse_pdf_from_bytes(make_pdf([f"Page {i}" for i in range(6)]))
+    assert [line for line in text.splitlines() if line] == [f"Page {i}" for i in range(6)]
+    assert os.listdir(tmp_path) == []
+
+
+def test_reading_stops_at_the_text_limit(monkeypatch):
+    monkeypatch.setattr(pdf_parser, "PDF_MAX_TEXT_CHARS", 10)
+    assert parse_pdf_from_bytes(make_pdf(["Page one text", "Page two"])) == "Page one t"
+
+
+def test_limits_and_unreadable_files(monkeypatch):
+    monkeypatch.setattr(pdf_parser, "PDF_MAX_PAGES", 2)
+    with pytest.raises(PDFLimitError):
+        parse_pdf_from_bytes(make_pdf(["a", "b", "c"]))
+    assert parse_pdf_from_bytes(b"not a pdf").startswith("Error:")
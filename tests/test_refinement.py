@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from src.agents import candidate_communication_agent as drafting
+from src.agents.candidate_communication_agent import apply_email_edits
+
+BODY = "Dear Ana,\n\nWe would like to invite you to an interview.\n\nBest regards,\nThe Team"
+
+
+def test_edits_are_applied_in_order():
+    edits = [
+        {"find": "an interview", "replace": "a second interview"},
+        {"find": "Best regards", "replace": "Kind regards"},
+    ]
+    assert apply_email_edits(BODY, edits) == (
+        "Dear Ana,\n\nWe would like to invite you to a second interview.\n\nKind regards,\nThe Team"
+    )
+
+
+def test_replace_keeps_its_paragraph_breaks():
+    edits = [{"find": "to an interview.", "replace": "to an interview.\n\nPlease bring a portfolio.\n"}]
+    assert "interview.\n\nPlease bring a portfolio.\n\n\nBest" in apply_email_edits(BODY, edits)
+
+
+def test_find_falls_back_to_stripped_text():
+    edits = [{"find": "  Dear Ana,\n", "replace": "Hello Ana,"}]
+    assert apply_email_edits(BODY, edits).startswith("Hello Ana,\n\n")
+
+
+def test_unmatched_or_empty_find_rejects_all_edits():
+    assert apply_email_edits(BODY, [{"find": "Dear Ana", "replace": "Hi"}, {"find": "not there", "replace": "x"}]) is None
+    assert apply_email_edits(BODY, [{"find": "   ", "replace": "x"}]) is None
+
+
+def test_streaming_refinement_uses_targeted_edits(monkeypatch):
+    monkeypatch.setattr(drafting, "REFINEMENT_MODE", "diff")
+    monkeypatch.setattr(drafting, "get_drafting_llm", lambda: object())
+    monkeypatch.setattr(drafting.llm_cache, "enabled", False)
+    monkeypatch.setattr(drafting, "_refine_with_edits", lambda llm, body, feedback: body.replace("Ana", "Ana Silva"))
+
+    def no_streaming(*args, **kwargs):
+        raise AssertionError("the whole body should not be regenerated")
+
+    monkeypatch.setattr(drafting, "stream_llm", no_streaming)
+    chunks = list(drafting.stream_refined_email(BODY, "Use her full name."))
+    assert chunks == [BODY.replace("Ana", "Ana Silva")]
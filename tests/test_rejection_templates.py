@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+import pytest
+
+from src.agents import rejection_email_agent as rejection
+from src.agents.rejection_email_agent import FALLBACK_REJECTION, NAME_PLACEHOLDER, draft_rejection_node
+
+JOB_DESCRIPTION = "Backend Engineer at Acme. Python, Flask and SQL."
+
+
+@pytest.fixture
+def llm_calls(fake_llm, monkeypatch):
+    """
+    Records every structured LLM call of the rejection agent: "template" for a
+    template generation, "personalized" for a one-off draft.
+    """
+    monkeypatch.setattr(rejection, "_templates", OrderedDict())
+    monkeypatch.setattr(rejection, "_template_failures", OrderedDict())
+    calls = type("Calls", (list,), {"outcome": "ok"})()
+
+    def answer(llm, messages, schema=None):
+        calls.append("personalized" if schema else "template")
+        if calls.outcome == "fail":
+            raise ConnectionError("provider unavailable")
+        return {"templates": [{"subject": "Update on your application",
+                               "body": f"Dear {NAME_PLACEHOLDER}, thank you for applying."}]}
+
+    monkeypatch.setattr(rejection, "invoke_structured", answer)
+    return calls
+
+
+def rejection_state(name):
+    return {"job_description": JOB_DESCRIPTION, "screening_results": {"candidateName": name, "matchScore": 20}}
+
+
+def test_one_template_is_reused_for_every_candidate_of_a_jd(llm_calls):
+    first = draft_rejection_node(rejection_state("Ada Lovelace"))["drafted_email"]
+    second = draft_rejection_node(rejection_state("Alan Turing"))["drafted_email"]
+    assert llm_calls == ["template"]
+    assert first["body"] == "Dear Ada Lovelace, thank you for applying."
+    assert second["body"] == "Dear Alan Turing, thank you for applying."
+
+
+def test_failed_template_generation_is_remembered(llm_calls):
+    llm_calls.outcome = "fail"
+    first = draft_rejection_node(rejection_state("Ada Lovelace"))["drafted_email"]
+    second = draft_rejection_node(rejection_state("Alan Turing"))["drafted_email"]
+    # The second candidate goes straight to personalised drafting, without another template attempt.
+    assert llm_calls == ["template", "personalized", "personalized"]
+    assert first == second == FALLBACK_REJECTION
@@ -0,0 +1,51 @@
+import time
+
+from src.core import resume_store as resume_store_module
+from src.core.resume_store import ResumeStore, content_hash
+
+
+def resume(i, email=None):
+    return f"Candidate {i} python flask sql developer{i} {email or f'c{i}@example.com'}"
+
+
+def test_search_handles_more_matches_than_sqlite_variables(tmp_path, monkeypatch):
+    monkeypatch.setattr(resume_store_module, "SQLITE_MAX_VARIABLES", 7)
+    store = ResumeStore(str(tmp_path / "pool.sqlite3"))
+    for i in range(30):
+        store.add_resume(f"r{i}.pdf", resume(i))
+    matches = store.search("python flask developer", top_k=25)
+    assert len(matches) == 25
+    assert {match["filename"] for match in matches} <= {f"r{i}.pdf" for i in range(30)}
+
+
+def test_search_with_more_jd_terms_than_sqlite_variables(tmp_path, monkeypatch):
+    store = ResumeStore(str(tmp_path / "pool.sqlite3"))
+    for i in range(5):
+        store.add_resume(f"r{i}.pdf", resume(i))
+    job_description = "python flask sql " + " ".join(f"developer{i}" for i in range(40))
+    expected = store.search(job_description, top_k=5)
+    monkeypatch.setattr(resume_store_module, "SQLITE_MAX_VARIABLES", 7)
+    assert store.search(job_description, top_k=5) == expected
+    assert len(expected) == 5
+
+
+def test_delete_by_hash_and_email(tmp_path):
+    store = ResumeStore(str(tmp_path / "pool.sqlite3"))
+    first = store.add_resume("a.pdf", resume(1, "Jane@Example.com"))
+    store.add_resume("b.pdf", resume(2, "jane@example.com"))
+    store.add_resume("c.pdf", resume(3))
+    assert store.delete(content_hash=first) == 1
+    assert store.get_text(first) is None
+    assert store.delete(email="jane@example.com") == 1
+    assert store.stats()["resumes"] == 1
+    assert store.search("developer2", top_k=5) == []
+
+
+def test_resumes_expire_after_ttl(tmp_path):
+    store = ResumeStore(str(tmp_path / "pool.sqlite3"), ttl_seconds=60)
+    old = store.add_resume("old.pdf", resume(1))
+    store._connection().execute("UPDATE resumes SET last_seen_at = ?", (time.time() - 120,))
+    store._last_prune = 0.0
+    store.add_resume("new.pdf", resume(2))
+    assert store.get_text(old) is None
+    assert store.get_text(content_hash(resume(2))) is not None
@@ -0,0 +1,57 @@
+import pytest
+
+from src.agents import resume_screening_agent as screening
+from src.agents.resume_screening_agent import SCREENING_MODEL, SCREENING_SMALL_MODEL, cascade_screen, cascade_stats
+
+
+@pytest.fixture
+def models(fake_llm, monkeypatch):
+    """
+    Turns the cascade on and answers each model with the result queued for it
+    in models[name], raising it if it is an exception. Called model names are recorded
+    in models["calls"].
+    """
+    monkeypatch.setattr(screening, "SCREENING_CASCADE_ENABLED", True)
+    monkeypatch.setattr(screening, "_cascade_stats", {"screened": 0, "escalated": 0, "reasons": {}})
+    monkeypatch.setattr(screening, "get_llm", lambda model_name, temperature: model_name)
+    answers = {"calls": []}
+
+    def answer(model_name, messages, schema):
+        answers["calls"].append(model_name)
+        if isinstance(answers[model_name], Exception):
+            raise answers[model_name]
+        return dict(answers[model_name])
+
+    monkeypatch.setattr(screening, "invoke_structured", answer)
+    return answers
+
+
+def screen():
+    return cascade_screen(screening.screening_task_prompt, screening.SCREENING_SCHEMA, "screening",
+                          "test", "Backend Engineer, Python", "Resume text")
+
+
+def test_borderline_scores_are_escalated_to_the_large_model(models):
+    models[SCREENING_SMALL_MODEL] = {"matchScore": screening.SCREENING_PASS_SCORE + 2, "confidence": 0.9}
+    models[SCREENING_MODEL] = {"matchScore": 90, "confidence": 0.95}
+    results = screen()
+    assert models["calls"] == [SCREENING_SMALL_MODEL, SCREENING_MODEL]
+    assert results["matchScore"] == 90 and results["screeningModel"] == SCREENING_MODEL
+    assert cascade_stats()["reasons"] == {"borderline": 1}
+
+
+def test_clear_confident_results_stay_with_the_small_model(models):
+    models[SCREENING_SMALL_MODEL] = {"matchScore": 15, "confidence": 0.9}
+    assert screen()["screeningModel"] == SCREENING_SMALL_MODEL
+    assert models["calls"] == [SCREENING_SMALL_MODEL]
+
+
+def test_low_confidence_and_failures_are_escalated(models):
+    models[SCREENING_MODEL] = {"matchScore": 30, "confidence": 0.9}
+    models[SCREENING_SMALL_MODEL] = {"matchScore": 15, "confidence": 0.2}
+    screen()
+    models[SCREENING_SMALL_MODEL] = ConnectionError("small model unavailable")
+    assert screen()["screeningModel"] == SCREENING_MODEL
+    stats = cascade_stats()
+    assert stats["reasons"] == {"low_confidence": 1, "small_model_failed": 1}
+    assert stats["escalation_rate"] == 1.0
@@ -0,0 +1,110 @@
+import uuid
+
+import pytest
+
+from src.core import llm_calls
+from src.core.structured_output import (
+    SCREENING_SCHEMA, StructuredOutputError, invoke_structured, validate,
+)
+from src.utils.helpers import clean_and_parse_json, extract_json
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('Sure! Here it is:\n```json\n{"a": [1, 2]}\n```\nAnything else?', {"a": [1, 2]}),
+    ('<think>maybe {"a": 0}?</think>\n{"a": 2}', {"a": 2}),
+    ('{"summary": "line one\nline two"}', {"summary": "line one\nline two"}),
+    ('{"a": "brace } inside", "b": 3}', {"a": "brace } inside", "b": 3}),
+    ('{"a": [1, 2,', {"a": [1, 2]}),
+    ('{"a": "cut off mid-str', {"a": "cut off mid-str"}),
+    ('{"a": 1, "dangling', {"a": 1}),
+    ('{"a": 1, "b": tr', {"a": 1}),
+    ('{"a": 1,}', {"a": 1}),
+])
+def test_extract_json_recovers_objects(raw, expected):
+    assert extract_json(raw) == expected
+
+
+def test_extract_json_gives_up_cleanly():
+    assert extract_json("") is None
+    assert extract_json("no json here") is None
+    assert extract_json("<think>still reasoning {") is None
+    assert clean_and_parse_json("nothing") == {}
+
+
+def test_validate_coerces_and_fills_defaults():
+    result = validate({"matchScore": "85%", "confidence": 1.7, "extra": True}, SCREENING_SCHEMA)
+    assert result["matchScore"] == 85
+    assert result["confidence"] == 1.0
+    assert result["candidateEmail"] == "N/A"
+    assert result["extra"] is True
+
+
+def test_validate_leaves_missing_name_unset():
+    result = validate({"matchScore": 40, "candidateName": ""}, SCREENING_SCHEMA)
+    assert "candidateName" not in result
+    assert result.get("candidateName", "Candidate") == "Candidate"
+
+
+def test_validate_rejects_bad_values():
+    with pytest.raises(StructuredOutputError):
+        validate({"summary": "no score"}, SCREENING_SCHEMA)
+    with pytest.raises(StructuredOutputError):
+        validate({"matchScore": "high"}, SCREENING_SCHEMA)
+    with pytest.raises(StructuredOutputError):
+        validate(["not", "an", "object"], SCREENING_SCHEMA)
+
+
+@pytest.mark.parametrize("score", ["NaN", float("nan"), "inf", float("-inf"), "1e999"])
+def test_validate_rejects_non_finite_numbers(score):
+    with pytest.raises(StructuredOutputError):
+        validate({"matchScore": score}, SCREENING_SCHEMA)
+    with pytest.raises(StructuredOutputError):
+        validate({"matchScore": 50, "confidence": score}, SCREENING_SCHEMA)
+
+
+class JsonModeError(Exception):
+    status_code = 400
+
+    def __init__(self, failed_generation):
+        super().__init__("json_validate_failed")
+        self.body = {"error": {"failed_generation": failed_generation}}
+
+
+class FakeLLM:
+    def __init__(self, model_name, replies):
+        self.model_name = model_name
+        self.replies = list(replies)
+        self.bound = []
+
+    def bind(self, **kwargs):
+        self.bound.append(kwargs)
+        return self
+
+    def invoke(self, messages):
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return type("Response", (), {"content": reply})()
+
+
+@pytest.fixture(autouse=True)
+def unlimited(monkeypatch):
+    monkeypatch.setattr(llm_calls, "LLM_REQUESTS_PER_MINUTE", 0)
+
+
+def test_invoke_structured_repairs_a_failed_generation(monkeypatch):
+    model = f"json-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr("src.core.structured_output.LLM_JSON_MODE_MODELS", {model})
+    llm = FakeLLM(model, [JsonModeError('{"matchScore": 70, "summary": "ok"')])
+    result = invoke_structured(llm, "prompt", SCREENING_SCHEMA)
+    assert result["matchScore"] == 70
+    assert llm.bound == [{"response_format": {"type": "json_object"}}]
+
+
+def test_invoke_structured_without_json_mode(monkeypatch):
+    llm = FakeLLM(f"plain-{uuid.uuid4().hex[:8]}", ["<think>hmm</think> {\"matchScore\": 12}"])
+    assert invoke_structured(llm, "prompt", SCREENING_SCHEMA)["matchScore"] == 12
+    assert llm.bound == []
+    with pytest.raises(StructuredOutputError):
+        invoke_structured(FakeLLM("plain", ["no json"]), "prompt")
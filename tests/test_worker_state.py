@@ -0,0 +1,64 @@
+import os
+import runpy
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import jobs, metrics
+from src.core.jobs import JobManager, JobStore, StoredJob
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_job_run_by_one_worker_is_read_and_streamed_by_another(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_POLL_SECONDS", 0.01)
+    path = str(tmp_path / "jobs.sqlite3")
+    running, other = JobManager(max_workers=2, store=JobStore(path)), JobManager(max_workers=1, store=JobStore(path))
+
+    job = running.submit(lambda item: {"value": item}, ["a", "b", "c"], ["a.pdf", "b.pdf", "c.pdf"])
+    seen = other.get(job.job_id)
+    assert isinstance(seen, StoredJob)
+    events = list(seen.iter_events(heartbeat_seconds=5))
+    assert events[-1].startswith("event: done") and len(events) == 4
+    assert seen.to_dict()["results"] == job.to_dict()["results"]
+    assert other.get("unknown") is None
+
+
+def test_prompt_stats_are_summed_across_processes(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_core")
+    from src.core import prompt_session
+
+    monkeypatch.setattr(prompt_session, "prompt_stats", prompt_session.PromptStatsStore(str(tmp_path / "stats.sqlite3"), 3600))
+    task = prompt_session.task_prompt("Resume: {resume}")
+    for _ in range(2):
+        # A fresh session cache stands in for another worker process.
+        monkeypatch.setattr(prompt_session, "_sessions", OrderedDict())
+        prompt_session.get_jd_session("Python developer").build_messages(task, resume="text")
+
+    stats = prompt_session.jd_session_stats(prompt_session.get_jd_session("Python developer").jd_hash)
+    assert stats["prompts"] == 2 and stats["shared_prefix_tokens"] == stats["prefix_tokens"]
+    assert prompt_session.jd_session_stats("unknown") is None
+
+
+def test_trace_spans_are_readable_from_another_process(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.sqlite3")
+    monkeypatch.setattr(metrics, "TRACING_ENABLED", True)
+    monkeypatch.setattr(metrics, "trace_log", metrics._TraceLog(path, 3600))
+    with metrics.trace_context("thread-1"):
+        metrics.record_span("node", "screener", time.time(), 0.5)
+    assert [span["name"] for span in metrics._TraceLog(path, 3600).get("thread-1")] == ["screener"]
+
+
+def test_worker_exit_drains_within_what_is_left_of_graceful_timeout(monkeypatch):
+    import main
+
+    drained = []
+    monkeypatch.setattr(main, "drain", drained.append)
+    config = runpy.run_path(os.path.join(project_root, "gunicorn.conf.py"))
+    worker = SimpleNamespace(exit_requested_at=time.monotonic() - (config["graceful_timeout"] - 20))
+    config["worker_exit"](None, worker)
+    config["worker_exit"](None, SimpleNamespace())
+    assert 14 < drained[0] <= 15
+    assert drained[1] == min(main.SHUTDOWN_DRAIN_SECONDS, config["graceful_timeout"] - 5)